@@ -27,35 +27,53 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import argparse
+import datetime
+import heapq
 import logging
+import multiprocessing
+import os
 import os.path
+import shutil
 import sys
+import tempfile
 import time
 from builtins import next
 from builtins import str
 
 from tecs import version
-from tecs.gtb.tools import parse_rec
-from tecs.label import OUT_FILE_TEXT
-from tecs.rinex import obs_file
+from tecs.gtb.tools import below_snr_mask, parse_rec
+from tecs.gtb.tectable import TecTable
+from tecs.label import (
+    OUT_FILE_TEXT, R_TEC_L1L2, R_TEC_L1L5, R_TEC_L2L5, R_TEC_L2L6, R_TEC_L2L7,
+    R_TEC_L6L7, R_TEC_P1P2, R_TEC_C1P2, R_TEC_C1C5, R_TEC_C1C2, R_TEC_C2C5,
+    R_TEC_C2C6, R_TEC_C2C7, R_TEC_C6C7, R_TEC_L1C1, R_TEC_L2C2, R_TEC_L8C8
+)
 from tecs.rinex.basic import RinexError
+from tecs.rinex.common import NS_PER_DAY, NS_PER_SEC, date2day, ns2datetime
 from tecs.rinex.futils import (
-    UncompressError, RE_OBS, RE_XYZ, find_files,
-    find_xyz_file, load_xyz_file
+    UncompressError, RE_OBS, find_xyz_file, group_obs_files,
+    stream_obs_groups, walk_files, read_file_list, get_rinex_date
 )
 from tecs.rinex.label import (
     L1, L2, L5, P1, P2, C1, C5, C2, S1, S2, S5,
     SAT_SYS_GLO, SAT_SYS_GEO, SAT_SYS_GPS,
     SAT_SYS_MIX,
-    TIME_SYS_GPS, SAT_SYS_BDS, L6, L7, L8, SAT_SYS_GAL,
-    C6, C7, C8, LabelError
+    TIME_SYS_GPS, SAT_SYS_BDS, SAT_SYS_GAL,
+    LabelError
 )
 from tecs.rinex.nmutils import (
     load_navigation_message,
-    select_navigation_message, NMError
+    select_navigation_message, EphemerisIndex, NavCache, NavIndex, NMError
 )
-from tecs.sat import gps, geo, glonass
-from tecs.sat.common import compute_el_az, xyz2lbh_deg
+from tecs.rinex.navstore import NavStore
+from tecs.rinex.sp3 import SP3Index, load_precise_orbit
+from tecs.rinex.stream import ObsStream
+from tecs.rinex.xyzstore import XYZError, XYZStore, site_name
+from tecs.sat import gps, glonass
+from tecs.sat.common import TopocentricFrame, el_az_matrix, xyz2lbh_deg
+from tecs.sat.orbit import OrbitInterpolator, broadcast_orbit
+from tecs.sat.orbitstore import OrbitStore, load_broadcast_orbit
+from tecs.sat.visibility import VisibilityWindows
 from tecs.validity import eval_validity
 
 START_TIME = time.time()
@@ -63,6 +81,25 @@ START_TIME = time.time()
 NAME = 'tecs'
 VERSION = version
 
+
+def _parse_date(value):
+    """_parse_date(value) -> date
+
+    Parameters
+    ----------
+    value : str
+        YYYY-DDD or YYYY-MM-DD
+    """
+    for d_fmt in ('%Y-%j', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, d_fmt).date()
+        except ValueError:
+            pass
+
+    msg = "'{}' is not YYYY-DDD or YYYY-MM-DD.".format(value)
+    raise argparse.ArgumentTypeError(msg)
+
+
 # Command line arguments
 ARG_PARSER = argparse.ArgumentParser()
 
@@ -92,8 +129,49 @@ ARG_PARSER.add_argument(
     action='store_true'
 )
 
+ARG_PARSER.add_argument(
+    '--files-from',
+    metavar='FILE',
+    help="process the observation files listed in FILE (one per line; "
+         "'-' to read the list from stdin) instead of searching obsDir."
+)
+
+ARG_PARSER.add_argument(
+    '--date-from',
+    metavar='DATE',
+    type=_parse_date,
+    help="skip the observation files before DATE (YYYY-DDD or YYYY-MM-DD)."
+)
+
+ARG_PARSER.add_argument(
+    '--date-to',
+    metavar='DATE',
+    type=_parse_date,
+    help="skip the observation files after DATE (YYYY-DDD or YYYY-MM-DD)."
+)
+
+ARG_PARSER.add_argument(
+    '--network',
+    action='store_true',
+    help="process the stations of a day together, epoch by epoch; the "
+         "satellite positions are computed once per epoch."
+)
+
+ARG_PARSER.add_argument(
+    '-j', '--jobs',
+    metavar='N',
+    type=int,
+    default=1,
+    help="process the station-days (the days in the network mode) in N "
+         "worker processes; they share the navigation data and the "
+         "satellite positions the main process stores once."
+)
+
 ARGS = ARG_PARSER.parse_args()
 
+# the listed paths are relative to the current directory
+WORK_DIR = os.getcwd()
+
 if ARGS.version:
     MSG = "tecs %s\n" % VERSION
     MSG += "Python %s" % sys.version
@@ -112,6 +190,9 @@ else:
 # modules depended on configuration
 import tecs.gtb.tec as tec
 
+# coefficients of the TEC combinations to calculate
+TEC_TABLE = TecTable(tec.TEC2CALC)
+
 if CFG.outFileMode == OUT_FILE_TEXT:
     import tecs.dio.text
 
@@ -155,274 +236,1160 @@ SUPPORTED_SYSTEMS = (SAT_SYS_GPS,
                      SAT_SYS_BDS,
                      SAT_SYS_GAL)
 
+# reasons to drop the records (see Station.dropped)
+DROP_VISIBILITY = 'out of the visibility windows'
+DROP_ELEVATION = 'below the elevation mask'
+DROP_SNR = 'below the SNR mask'
+DROP_REASONS = (DROP_VISIBILITY, DROP_ELEVATION, DROP_SNR)
 
-def main():
-    """main()
+
+def find_obs_groups(d_list, date_range=None):
+    """find_obs_groups(d_list, date_range=None) -> generator
+
+    search the directories (and their subdirectories) for the
+    observation files; the groups of a date are yielded as soon as the
+    search leaves the date (see tecs.rinex.futils.stream_obs_groups()).
+
+    Parameters
+    ----------
+    d_list : list
+        directories
+    date_range : tuple, optional
+        (first, last) dates of the files
+
+    Returns
+    -------
+    o_files : list
+        observation files of a station-day
     """
-    logger = logging.getLogger(NAME + '.main')
-    logger_error_count = 0
+    logger = logging.getLogger(NAME + '.find_obs_groups')
 
-    stdout = sys.stdout
-    stdout.write('Trying to find observation files...')  # [Verbose]
-    stdout.flush()
+    def found():
+        for obs_files in walk_files(d_list, RE_OBS, date_range):
+            msg = 'obs-files found: {}'.format(str(obs_files))
+            logger.debug(msg)
+            yield obs_files
+
+    for o_files in stream_obs_groups(found()):
+        yield o_files
+
+
+def listed_obs_groups(list_file, date_range=None):
+    """listed_obs_groups(list_file, date_range=None) -> groups
 
-    obs_files = find_files(CFG.obsDir, RE_OBS)
-    obs_files.sort()
+    Parameters
+    ----------
+    list_file : str
+        file with the paths to the observation files, '-' for stdin
+    date_range : tuple, optional
+        (first, last) dates of the files
 
-    msg = 'obs-files found: {}'.format(str(obs_files))
+    Returns
+    -------
+    groups : list
+        lists of the observation files of a station-day
+    """
+    logger = logging.getLogger(NAME + '.listed_obs_groups')
+
+    if list_file == '-':
+        obs_files = read_file_list(sys.stdin)
+    else:
+        with open(os.path.join(WORK_DIR, list_file)) as f_obj:
+            obs_files = read_file_list(f_obj)
+
+    obs_files = [os.path.join(WORK_DIR, f) for f in obs_files]
+
+    listed = []
+    for obs_file in obs_files:
+        if not RE_OBS.match(os.path.basename(obs_file)):
+            msg = '{}: not an observation file; skipped.'.format(obs_file)
+            logger.warning(msg)
+            continue
+
+        if date_range:
+            date = get_rinex_date(obs_file)
+            if date and not date_range[0] <= date <= date_range[1]:
+                continue
+
+        listed.append(obs_file)
+
+    msg = 'obs-files listed: {}'.format(str(listed))
     logger.debug(msg)
-    print('done (%s).' % len(obs_files))
 
-    if not obs_files:
-        msg = "Can't find any observation file in '%s'." % CFG.obsDir
-        print(msg)
-        raise SystemExit(0)
+    return group_obs_files(listed)
 
-    total_files = len(obs_files)
 
-    xyz_files = find_files(CFG.obsDir, RE_XYZ)
-    if xyz_files:
-        msg = 'xyz-files found: {}'.format(str(xyz_files))
-        logger.debug(msg)
+class Satellites(object):
+    """Satellites(nav_index, nav_cache, sp3_index=None, orbit_store=None)
+    -> instance
 
-    # navigation file according to the date and satellite system;
-    # (for comment proposes)
-    nav_file = {}
+    positions of the satellites and the GLONASS frequencies at the
+    epochs; the stations share them, so a position is computed once per
+    epoch.
 
-    # function to compute the satellite's XYZ according to the sat system
-    get_sat_xyz = {
-        SAT_SYS_GPS: gps.compute_sat_xyz,
-        SAT_SYS_BDS: gps.compute_sat_xyz,
-        SAT_SYS_GAL: gps.compute_sat_xyz,
-        SAT_SYS_GLO: glonass.compute_sat_xyz,
-        SAT_SYS_GEO: glonass.compute_sat_xyz
-    }
+    Parameters
+    ----------
+    nav_index : tecs.rinex.nmutils.NavIndex
+        navigation files of the navDir directories
+    nav_cache : tecs.rinex.nmutils.NavCache
+        parsed navigation files
+    sp3_index : tecs.rinex.sp3.SP3Index, optional
+        precise orbits of the CFG.sp3Systems
+    orbit_store : tecs.sat.orbitstore.OrbitStore, optional
+        daily positions of the satellites
+    """
 
-    # XYZ of the satellite according to the
-    #  sat system, sat number, date and time
-    sat_xyz = {}
+    def __init__(self, nav_index, nav_cache, sp3_index=None,
+                 orbit_store=None):
+        self.nav_index = nav_index
+        self.nav_cache = nav_cache
+        self.sp3_index = sp3_index
+        self.orbit_store = orbit_store
+
+        # function to compute the satellite's XYZ according to the sat
+        # system
+        self.get_sat_xyz = {
+            SAT_SYS_GPS: gps.compute_sat_xyz,
+            SAT_SYS_BDS: gps.compute_sat_xyz,
+            SAT_SYS_GAL: gps.compute_sat_xyz,
+            SAT_SYS_GLO: glonass.compute_sat_xyz,
+            SAT_SYS_GEO: glonass.compute_sat_xyz
+        }
+
+        # the same at many moments at once: the daily positions (those
+        # kept on disk as well) and the nodes of the interpolation
+        self.compute_sat_xyz = {
+            SAT_SYS_GPS: gps.compute_sat_xyz_array,
+            SAT_SYS_BDS: gps.compute_sat_xyz_array,
+            SAT_SYS_GAL: gps.compute_sat_xyz_array,
+            SAT_SYS_GLO: glonass.compute_sat_xyz_array,
+            SAT_SYS_GEO: glonass.compute_sat_xyz_array
+        }
+        # {(day, system): orbit} of the latest day
+        self.day_orbits = {}
+        # {(day, system): orbit} on the CFG.visibilityStep grid
+        self.coarse_orbits = {}
+
+        # the positions interpolated from a coarse grid
+        if CFG.orbitGridStep:
+            for system in self.get_sat_xyz:
+                self.get_sat_xyz[system] = OrbitInterpolator(
+                    self.compute_sat_xyz[system], CFG.orbitGridStep,
+                    CFG.orbitGridOrder).position
+
+        # navigation file according to the date and satellite system;
+        # (for comment proposes)
+        self.nav_file = {}
+
+        # XYZ of the satellite according to the
+        #  sat system, sat number, date and time
+        self.sat_xyz = {}
+
+        # GLONASS freq (depends on ephemeris)
+        self.glo_freq = {}
+
+        # nav message, the day's positions of the systems and the
+        # precise orbits (see start())
+        self.nav_message = {}
+        self.nav_filenames = {}
+        self.day_orbit = {}
+        self.day = None
+        self.precise_orbit = None
+        self.precise_date = None
+
+        self.error_count = 0
+
+    def start(self, date):
+        """start(date) -> None
+
+        the next epochs are those of the date; the navigation messages
+        are loaded anew, the positions of the other days are dropped.
+
+        Parameters
+        ----------
+        date : datetime.date
+        """
+        day = date2day(date)
+        if day != self.day:
+            self._drop_other_days(day)
+
+        self.day = day
+        self.nav_message = {}
+        self.nav_filenames = {}
+
+        if self.sp3_index is not None and self.precise_date != date:
+            self.precise_date = date
+            self.precise_orbit = load_precise_orbit(
+                self.sp3_index, date, CFG.orbitGridOrder,
+                store=self.orbit_store)
+
+        self.day_orbit = {}
+        if any(day != self.day for (day, _) in self.day_orbits):
+            self.day_orbits.clear()
+        if any(day != self.day for (day, _) in self.coarse_orbits):
+            self.coarse_orbits.clear()
+
+    def _drop_other_days(self, day):
+        """_drop_other_days(day) -> None
+
+        keep the positions, the GLONASS frequencies and the navigation
+        files of the day only.
+        """
+        def of_day(values):
+            return dict((epoch, value) for (epoch, value) in values.items()
+                        if epoch // NS_PER_DAY == day)
+
+        for sat_xyz in self.sat_xyz.values():
+            for number in list(sat_xyz):
+                sat_xyz[number] = of_day(sat_xyz[number])
+
+        for number in list(self.glo_freq):
+            self.glo_freq[number] = of_day(self.glo_freq[number])
+
+        for nav_day in list(self.nav_file):
+            if nav_day != day:
+                del self.nav_file[nav_day]
+
+    def publish(self, date):
+        """publish(date) -> None
+
+        put the tables of the date into the stores: the parsed
+        navigation files and the positions of the satellites (see
+        tecs.rinex.navstore, tecs.sat.orbitstore); the processes which
+        use the same stores memory-map them instead of computing their
+        own copies. The failures are left for those to report.
+
+        Parameters
+        ----------
+        date : datetime.date
+        """
+        self.start(date)
+        epoch = self.day * NS_PER_DAY
+
+        for system in sorted(self.get_sat_xyz):
+            use_sp3 = system in CFG.sp3Systems
+            # GLONASS needs the messages for the frequency numbers
+            if use_sp3 and system != SAT_SYS_GLO:
+                continue
 
-    # GLONASS freq (depends on ephemeris)
-    glo_freq = {}
+            try:
+                nm = load_navigation_message(self.nav_index, epoch, system,
+                                             CFG.navPriority[system],
+                                             cache=self.nav_cache,
+                                             adjacent=True)
+            except (RinexError, UncompressError, NMError):
+                continue
 
-    # FIXME get into shape or remove
-    coordinates_filename = 'coordinates.txt'
-    crds_file = None
-    if ARGS.save_coordinates:
-        crds_file = open(coordinates_filename, 'w')
+            if nm and not use_sp3 and self.orbit_store is not None:
+                load_broadcast_orbit(
+                    self.orbit_store,
+                    EphemerisIndex.from_ephemeris(system,
+                                                  nm.ephemeris[system]),
+                    self.compute_sat_xyz[system], epoch, CFG.orbitGridStep,
+                    CFG.orbitGridOrder, nm.filenames)
+
+    def nav_filename(self, epoch, system):
+        """nav_filename(epoch, system) -> filename
+
+        the source of the positions of the system at the epoch.
+        """
+        return self.nav_file[epoch // NS_PER_DAY][system]
+
+    def load(self, epoch, system):
+        """load(epoch, system) -> bool
+
+        load the navigation messages of the system once after start().
+
+        Returns
+        -------
+        loaded : bool
+            False if the loading has just failed.
+        """
+        logger = logging.getLogger(NAME + '.Satellites.load')
+
+        nav_message = self.nav_message
+        obs_date = epoch // NS_PER_DAY
+
+        if obs_date not in self.nav_file:
+            self.nav_file[obs_date] = {}
+        nav_file = self.nav_file[obs_date]
+
+        # the precise orbits; GLONASS still needs the navigation
+        # messages for the frequency numbers
+        use_sp3 = system in CFG.sp3Systems
+
+        if system not in nav_message and use_sp3:
+            nav_file[system] = None
+            if self.precise_orbit is not None:
+                nav_file[system] = self.precise_orbit.filename
+            if system != SAT_SYS_GLO:
+                nav_message[system] = None
 
-    for (f_num, o_file) in enumerate(obs_files):
+        if system in nav_message:
+            return True
 
-        print("%s [%s/%s]: " % (o_file, f_num + 1, total_files))
-        stdout.flush()
+        nav_message[system] = None
+        if not use_sp3:
+            nav_file[system] = None
 
         try:
-            print("- reading...", end='')
-            stdout.flush()
-            obs = obs_file(o_file)
+            nm = load_navigation_message(self.nav_index, epoch, system,
+                                         CFG.navPriority[system],
+                                         cache=self.nav_cache,
+                                         adjacent=True)
         except (RinexError, UncompressError) as err:
-            msg = "%s" % err
-            logger.error(msg)
-            logger_error_count += 1
-            continue
+            logger.error(str(err))
+            return False
+        except NMError as err:
+            # warnings.warn(str(err))
+            logger.warning(str(err))
+            return False
+
+        if nm:
+            nav_message[system] = EphemerisIndex.from_ephemeris(
+                system, nm.ephemeris[system])
+            self.nav_filenames[system] = nm.filenames
+            if not use_sp3:
+                nav_file[system] = nm.filename
+
+            if self.orbit_store is not None and not use_sp3:
+                orbit = self.day_orbits.get((self.day, system))
+                if orbit is None or orbit.filenames != nm.filenames:
+                    orbit = load_broadcast_orbit(
+                        self.orbit_store, nav_message[system],
+                        self.compute_sat_xyz[system],
+                        self.day * NS_PER_DAY,
+                        CFG.orbitGridStep, CFG.orbitGridOrder,
+                        nm.filenames)
+                    self.day_orbits[(self.day, system)] = orbit
+                self.day_orbit[system] = orbit
+
+        return True
+
+    def loaded(self, system):
+        """loaded(system) -> bool
+
+        whether the loading of the system's messages took place since
+        start().
+        """
+        return system in self.nav_message
+
+    def coarse_orbit(self, system):
+        """coarse_orbit(system) -> orbit or None
+
+        positions of the system's satellites of the day on a coarse
+        grid: those of the precise or the stored orbits if any, the
+        ones computed once on the CFG.visibilityStep grid otherwise.
+
+        Returns
+        -------
+        orbit : tecs.sat.orbit.GridOrbit
+            None if the messages aren't loaded.
+        """
+        if system in CFG.sp3Systems:
+            return self.precise_orbit
+
+        if system in self.day_orbit:
+            return self.day_orbit[system]
+
+        ephemeris_index = self.nav_message.get(system)
+        if ephemeris_index is None:
+            return None
+
+        filenames = self.nav_filenames[system]
+        orbit = self.coarse_orbits.get((self.day, system))
+        if orbit is None or orbit.filenames != filenames:
+            orbit = broadcast_orbit(ephemeris_index,
+                                    self.compute_sat_xyz[system],
+                                    self.day * NS_PER_DAY,
+                                    CFG.visibilityStep, 1, filenames)
+            self.coarse_orbits[(self.day, system)] = orbit
+
+        return orbit
+
+    def compute(self, epoch, system, number, filename):
+        """compute(epoch, system, number, filename) -> bool
+
+        compute the position of the satellite at the epoch once (see
+        position()).
+
+        Parameters
+        ----------
+        filename : str
+            the observation file (for the messages)
+
+        Returns
+        -------
+        computed : bool
+            False if the computation has just failed.
+        """
+        logger = logging.getLogger(NAME + '.Satellites.compute')
+
+        sat_xyz = self.sat_xyz
+        glo_freq = self.glo_freq
+
+        if system not in sat_xyz:
+            sat_xyz[system] = {}
+
+        if number not in sat_xyz[system]:
+            sat_xyz[system][number] = {}
+
+        if epoch in sat_xyz[system][number]:
+            return True
+
+        sat_xyz[system][number][epoch] = None
+
+        use_sp3 = system in CFG.sp3Systems
+
+        eph = None
+        if not use_sp3 or system == SAT_SYS_GLO:
+            eph = select_navigation_message(epoch, system, number,
+                                            self.nav_message, first_msg=True)
+
+        # the GLONASS frequency numbers are in the messages
+        if use_sp3 and self.precise_orbit is not None and \
+                (system != SAT_SYS_GLO or eph is not None):
+            sat_xyz[system][number][epoch] = \
+                self.precise_orbit.position(system, number, epoch)
 
-        if obs.ver_type.value[2] not in SUPPORTED_SYSTEMS + (SAT_SYS_MIX,):
-            msg = '{} it is not supported satellite system; skipped.'
-            msg = msg.format(obs.ver_type.value[2])
-            logger.warning(msg)
-            continue
+        if eph is None:
+            return True
 
-        # [Verbose]
-        print("done.")
-        print("- processing...")
+        dt, eph = eph
 
-        time_sys = obs.tofo.value[1]
-        if time_sys != TIME_SYS_GPS:
-            msg = "{} - system time: '{}'."
-            msg = msg.format(obs.filename, time_sys)
+        try:
+            if not use_sp3:
+                xyz = None
+                if system in self.day_orbit:
+                    xyz = self.day_orbit[system].position(system, number,
+                                                          epoch)
+                if xyz is None:
+                    xyz = self.get_sat_xyz[system](eph, dt)
+                sat_xyz[system][number][epoch] = xyz
+        except ArithmeticError as err:
+            # FIXME common thing: verbose function?
+            msg = "{}, {} - ArithmeticError: {} ({})"
+            msg = msg.format(self.nav_filename(epoch, system),
+                             filename, err, ns2datetime(epoch))
             logger.error(msg)
-            logger_error_count += 1
-            continue
+            self.error_count += 1
+            return False
+
+        # GLONASS freq
+        if system == SAT_SYS_GLO:
+            k = eph[7]
+
+            if number not in glo_freq:
+                glo_freq[number] = {}
+
+            if epoch not in glo_freq[number]:
+                glo_freq[number][epoch] = \
+                    (glonass.F1(k), glonass.F2(k), k)
+
+            # health bit
+            if eph[3] != 0:
+                msg = "{} - {} sat {}{:02d}: health bit = '{}'"
+                msg = msg.format(self.nav_filename(epoch, system),
+                                 ns2datetime(epoch), system, number, eph[3])
+                logger.info(msg)
+
+        return True
+
+    def position(self, epoch, system, number):
+        """position(epoch, system, number) -> (x, y, z) or None
+        """
+        return self.sat_xyz[system][number][epoch]
+
+
+class Station(object):
+    """Station(obs, xyz_store) -> instance
+
+    observation file(s) of a station-day: the site's position at the
+    epochs and the output of the records.
+
+    Parameters
+    ----------
+    obs : tecs.rinex.stream.ObsStream
+    xyz_store : tecs.rinex.xyzstore.XYZStore
+        coordinates of the sites
+    """
+
+    def __init__(self, obs, xyz_store):
+        logger = logging.getLogger(NAME + '.Station')
+
+        self.obs = obs
+        self.error_count = 0
 
         # initial value of the XYZ and LBH
         (x, y, z) = obs.xyz.value
-        (l, b, h) = xyz2lbh_deg(x, y, z)
+        self.xyz = (x, y, z)
+        self.lbh = xyz2lbh_deg(x, y, z)
 
-        # FIXME get into shape or remove
-        if ARGS.save_coordinates:
-            rec = '{site}; {lon}; {lat}\n'.format(
-                site=os.path.basename(obs.filename)[0:4],
-                lon=l,
-                lat=b
-            )
-            crds_file.write(rec)
-            continue
+        xyz_cur_file = find_xyz_file(obs.filename)
+        if xyz_cur_file:
+            try:
+                xyz_store.load_file(xyz_cur_file)
+            except XYZError as err:
+                logger.error(str(err))
+                sys.stderr.write('\n{}\n'.format(err))
+                raise SystemExit(1)
 
-        xyz_data = {}
-        xyz_cur_file = None
-        if xyz_files:
-            # FIXME try to find in xyz_files, not in a directory
-            xyz_cur_file = find_xyz_file(obs.filename)
-            if xyz_cur_file:
-                xyz_data = load_xyz_file(xyz_cur_file)
+        self.site_xyz = xyz_store.get(site_name(obs.filename))
 
         # data writer instance
-        writer = D_WRITER(CFG, obs)
+        self.writer = D_WRITER(CFG, obs)
 
-        writer.update_xyz(obs.tofo.value[0], (x, y, z))
-        writer.update_lbh(obs.tofo.value[0], (l, b, h))
+        # the site's frame to compute el, az
+        self._frame = None
 
-        sampling_interval = None
-        if CFG.samplingInterval:
-            if CFG.samplingInterval.total_seconds() > obs.interval.value:
-                sampling_interval = CFG.samplingInterval
-        last_epoch = None
+        # {system: VisibilityWindows or None} of the position
+        # self._visibility_xyz (see pick())
+        self._satellites = None
+        self._visibility = {}
+        self._visibility_xyz = None
+
+        # {reason: number of the records} (see DROP_REASONS)
+        self.dropped = dict((reason, 0) for reason in DROP_REASONS)
 
-        # nav message for the current obs file
-        nav_message = {}
+        self.writer.update_xyz(obs.tofo.value[0], self.xyz)
+        self.writer.update_lbh(obs.tofo.value[0], self.lbh)
 
-        record_iter = obs.read_records()
+        self.sampling_interval = None
+        if CFG.samplingInterval:
+            if CFG.samplingInterval / NS_PER_SEC > obs.interval.value:
+                self.sampling_interval = CFG.samplingInterval
+
+        self.filename_day = date2day(obs.filename_date)
+
+    def records(self, satellites=None):
+        """records(satellites=None) -> generator
+
+        the records of the supported systems of the file's date.
+
+        Parameters
+        ----------
+        satellites : Satellites, optional
+            if given (and CFG.visibilityStep), the records of the
+            satellites below the horizon are skipped without parsing
+            (see pick()).
+
+        Returns
+        -------
+        epoch : int
+        sat : str
+        rec : dict
+        approx_xyz : tuple
+            'APPROX POSITION XYZ' as of the record (the events could
+            change it)
+        """
+        logger = logging.getLogger(NAME + '.Station.records')
+
+        obs = self.obs
+
+        sat_filter = None
+        if satellites is not None and CFG.visibilityStep:
+            self._satellites = satellites
+            sat_filter = self
+
+        record_iter = obs.read_records(self.sampling_interval, sat_filter,
+                                       SUPPORTED_SYSTEMS)
         while 1:
             try:
                 epoch, sat, rec = next(record_iter)
             except StopIteration:
                 break
-            except RinexError as err:
-                msg = "%s - %s" % (o_file, str(err))
+            except (RinexError, UncompressError) as err:
+                msg = "%s - %s" % (obs.name, str(err))
                 logger.error(msg)
-                logger_error_count += 1
+                self.error_count += 1
                 continue
 
-            # [Verbose]
-            if not ARGS.quiet:
-                erase_msg = '\b' * 30
-                stdout.write(erase_msg)
-                stdout.write(str(epoch))
-                stdout.flush()
-
-            system, number = sat[0], int(sat[1:])
-            obs_date, obs_time = epoch.date(), epoch.time()
-
-            if system not in SUPPORTED_SYSTEMS:
+            if sat[0] not in SUPPORTED_SYSTEMS:
                 continue
 
-            if obs_date != obs.filename_date:
+            if epoch // NS_PER_DAY != self.filename_day:
                 msg = "{} - epoch {} does not match the file date ({})."
-                msg = msg.format(obs.filename, str(obs_date),
+                msg = msg.format(obs.name, str(ns2datetime(epoch).date()),
                                  str(obs.filename_date))
                 logger.info(msg)
                 continue
 
-            if sampling_interval:
-                if not last_epoch:
-                    last_epoch = epoch
+            if CFG.snrMask and below_snr_mask(rec, CFG.snrMask):
+                self.dropped[DROP_SNR] += 1
+                continue
 
-                if last_epoch != epoch:
-                    dt = epoch - last_epoch
-                    if dt < sampling_interval:
-                        continue
-                    last_epoch = epoch
+            yield epoch, sat, rec, obs.xyz.value
+
+    def pick(self, epoch, sat):
+        """pick(epoch, sat) -> bool
+
+        whether the satellite could be above the horizon of the site at
+        the epoch. The visibility windows of a system are found once its
+        messages are loaded, anew if the site's position changes; till
+        then, as well as for the records records() skips anyway, the
+        satellites are picked.
+
+        Parameters
+        ----------
+        epoch : int
+        sat : str
+            e.g. 'G01'
+        """
+        system = sat[0]
+        if (system not in SUPPORTED_SYSTEMS or
+                epoch // NS_PER_DAY != self.filename_day):
+            return True
+
+        if self._visibility_xyz != self.xyz:
+            self._visibility = {}
+            self._visibility_xyz = self.xyz
+
+        if system not in self._visibility:
+            if not self._satellites.loaded(system):
+                return True
+
+            windows = None
+            orbit = self._satellites.coarse_orbit(system)
+            if orbit is not None:
+                try:
+                    windows = VisibilityWindows(self.frame, orbit,
+                                                CFG.elevationMask)
+                except ArithmeticError:
+                    # the records tell about it
+                    pass
+            self._visibility[system] = windows
+
+        windows = self._visibility[system]
+        if windows is None:
+            return True
+
+        if windows.visible(system, int(sat[1:]), epoch):
+            return True
+
+        self.dropped[DROP_VISIBILITY] += 1
+        return False
+
+    def above_mask(self, el):
+        """above_mask(el) -> bool
+
+        whether the elevation is above CFG.elevationMask; the records
+        below it are counted.
+
+        Parameters
+        ----------
+        el : float
+            deg
+        """
+        if el < CFG.elevationMask:
+            self.dropped[DROP_ELEVATION] += 1
+            return False
+        return True
+
+    def update_position(self, epoch, approx_xyz):
+        """update_position(epoch, approx_xyz) -> None
+
+        site position can be changed during parsing the file via the
+        xyz files or the 'APPROX POSITION XYZ' records.
+
+        Parameters
+        ----------
+        epoch : int
+        approx_xyz : tuple
+            'APPROX POSITION XYZ' as of the record
+        """
+        logger = logging.getLogger(NAME + '.Station.update_position')
+
+        obs = self.obs
+
+        # 1) xyz files
+        position = None
+        if self.site_xyz:
+            position = self.site_xyz.lookup(epoch)
+
+        if position is not None:
+            if position[0] != self.xyz:
+                (self.xyz, self.lbh) = position
+
+                msg = '{} set xyz to {} according to the xyz-files.'
+                msg = msg.format(obs.name, position[0])
+                logger.debug(msg)
 
-            if obs_date not in nav_file:
-                nav_file[obs_date] = {}
+        # 2) 'APPROX POSITION XYZ' records
+        elif self.xyz != approx_xyz:
+            (x, y, z) = approx_xyz
+            self.xyz = (x, y, z)
+            self.lbh = xyz2lbh_deg(x, y, z)
+
+            msg = '{} set xyz to {} according to obs file properties.'
+            msg = msg.format(obs.name, approx_xyz)
+            logger.debug(msg)
+
+        if self.xyz != self.writer.xyz_latest:
+            self.writer.update_xyz(epoch, self.xyz)
+            self.writer.update_lbh(epoch, self.lbh)
+
+    @property
+    def frame(self):
+        """frame -> TopocentricFrame
+
+        the frame of the current position of the site.
+
+        Raises
+        ------
+        ArithmeticError
+        """
+        if self._frame is None or self._frame.xyz != self.xyz:
+            self._frame = TopocentricFrame(self.xyz)
+        return self._frame
+
+    def arithmetic_error(self, err, epoch, nav_name):
+        """arithmetic_error(err, epoch, nav_name) -> None
+        """
+        logger = logging.getLogger(NAME + '.Station.arithmetic_error')
+
+        msg = "{}, {} - ArithmeticError: {} ({})"
+        msg = msg.format(nav_name, self.obs.name, err, ns2datetime(epoch))
+        logger.error(msg)
+        self.error_count += 1
+
+    def end_up(self):
+        """end_up() -> None
+
+        finish the output; the numbers of the dropped records are
+        logged.
+        """
+        logger = logging.getLogger(NAME + '.Station.end_up')
+
+        self.writer.end_up()
+
+        dropped = ['{} {}'.format(self.dropped[reason], reason)
+                   for reason in DROP_REASONS if self.dropped[reason]]
+        if dropped:
+            msg = '{} - dropped records: {}.'.format(self.obs.name,
+                                                     ', '.join(dropped))
+            logger.info(msg)
+
+    def write(self, epoch, sat, rec, el, az, cur_sat_xyz, satellites):
+        """write(epoch, sat, rec, el, az, cur_sat_xyz, satellites) -> None
+
+        compute TEC and write the record.
+
+        Parameters
+        ----------
+        epoch : int
+        sat : str
+        rec : dict
+            observables
+        el, az : float
+            elevation and azimuth, deg
+        cur_sat_xyz : tuple
+            satellite's position
+        satellites : Satellites
+        """
+        logger = logging.getLogger(NAME + '.Station.write')
+
+        obs = self.obs
+        writer = self.writer
+        system, number = sat[0], int(sat[1:])
+
+        (x, y, z) = self.xyz
+        (l, b, h) = self.lbh
+
+        # satellite definition (outfile comments)
+        sat_def = sat
+
+        # GLONASS frequency channel
+        k = None
+
+        # GLONASS
+        if system == SAT_SYS_GLO:
+            k = satellites.glo_freq[number][epoch][2]
+
+            # k
+            sat_def = '%s (k = %s)' % (sat, k)
+
+        # GEO
+        elif system == SAT_SYS_GEO:
+            # PRN = PRN + 100
+            sat_def = int(sat[1:])
+            sat_def = "%s (PRN %s)" % (sat, (sat_def + 100))
+
+        coefficients = TEC_TABLE.coefficients(system, k)
+        if coefficients is None:
+            msg = '{} - Unknown satellite system.'.format(obs.name)
+            logger.info(msg)
+            return
+
+        # parsing observables
+        ds = parse_rec(rec)
+
+        # calculate TEC
+        tec_values = coefficients.record(ds)
+
+        # validity
+        if obs.VERSION < 3:
+            obs_types = obs.properties['obs types']
+        else:
+            obs_types = obs.sys_n_obs.value[system]
+
+        validity_types = []
+
+        for o_type in list(rec.keys()):
+            if rec[o_type][0]:
+                validity_types.append(o_type)
+
+        if ds[L1][1]:
+            if ds[L1][1] & 1:
+                validity_types.append('LLI1')
+        if ds[L2][1]:
+            if ds[L2][1] & 1:
+                validity_types.append('LLI2')
+        if ds[L5][1]:
+            if ds[L5][1] & 1:
+                validity_types.append('LLI5')
 
-            if system not in nav_message:
-                nav_message[system] = None
-                nav_file[obs_date][system] = None
+        try:
+            validity = eval_validity(obs_types, validity_types)
+        except LabelError as err:
+            msg = '{} - {}'.format(obs.name, str(err))
+            logger.warning(msg)
+            return
 
-                try:
-                    nm = load_navigation_message(CFG.navDir, epoch, system,
-                                                 CFG.navPriority[system])
-                except RinexError as err:
-                    logger.error(str(err))
-                    continue
-                except NMError as err:
-                    # warnings.warn(str(err))
-                    logger.warning(str(err))
-                    continue
+        # output record
+        data_chunk = (
 
-                if nm:
-                    nav_message[system] = nm.message[system]
-                    nav_file[obs_date][system] = nm.filename
-
-                del nm
-
-            # satellite XYZ
-            if system not in sat_xyz:
-                sat_xyz[system] = {}
-
-            if number not in sat_xyz[system]:
-                sat_xyz[system][number] = {}
-
-            if obs_date not in sat_xyz[system][number]:
-                sat_xyz[system][number][obs_date] = {}
-
-            if obs_time not in sat_xyz[system][number][obs_date]:
-                sat_xyz[system][number][obs_date][obs_time] = None
-                eph = select_navigation_message(epoch,
-                                                system, number,
-                                                nav_message, first_msg=True)
-                if eph is not None:
-                    dt, eph = eph
-
-                    try:
-                        sat_xyz[system][number][obs_date][obs_time] = \
-                            get_sat_xyz[system](eph, dt)
-                    except ArithmeticError as err:
-                        # FIXME common thing: verbose function?
-                        msg = "{}, {} - ArithmeticError: {} ({})"
-                        msg = msg.format(nav_file[obs_date][system],
-                                         obs.filename, err, epoch)
-                        logger.error(msg)
-                        logger_error_count += 1
-                        continue
-
-                    # GLONASS freq
-                    if system == SAT_SYS_GLO:
-                        k = eph[7]
-
-                        if number not in glo_freq:
-                            glo_freq[number] = {}
-
-                        if obs_date not in glo_freq[number]:
-                            glo_freq[number][obs_date] = {}
-
-                        if obs_time not in glo_freq[number][obs_date]:
-                            glo_freq[number][obs_date][obs_time] = \
-                                (glonass.F1(k), glonass.F2(k), k)
-
-                        # health bit
-                        if eph[3] != 0:
-                            msg = "{} - {} sat {}: health bit = '{}'"
-                            msg = msg.format(nav_file[obs_date][system],
-                                             epoch, sat, eph[3])
-                            logger.info(msg)
-
-            # site position can be changed during parsing the file via
-            # 1) xyz file
-            if xyz_data and epoch in xyz_data:
-                (x, y, z) = xyz_data[epoch]
-                (l, b, h) = xyz2lbh_deg(x, y, z)
-
-                msg = '{} set xyz to {} according to {}.'
-                msg = msg.format(obs.filename, xyz_data[epoch], xyz_cur_file)
-                logger.debug(msg)
+            epoch,
 
-            # 2) 'APPROX POSITION XYZ' records
-            elif (x, y, z) != obs.xyz.value:
-                (x, y, z) = obs.xyz.value
-                (l, b, h) = xyz2lbh_deg(x, y, z)
+            el, az,
+
+            ds[P1][0], ds[P1][1],
+            ds[P2][0], ds[P2][1],
+            tec_values.get(R_TEC_P1P2),
+
+            ds[L1][0], ds[L1][1],
+            ds[L2][0], ds[L2][1],
+            tec_values.get(R_TEC_L1L2),
+
+            validity,
+
+            ds[S1][0], ds[S1][1],
+            ds[S2][0], ds[S2][1],
+            ds[S5][0], ds[S5][1],
+
+            ds[C1][0], ds[C1][1],
+            ds[C2][0], ds[C2][1],
+
+            tec_values.get(R_TEC_C1P2),
+            tec_values.get(R_TEC_L1C1),
+
+            ds[L5][0], ds[L5][1],
+            tec_values.get(R_TEC_L1L5),
+
+            ds[C5][0], ds[C5][1],
+            tec_values.get(R_TEC_C1C5),
+
+            tec_values.get(R_TEC_L2L5),
+            tec_values.get(R_TEC_C1C2),
+            tec_values.get(R_TEC_C2C5),
+
+            cur_sat_xyz[0],
+            cur_sat_xyz[1],
+            cur_sat_xyz[2],
+
+            x,
+            y,
+            z,
+
+            l,
+            b,
+            h,
+
+            tec_values.get(R_TEC_L2L6),
+            tec_values.get(R_TEC_L2L7),
+            tec_values.get(R_TEC_L6L7),
+
+            tec_values.get(R_TEC_C2C6),
+            tec_values.get(R_TEC_C2C7),
+            tec_values.get(R_TEC_C6C7),
+            tec_values.get(R_TEC_L2C2),
+            tec_values.get(R_TEC_L8C8),
+        )
+
+        dc_len = len(data_chunk)
+        def_len = len(CFG.formatDef) - 2
+        msg = 'dc_len != def_len (CFG.formatDef)'
+        assert dc_len == def_len, msg
+
+        if sat not in writer.satellite:
+            writer.update_satellite(
+                sat,
+                sat_def=sat_def,
+                nav=satellites.nav_filename(epoch, system)
+            )
+
+        writer.write_data(sat, data_chunk)
 
-                msg = '{} set xyz to {} according to obs file properties.'
-                msg = msg.format(obs.filename, obs.xyz.value)
-                logger.debug(msg)
 
-            if (x, y, z) != writer.xyz_latest:
-                writer.update_xyz(epoch, (x, y, z))
-                writer.update_lbh(epoch, (l, b, h))
+def open_obs(o_files):
+    """open_obs(o_files) -> obs, error_count
 
-            # elevation and azimuth
-            cur_sat_xyz = sat_xyz[system][number][obs_date][obs_time]
+    Parameters
+    ----------
+    o_files : list
+        observation files of a station-day
+
+    Returns
+    -------
+    obs : tecs.rinex.stream.ObsStream
+        None if the files can't be processed.
+    error_count : int
+    """
+    logger = logging.getLogger(NAME + '.open_obs')
+
+    error_count = 0
+
+    obs = None
+    while o_files:
+        try:
+            obs = ObsStream(o_files)
+            break
+        except (RinexError, UncompressError) as err:
+            msg = "%s" % err
+            logger.error(msg)
+            error_count += 1
+            o_files = o_files[1:]
+
+    if obs is None:
+        return None, error_count
+
+    if obs.ver_type.value[2] not in SUPPORTED_SYSTEMS + (SAT_SYS_MIX,):
+        msg = '{} it is not supported satellite system; skipped.'
+        msg = msg.format(obs.ver_type.value[2])
+        logger.warning(msg)
+        return None, error_count
+
+    time_sys = obs.tofo.value[1]
+    if time_sys != TIME_SYS_GPS:
+        msg = "{} - system time: '{}'."
+        msg = msg.format(obs.name, time_sys)
+        logger.error(msg)
+        return None, error_count + 1
+
+    return obs, error_count
+
+
+def save_coordinates(obs, crds_file):
+    """save_coordinates(obs, crds_file) -> None
+    """
+    # FIXME get into shape or remove
+    (l, b, _) = xyz2lbh_deg(*obs.xyz.value)
+    rec = '{site}; {lon}; {lat}\n'.format(
+        site=os.path.basename(obs.filename)[0:4],
+        lon=l,
+        lat=b
+    )
+    crds_file.write(rec)
+
+
+def show_epoch(epoch):
+    """show_epoch(epoch) -> None
+
+    [Verbose] print the current epoch over the previous one.
+    """
+    stdout = sys.stdout
+    erase_msg = '\b' * 30
+    stdout.write(erase_msg)
+    stdout.write(str(ns2datetime(epoch)))
+    stdout.flush()
+
+
+def process_station(station, satellites):
+    """process_station(station, satellites) -> None
+
+    process the records of the station one by one.
+
+    Parameters
+    ----------
+    station : Station
+    satellites : Satellites
+    """
+    # the latest printed epoch
+    shown_epoch = None
+
+    for (epoch, sat, rec, approx_xyz) in station.records(satellites):
+        # [Verbose]
+        if not ARGS.quiet and epoch != shown_epoch:
+            shown_epoch = epoch
+            show_epoch(epoch)
+
+        system, number = sat[0], int(sat[1:])
+
+        if not satellites.load(epoch, system):
+            continue
+
+        # satellite XYZ
+        if not satellites.compute(epoch, system, number,
+                                  station.obs.name):
+            continue
+
+        station.update_position(epoch, approx_xyz)
+
+        # elevation and azimuth
+        cur_sat_xyz = satellites.position(epoch, system, number)
+        if cur_sat_xyz is None:
+            if not CFG.navIgnoreAbsence:
+                continue
+
+            if system == SAT_SYS_GLO:
+                continue
+
+            cur_sat_xyz = (0., 0., 0.)
+            el, az = 0., 0.
+
+        else:
+            try:
+                el, az = station.frame.el_az(cur_sat_xyz)
+            except ArithmeticError as err:
+                station.arithmetic_error(
+                    err, epoch, satellites.nav_filename(epoch, system))
+                continue
+
+            if not station.above_mask(el):
+                continue
+
+        station.write(epoch, sat, rec, el, az, cur_sat_xyz, satellites)
+
+
+def network_days(obs_groups):
+    """network_days(obs_groups) -> generator
+
+    the station-days grouped by the date, in the order of the dates.
+
+    Returns
+    -------
+    date : datetime.date
+    groups : list
+        observation files of the station-days
+    """
+    days = {}
+    for o_files in obs_groups:
+        date = get_rinex_date(o_files[0])
+        days.setdefault(date, []).append(o_files)
+
+    # the files of unknown date go last, separately
+    for date in sorted(d for d in days if d is not None):
+        yield date, days[date]
+
+    for o_files in days.get(None, []):
+        yield None, [o_files]
+
+
+def _numbered(i, station, satellites):
+    """_numbered(i, station, satellites) -> generator of (epoch, i, j,
+    record)
+    """
+    j = 0
+    for record in station.records(satellites):
+        yield record[0], i, j, record
+        j += 1
+
+
+def lockstep(stations, satellites=None):
+    """lockstep(stations, satellites=None) -> generator
+
+    advance the records of the stations epoch by epoch.
+
+    Parameters
+    ----------
+    stations : list
+        Station instances
+    satellites : Satellites, optional
+        see Station.records()
+
+    Returns
+    -------
+    epoch : int
+    records : list
+        [(station, (epoch, sat, rec, approx_xyz)), ...] of the epoch;
+        those of a station keep their order.
+    """
+    merged = heapq.merge(*[_numbered(i, station, satellites)
+                           for (i, station) in enumerate(stations)])
+
+    epoch = None
+    records = []
+    for (rec_epoch, i, _, record) in merged:
+        if rec_epoch != epoch:
+            if records:
+                yield epoch, records
+            epoch = rec_epoch
+            records = []
+        records.append((stations[i], record))
+
+    if records:
+        yield epoch, records
+
+
+def process_network(stations, satellites):
+    """process_network(stations, satellites) -> None
+
+    process the records of the stations of a day in one pass, epoch by
+    epoch: the satellite positions are computed once per epoch, the
+    elevations and the azimuths of all the stations at once.
+
+    Parameters
+    ----------
+    stations : list
+        Station instances of the day
+    satellites : Satellites
+    """
+    for (epoch, records) in lockstep(stations, satellites):
+        # [Verbose]
+        if not ARGS.quiet:
+            show_epoch(epoch)
+
+        # the satellites of the epoch
+        valid = []
+        for (station, (_, sat, rec, approx_xyz)) in records:
+            system, number = sat[0], int(sat[1:])
+
+            if not satellites.load(epoch, system):
+                continue
+
+            if not satellites.compute(epoch, system, number,
+                                      station.obs.name):
+                continue
+
+            station.update_position(epoch, approx_xyz)
+            valid.append((station, sat, rec))
+
+        # the positions of the satellites and the frames of the stations
+        sat_index = {}
+        station_index = {}
+        frames = []
+        for (station, sat, _) in valid:
+            sat_xyz = satellites.position(epoch, sat[0], int(sat[1:]))
+            if sat_xyz is not None and sat not in sat_index:
+                sat_index[sat] = sat_xyz
+
+            if station not in station_index:
+                try:
+                    frames.append(station.frame)
+                    station_index[station] = len(frames) - 1
+                except ArithmeticError as err:
+                    station_index[station] = err
+
+        sats = sorted(sat_index)
+        el = az = None
+        if sats and frames:
+            xyz = [sat_index[sat] for sat in sats]
+            (el, az) = el_az_matrix(frames, *zip(*xyz))
+            sat_index = dict((sat, j) for (j, sat) in enumerate(sats))
+
+        for (station, sat, rec) in valid:
+            system = sat[0]
+
+            cur_sat_xyz = satellites.position(epoch, system, int(sat[1:]))
             if cur_sat_xyz is None:
                 if not CFG.navIgnoreAbsence:
                     continue
@@ -431,278 +1398,362 @@ def main():
                     continue
 
                 cur_sat_xyz = (0., 0., 0.)
-                el, az = 0., 0.
+                (sat_el, sat_az) = (0., 0.)
 
             else:
-                try:
-                    el, az = compute_el_az((x, y, z), cur_sat_xyz)
-                except ArithmeticError as err:
-                    msg = "{}, {} - ArithmeticError: {} ({})"
-                    msg = msg.format(nav_file[obs_date][system],
-                                     obs.filename, err, epoch)
-                    logger.error(msg)
-                    logger_error_count += 1
+                i = station_index[station]
+                if isinstance(i, ArithmeticError):
+                    station.arithmetic_error(
+                        i, epoch, satellites.nav_filename(epoch, system))
                     continue
 
-            if el < 0:
-                err = "el = {} ({}, {}, {}, {}) "
-                err = err.format(el, obs.filename,
-                                 nav_file[obs_date][system],
-                                 epoch, sat)
-                logger.info(err)
-                continue
+                j = sat_index[sat]
+                (sat_el, sat_az) = (float(el[i, j]), float(az[i, j]))
 
-            # frequencies
-            f1, f2, f5, f6, f7, f8 = (None,) * 6
+                if not station.above_mask(sat_el):
+                    continue
 
-            # satellite definition (outfile comments)
-            sat_def = sat
+            station.write(epoch, sat, rec, sat_el, sat_az, cur_sat_xyz,
+                          satellites)
+
+
+def process_day(date, groups, f_num, satellites, xyz_store, crds_file=None,
+                verbose=True):
+    """process_day(date, groups, f_num, satellites, xyz_store,
+    crds_file=None, verbose=True) -> error_count
+
+    process the station-days of the date: all together in the network
+    mode, the only one otherwise.
+
+    Parameters
+    ----------
+    date : datetime.date or None
+    groups : list
+        observation files of the station-days
+    f_num : int
+        number of the first station-day (for the messages)
+    satellites : Satellites
+    xyz_store : tecs.rinex.xyzstore.XYZStore
+        coordinates of the sites
+    crds_file : file, optional
+        see --save-coordinates
+    verbose : bool
+        print the progress
+
+    Returns
+    -------
+    error_count : int
+        the errors of the satellites' positions aren't included
+    """
+    stdout = sys.stdout
+    logger_error_count = 0
 
-            # GLONASS
-            if system == SAT_SYS_GLO:
-                f1, f2, k = glo_freq[number][obs_date][obs_time]
-
-                # k
-                sat_def = '%s (k = %s)' % (sat, k)
-
-            # GPS
-            elif system == SAT_SYS_GPS:
-                f1 = gps.F1
-                f2 = gps.F2
-                f5 = gps.F5
-
-            # GEO
-            elif system == SAT_SYS_GEO:
-                f1 = geo.F1
-                f5 = geo.F5
-
-                # PRN = PRN + 100
-                sat_def = int(sat[1:])
-                sat_def = "%s (PRN %s)" % (sat, (sat_def + 100))
-
-            # BDS
-            elif system == SAT_SYS_BDS:
-                # TODO move to appropriate place
-                f2 = 1561.098 * 1e6
-                f7 = 1207.14 * 1e6
-                f6 = 1268.52 * 1e6
-
-            elif system == SAT_SYS_GAL:
-                # TODO move to appropriate place
-                f1 = 1575.42 * 1e6
-                f5 = 1176.45 * 1e6
-                f6 = 1278.75 * 1e6
-                f7 = 1207.14 * 1e6
-                # noinspection PyUnusedLocal
-                f8 = 1191.795 * 1e6
+    stations = []
 
-            else:
-                msg = '{} - Unknown satellite system.'.format(obs.filename)
-                logger.info(msg)
-                continue
+    for (i, o_files) in enumerate(groups):
+        o_file = o_files[0]
+        if len(o_files) > 1:
+            o_file = '{} (+{})'.format(o_file, len(o_files) - 1)
 
-            # parsing observables
-            ds = parse_rec(rec)
-
-            # calculate TEC
-            # - via L1&L2
-            tec_l1l2 = tec.compute_via_l(ds[L1][0], ds[L2][0], f1, f2, 0)
-
-            # - via L1&L5
-            tec_l1l5 = tec.compute_via_l(ds[L1][0], ds[L5][0], f1, f5, 0)
-
-            # - via L2&L5
-            tec_l2l5 = tec.compute_via_l(ds[L2][0], ds[L5][0], f2, f5, 0)
-
-            # L2 L6
-            tec_l2l6 = tec.compute_via_l(ds[L2][0], ds[L6][0], f2, f6, 0)
-
-            # L2 L7
-            tec_l2l7 = tec.compute_via_l(ds[L2][0], ds[L7][0], f2, f7, 0)
-
-            # L6 L7
-            tec_l6l7 = tec.compute_via_l(ds[L6][0], ds[L7][0], f6, f7, 0)
-
-            # TODO
-            # L1 L6
-            # L1 L7
-            # L1 L8
-
-            # L5 L6
-            # L5 L7
-            # L5 L8
-
-            # L6 L7
-            # L7 L8
-
-            # L7 L8
-
-            # - via P1&P2
-            tec_p1p2 = tec.compute_via_p(
-                ds[P1][0], ds[P2][0],
-                f1, f2)
-
-            # - via C1&P2
-            tec_c1p2 = tec.compute_via_p(
-                ds[C1][0], ds[P2][0],
-                f1, f2)
-
-            # - via L1&C1
-            tec_l1c1 = tec.compute_via_l1_c1(
-                ds[L1][0], ds[C1][0],
-                f1)
-
-            # - via L2&C2
-            tec_l2c2 = tec.compute_via_l1_c1(
-                ds[L2][0], ds[C2][0],
-                f2)
-            
-            # - via L8&C8
-            tec_l8c8 = tec.compute_via_l1_c1(
-                ds[L8][0], ds[C8][0],
-                f8)
-            
-            # - via C1&C5
-            tec_c1c5 = tec.compute_via_p(
-                ds[C1][0], ds[C5][0],
-                f1, f5)
-
-            # - via C1&C2
-            tec_c1c2 = tec.compute_via_p(
-                ds[C1][0], ds[C2][0],
-                f1, f2)
-
-            # - via C2&C5
-            tec_c2c5 = tec.compute_via_p(
-                ds[C2][0], ds[C5][0],
-                f2, f5)
-
-            # via C2&C6
-            tec_c2c6 = tec.compute_via_p(
-                ds[C2][0], ds[C6][0],
-                f2, f6)
-
-            # via C2&C7
-            tec_c2c7 = tec.compute_via_p(
-                ds[C2][0], ds[C7][0],
-                f2, f7)
-
-            # via C6&C7
-            tec_c6c7 = tec.compute_via_p(
-                ds[C6][0], ds[C7][0],
-                f6, f7)
-
-            # validity
-            if obs.VERSION < 3:
-                obs_types = obs.properties['obs types']
-            else:
-                obs_types = obs.sys_n_obs.value[system]
+        if verbose:
+            print("%s [%s]: " % (o_file, f_num + i))
+            stdout.flush()
 
-            validity_types = []
+            print("- reading...", end='')
+            stdout.flush()
 
-            for o_type in list(rec.keys()):
-                if rec[o_type][0]:
-                    validity_types.append(o_type)
+        # new navigation files could appear in the meantime
+        satellites.nav_index.refresh()
 
-            if ds[L1][1]:
-                if ds[L1][1] & 1:
-                    validity_types.append('LLI1')
-            if ds[L2][1]:
-                if ds[L2][1] & 1:
-                    validity_types.append('LLI2')
-            if ds[L5][1]:
-                if ds[L5][1] & 1:
-                    validity_types.append('LLI5')
+        (obs, error_count) = open_obs(o_files)
+        logger_error_count += error_count
 
-            try:
-                validity = eval_validity(obs_types, validity_types)
-            except LabelError as err:
-                msg = '{} - {}'.format(obs.filename, str(err))
-                logger.warning(msg)
-                continue
+        if obs is None:
+            continue
 
-            # output record
-            data_chunk = (
+        # [Verbose]
+        if verbose:
+            print("done.")
 
-                epoch,
+        if ARGS.save_coordinates:
+            save_coordinates(obs, crds_file)
+            continue
 
-                el, az,
+        stations.append(Station(obs, xyz_store))
+
+    if not stations:
+        return logger_error_count
+
+    # [Verbose]
+    if ARGS.network:
+        if verbose:
+            print("- processing {} ({} stations)...".format(
+                date, len(stations)))
+        satellites.start(stations[0].obs.filename_date)
+        process_network(stations, satellites)
+    else:
+        if verbose:
+            print("- processing...")
+        satellites.start(stations[0].obs.filename_date)
+        process_station(stations[0], satellites)
+
+    for station in stations:
+        station.end_up()
+        logger_error_count += station.error_count
+
+    if verbose:
+        print()
+        print('done.')
 
-                ds[P1][0], ds[P1][1],
-                ds[P2][0], ds[P2][1],
-                tec_p1p2,
+    return logger_error_count
 
-                ds[L1][0], ds[L1][1],
-                ds[L2][0], ds[L2][1],
-                tec_l1l2,
 
-                validity,
+# the tables of the worker process (see _init_worker())
+_WORKER = {}
 
-                ds[S1][0], ds[S1][1],
-                ds[S2][0], ds[S2][1],
-                ds[S5][0], ds[S5][1],
 
-                ds[C1][0], ds[C1][1],
-                ds[C2][0], ds[C2][1],
+def _init_worker(nav_store_dir, orbit_store_dir, xyz_store):
+    """_init_worker(nav_store_dir, orbit_store_dir, xyz_store) -> None
 
-                tec_c1p2,
-                tec_l1c1,
+    the worker process attaches the tables the parent has published:
+    the navigation files and the satellite positions are memory-mapped
+    from the stores and used as they are (see
+    tecs.rinex.nmutils.EphemerisIndex.from_ephemeris()), the coordinates
+    of the sites are inherited.
+    """
+    # the parent shows the progress
+    ARGS.quiet = True
 
-                ds[L5][0], ds[L5][1],
-                tec_l1l5,
+    sp3_index = None
+    if CFG.sp3Systems:
+        sp3_index = SP3Index(CFG.sp3Dir)
 
-                ds[C5][0], ds[C5][1],
-                tec_c1c5,
+    orbit_store = None
+    if orbit_store_dir:
+        orbit_store = OrbitStore(orbit_store_dir)
 
-                tec_l2l5,
-                tec_c1c2,
-                tec_c2c5,
+    _WORKER['satellites'] = Satellites(
+        NavIndex(CFG.navDir), NavCache(store=NavStore(nav_store_dir)),
+        sp3_index, orbit_store)
+    _WORKER['xyz_store'] = xyz_store
 
-                cur_sat_xyz[0],
-                cur_sat_xyz[1],
-                cur_sat_xyz[2],
 
-                x,
-                y,
-                z,
+def _process_task(task):
+    """_process_task(task) -> f_num, error_count, exit_code
 
-                l,
-                b,
-                h,
+    process_day() in the worker process.
 
-                tec_l2l6,
-                tec_l2l7,
-                tec_l6l7,
+    Parameters
+    ----------
+    task : tuple
+        (date, groups, f_num)
 
-                tec_c2c6,
-                tec_c2c7,
-                tec_c6c7,
-                tec_l2c2,
-                tec_l8c8,
-            )
+    Returns
+    -------
+    exit_code : int or None
+        the code of SystemExit if any; the parent exits with it.
+    """
+    (date, groups, f_num) = task
+    satellites = _WORKER['satellites']
+
+    sat_error_count = satellites.error_count
+    try:
+        error_count = process_day(date, groups, f_num, satellites,
+                                  _WORKER['xyz_store'], verbose=False)
+    except SystemExit as err:
+        return f_num, 0, err.code
+
+    error_count += satellites.error_count - sat_error_count
+    return f_num, error_count, None
+
+
+def process_jobs(days, satellites, xyz_store, nav_store_dir,
+                 orbit_store_dir):
+    """process_jobs(days, satellites, xyz_store, nav_store_dir,
+    orbit_store_dir) -> f_num, error_count
+
+    process the days (station-days in the usual mode) in ARGS.jobs
+    worker processes as the days are found. The read-only tables of a
+    date are published before its first task goes: the parent puts the
+    navigation files and the positions of the satellites into the
+    stores, the workers memory-map them (see _init_worker()). A worker
+    reads the ephemeris arrays in place and keeps the tuples of the
+    messages it takes only, the tables aren't copied per worker.
+
+    Parameters
+    ----------
+    days : iterable
+        (date, groups)
+    satellites : Satellites
+        the parent's one, with the stores of the workers
+    xyz_store : tecs.rinex.xyzstore.XYZStore
+    nav_store_dir, orbit_store_dir : str
+        the stores; no positions are stored if orbit_store_dir is None.
+
+    Returns
+    -------
+    f_num : int
+        number of the station-days
+    error_count : int
+    """
+    stdout = sys.stdout
+
+    # {f_num: groups} of the tasks which have gone
+    submitted = {}
+
+    def tasks():
+        """tasks() -> generator
+
+        the tasks of the days as they are found; the pool takes them in
+        its own thread.
+        """
+        f_num = 1
+        published = set()
+        for (date, groups) in days:
+            if date is not None and date not in published:
+                satellites.publish(date)
+                published.add(date)
+
+            submitted[f_num] = groups
+            yield date, groups, f_num
+            f_num += len(groups)
+
+    f_num = 0
+    error_count = 0
+
+    # the workers are forked: the tables of the parent aren't pickled
+    context = multiprocessing
+    if hasattr(multiprocessing, 'get_context'):
+        context = multiprocessing.get_context('fork')
+
+    pool = context.Pool(ARGS.jobs, _init_worker,
+                        (nav_store_dir, orbit_store_dir, xyz_store))
+    try:
+        for (num, count, exit_code) in pool.imap_unordered(_process_task,
+                                                           tasks()):
+            if exit_code is not None:
+                raise SystemExit(exit_code)
+
+            error_count += count
+            groups = submitted.pop(num)
+            f_num += len(groups)
+            for (i, o_files) in enumerate(groups):
+                print('{} [{}]: done.'.format(o_files[0], num + i))
+            stdout.flush()
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
 
-            dc_len = len(data_chunk)
-            def_len = len(CFG.formatDef) - 2
-            msg = 'dc_len != def_len (CFG.formatDef)'
-            assert dc_len == def_len, msg
+    return f_num, error_count
+
+
+def main():
+    """main()
+    """
+    logger = logging.getLogger(NAME + '.main')
+    logger_error_count = 0
 
-            if sat not in writer.satellite:
-                writer.update_satellite(
-                    sat,
-                    sat_def=sat_def,
-                    nav=nav_file[obs_date][system]
-                )
+    date_range = None
+    if ARGS.date_from or ARGS.date_to:
+        date_range = (ARGS.date_from or datetime.date.min,
+                      ARGS.date_to or datetime.date.max)
+
+    # sub-daily files of a station-day are processed together
+    if ARGS.files_from:
+        obs_groups = listed_obs_groups(ARGS.files_from, date_range)
+    else:
+        obs_groups = find_obs_groups(CFG.obsDir, date_range)
+
+    # the worker processes share the tables through the stores, the
+    # temporary ones unless they are set
+    jobs_dir = None
+    nav_store_dir = CFG.navStoreDir
+    orbit_store_dir = CFG.orbitStoreDir
+    if ARGS.jobs > 1 and not hasattr(os, 'fork'):
+        logger.warning('--jobs needs fork(); the files are processed '
+                       'one by one.')
+    elif ARGS.jobs > 1 and not ARGS.save_coordinates:
+        jobs_dir = tempfile.mkdtemp(prefix='tecs-', dir=CFG.outDir)
+        if not nav_store_dir:
+            nav_store_dir = os.path.join(jobs_dir, 'nav')
+        if not orbit_store_dir and CFG.orbitGridStep:
+            orbit_store_dir = os.path.join(jobs_dir, 'orbits')
+
+    # parsed navigation files (a mixed one serves all the systems)
+    nav_store = None
+    if nav_store_dir:
+        nav_store = NavStore(nav_store_dir)
+    nav_cache = NavCache(store=nav_store)
+
+    # navigation files of the navDir directories
+    nav_index = NavIndex(CFG.navDir)
+
+    # the precise orbits (SP3) instead of the broadcast ones
+    sp3_index = None
+    if CFG.sp3Systems:
+        sp3_index = SP3Index(CFG.sp3Dir)
+
+    # the daily positions computed once and kept on disk
+    orbit_store = None
+    if orbit_store_dir:
+        orbit_store = OrbitStore(orbit_store_dir)
+
+    satellites = Satellites(nav_index, nav_cache, sp3_index, orbit_store)
+
+    # coordinates of the sites
+    xyz_store = XYZStore()
+    if CFG.xyzPath:
+        try:
+            xyz_store.load(CFG.xyzPath)
+        except XYZError as err:
+            logger.error(str(err))
+            sys.stderr.write('{}\n'.format(err))
+            raise SystemExit(1)
 
-            writer.write_data(sat, data_chunk)
+    # FIXME get into shape or remove
+    coordinates_filename = 'coordinates.txt'
+    crds_file = None
+    if ARGS.save_coordinates:
+        crds_file = open(coordinates_filename, 'w')
 
-        writer.end_up()
+    # the stations of a day are processed together in the network mode
+    if ARGS.network:
+        days = network_days(obs_groups)
+    else:
+        days = ((get_rinex_date(o_files[0]), [o_files])
+                for o_files in obs_groups)
 
-        print()
-        print('done.')
+    if jobs_dir:
+        try:
+            (f_num, error_count) = process_jobs(
+                days, satellites, xyz_store, nav_store_dir, orbit_store_dir)
+        finally:
+            shutil.rmtree(jobs_dir, ignore_errors=True)
+        logger_error_count += error_count
+    else:
+        f_num = 0
+        for (date, groups) in days:
+            logger_error_count += process_day(date, groups, f_num + 1,
+                                              satellites, xyz_store,
+                                              crds_file)
+            f_num += len(groups)
+
+    logger_error_count += satellites.error_count
 
     if crds_file:
         crds_file.close()
 
+    if not f_num:
+        if ARGS.files_from:
+            msg = "Can't find any observation file in '%s'." % ARGS.files_from
+        else:
+            msg = "Can't find any observation file in '%s'." % CFG.obsDir
+        print(msg)
+
     return logger_error_count
 
 
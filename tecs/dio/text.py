@@ -36,6 +36,7 @@ import re
 
 import tecs.label
 from tecs import dio
+from tecs.rinex.common import ns2datetime, NS_PER_SEC, NS_PER_DAY
 
 EXT = dio.OUT_EXT[tecs.label.OUT_FILE_TEXT]
 NAME = 'tecs.dio.text'
@@ -53,8 +54,8 @@ class Text(object):
     ----------
     cfg : tecs.gtb.config.Cfg
         configuration data
-    obs : tecs.rinex.o.Obs
-        an observation file
+    obs : tecs.rinex.stream.ObsStream
+        the observation files of a station-day
     """
 
     def __init__(self, cfg, obs):
@@ -67,7 +68,7 @@ class Text(object):
 
         self.sampling_interval = 0.
         if cfg.samplingInterval:
-            self.sampling_interval = cfg.samplingInterval.total_seconds()
+            self.sampling_interval = cfg.samplingInterval / NS_PER_SEC
 
         if self.interval > self.sampling_interval:
             self.sampling_interval = '{} (not used).'.format(
@@ -84,6 +85,10 @@ class Text(object):
         # output path
         self.path = None
 
+        # the latest epoch and its datetime string
+        self._epoch = None
+        self._epoch_str = None
+
     def write_data(self, sat, chunk):
         """write_data(sat, chunk) -> None
 
@@ -94,30 +99,33 @@ class Text(object):
         sat : str
             satellite
         chunk : tuple
-            list of values to write
+            list of values to write; chunk[0] is the epoch, ns since the
+            start of the GPS time.
         """
         logger = logging.getLogger(NAME + '.write_data')
 
-        # outfile name
-        marker = os.path.basename(self.obs.filename)[0:4]
         epoch = chunk[0]
 
-        year = epoch.strftime('%Y')
-        yday = epoch.strftime('%j')
+        # new file
+        if not self.satellite[sat]['fobj']:
+            # outfile name
+            marker = os.path.basename(self.obs.filename)[0:4]
 
-        if not self.path:
-            path = os.path.join(self.cfg.outDir, year, yday, marker)
-            self.set_path(path)
+            date = ns2datetime(epoch)
+            year = date.strftime('%Y')
+            yday = date.strftime('%j')
 
-            if not os.path.exists(self.path):
-                os.makedirs(self.path)
+            if not self.path:
+                path = os.path.join(self.cfg.outDir, year, yday, marker)
+                self.set_path(path)
 
-        # - the name
-        f_out = '%s_%s_%s_%s.%s' % (marker, sat, yday, year[2:], EXT)
-        f_out = os.path.join(self.path, f_out)
+                if not os.path.exists(self.path):
+                    os.makedirs(self.path)
+
+            # - the name
+            f_out = '%s_%s_%s_%s.%s' % (marker, sat, yday, year[2:], EXT)
+            f_out = os.path.join(self.path, f_out)
 
-        # new file
-        if not self.satellite[sat]['fobj']:
             f_obj = open(f_out, 'wt')
 
             self.update_satellite(sat, fout=f_out)
@@ -127,7 +135,7 @@ class Text(object):
             creation_time = creation_time.strftime('%Y-%m-%d %H:%M:%S %Z')
 
             sources = '{}, {}'.format(
-                self.obs.filename,
+                ', '.join(self.obs.filenames),
                 (self.satellite[sat]['nav'] or 'None')
             )
 
@@ -169,12 +177,16 @@ class Text(object):
         rec = None
         try:
             # format the date
-            cur_datetime = epoch.strftime(self.cfg.datetimeFormat)
-            cur_time = epoch.time()
+            if epoch != self._epoch:
+                self._epoch_str = ns2datetime(epoch).strftime(
+                    self.cfg.datetimeFormat)
+                self._epoch = epoch
+            cur_datetime = self._epoch_str
+
+            # seconds since the start of the day
+            cur_time = epoch % NS_PER_DAY / NS_PER_SEC
 
-            tsn = ((cur_time.hour * 3600 + cur_time.minute * 60
-                    + cur_time.second + cur_time.microsecond * 1e-06) /
-                   self.interval)
+            tsn = cur_time / self.interval
 
             # tsn must be int
             frac = tsn - int(tsn)
@@ -186,10 +198,7 @@ class Text(object):
 
             tsn = int(tsn)
 
-            hour = (
-                ((cur_time.microsecond * 1e-6
-                  + cur_time.second) / 60.
-                 + cur_time.minute) / 60. + cur_time.hour)
+            hour = cur_time / 3600.
 
             vals = [tsn, hour, cur_datetime] + vals
             rec = self.cfg.recFormat.format(*vals)
@@ -210,7 +219,7 @@ class Text(object):
         for sat in self.satellite:
             if self.satellite[sat]['fobj'] is None:
                 msg = '{}: data handling of the {} satellite was skipped.'
-                msg = msg.format(self.obs.filename, sat)
+                msg = msg.format(self.obs.name, sat)
                 logger.warning(msg)
             else:
                 self.satellite[sat]['fobj'].close()
@@ -249,7 +258,7 @@ class Text(object):
 
         if epoch in self.xyz:
             msg = 'Duplicate XYZ value: {}, {}, {}.'
-            msg = msg.format(self.obs.filename, epoch, xyz)
+            msg = msg.format(self.obs.name, ns2datetime(epoch), xyz)
             logger.info(msg)
 
         self.xyz[epoch] = xyz
@@ -261,7 +270,7 @@ class Text(object):
 
         if epoch in self.lbh:
             msg = 'Duplicate lbh value: {}, {}, {}.'
-            msg = msg.format(self.obs.filename, epoch, lbh)
+            msg = msg.format(self.obs.name, ns2datetime(epoch), lbh)
             logger.info(msg)
 
         self.lbh[epoch] = lbh
@@ -33,7 +33,7 @@ import os.path
 import re
 
 from tecs.config import Configuration
-from tecs.rinex.common import sec2sec_ms
+from tecs.rinex.common import NS_PER_SEC
 from tecs.rinex.futils import get_dir_list
 from tecs.label import R_DATETIME, R_ELEVATION, R_AZIMUTH, R_TEC_L1L2, R_ALL
 from tecs.label import R_VALIDITY, OUT_FILE_TEXT
@@ -59,6 +59,16 @@ DEFAULTS = dict(
     navPriorityGEO=[],
     samplingInterval=0,
     navIgnoreAbsence=False,
+    navStoreDir='',
+    xyzPath='',
+    orbitGridStep=300.,
+    orbitGridOrder=9,
+    orbitStoreDir='',
+    sp3Dir='',
+    sp3Systems='',
+    visibilityStep=600.,
+    elevationMask=0.,
+    snrMask=0.,
     elNanValue=-9999.,
     azNanValue=-9999.,
     outFileMode=OUT_FILE_TEXT,
@@ -112,6 +122,16 @@ class Cfg(Configuration, Rec):
         }
 
         self.navIgnoreAbsence = None
+        self.navStoreDir = None
+        self.xyzPath = None
+        self.orbitGridStep = None
+        self.orbitGridOrder = None
+        self.orbitStoreDir = None
+        self.sp3Dir = None
+        self.sp3Systems = None
+        self.visibilityStep = None
+        self.elevationMask = None
+        self.snrMask = None
         self.elNanValue = None
         self.azNanValue = None
 
@@ -191,16 +211,58 @@ class Cfg(Configuration, Rec):
 
         self.navIgnoreAbsence = self._get_bool(self.navIgnoreAbsence)
 
+        if self.navStoreDir:
+            self.navStoreDir = self._get_path(self.navStoreDir)
+
+        if self.xyzPath:
+            self.xyzPath = self._get_path(self.xyzPath)
+
         self.logFile = os.path.join(self.outDir, self.logFile)
 
-        si = float(self.samplingInterval)
-        si_sec, si_microseconds = sec2sec_ms(si)
+        self.orbitGridStep = float(self.orbitGridStep)
+        if self.orbitGridStep < 0:
+            err = 'orbitGridStep = {}; orbitGridStep should be >= 0.'
+            raise CfgError(err.format(self.orbitGridStep))
+
+        self.orbitGridOrder = int(self.orbitGridOrder)
+        if self.orbitGridOrder < 1:
+            err = "orbitGridOrder = {}; orbitGridOrder should be >= 1."
+            raise CfgError(err.format(self.orbitGridOrder))
+
+        if self.orbitStoreDir:
+            self.orbitStoreDir = self._get_path(self.orbitStoreDir)
+            if not self.orbitGridStep:
+                err = 'orbitStoreDir = {}; orbitGridStep should be > 0.'
+                raise CfgError(err.format(self.orbitStoreDir))
+
+        # the systems of the positions from the SP3 files
+        self.sp3Dir = get_dir_list(self.sp3Dir) if self.sp3Dir else []
+        self.sp3Systems = re.sub(r'\s+', '', self.sp3Systems).upper()
+        self.sp3Systems = tuple(s for s in self.sp3Systems.split(',') if s)
+        if self.sp3Systems and not self.sp3Dir:
+            err = 'sp3Systems = {}; sp3Dir should be set.'
+            raise CfgError(err.format(', '.join(self.sp3Systems)))
+
+        self.visibilityStep = float(self.visibilityStep)
+        if self.visibilityStep < 0:
+            err = 'visibilityStep = {}; visibilityStep should be >= 0.'
+            raise CfgError(err.format(self.visibilityStep))
+
+        # the records below the masks are dropped
+        self.elevationMask = float(self.elevationMask)
+        if not -90 <= self.elevationMask <= 90:
+            err = 'elevationMask = {}; elevationMask should be in [-90, 90].'
+            raise CfgError(err.format(self.elevationMask))
+
+        self.snrMask = float(self.snrMask)
+        if self.snrMask < 0:
+            err = 'snrMask = {}; snrMask should be >= 0.'
+            raise CfgError(err.format(self.snrMask))
+
+        # nanoseconds
+        si = int(round(float(self.samplingInterval) * NS_PER_SEC))
         if si:
-            self.samplingInterval = datetime.timedelta(
-                days=0,
-                seconds=si_sec,
-                microseconds=si_microseconds
-            )
+            self.samplingInterval = si
         else:
             self.samplingInterval = None
 
@@ -30,13 +30,11 @@ import logging
 
 import tecs.gtb.config
 import tecs.label as lbl
+from tecs.gtb.tectable import C, tec_factor
 
 NAME = 'tecs.gtb.tec'
 LOGGER = logging.getLogger(NAME)
 
-# speed of light, m/s
-C = 299792458
-
 CFG = tecs.gtb.config.CFG
 
 # TEC values to calculate (according to the CFG)
@@ -50,24 +48,6 @@ TEC_L = (lbl.R_TEC_L1L2, lbl.R_TEC_L1L5, lbl.R_TEC_L2L5,
          lbl.R_TEC_L2L6, lbl.R_TEC_L2L7, lbl.R_TEC_L6L7)
 
 
-def tec_factor(f1, f2):
-    """tec_factor(f1, f2) -> the factor
-
-    TEC factor to calculate TEC, TECU.
-
-    Parameters
-    ----------
-    f1 : float
-    f2 : float
-
-    Returns
-    -------
-    factor : float
-
-    """
-    return 1 / 40.308 * (f1 ** 2 * f2 ** 2) / (f1 ** 2 - f2 ** 2) * 1.0e-16
-
-
 # noinspection PyUnusedLocal
 def plug_func(*args, **kwargs):
     return None
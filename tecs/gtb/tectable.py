@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: tectable.py
+Description: TEC combinations with the coefficients precomputed per
+satellite system (and GLONASS frequency channel)
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from builtins import object
+
+import numpy as np
+
+import tecs.label as lbl
+from tecs.rinex.label import C1, C2, C5, C6, C7, C8, P1, P2, \
+    L1, L2, L5, L6, L7, L8, SAT_SYS_GPS, SAT_SYS_GLO, SAT_SYS_GEO, \
+    SAT_SYS_BDS, SAT_SYS_GAL
+from tecs.sat import gps, geo, glonass
+
+NAME = 'tecs.gtb.tectable'
+
+# speed of light, m/s
+C = 299792458
+
+# kinds of the combinations
+PHASE = 'phase'
+CODE = 'code'
+CODE_PHASE = 'code-phase'
+
+# (label, kind, first observable, second observable, first band,
+#  second band)
+COMBINATIONS = (
+    (lbl.R_TEC_L1L2, PHASE, L1, L2, 1, 2),
+    (lbl.R_TEC_L1L5, PHASE, L1, L5, 1, 5),
+    (lbl.R_TEC_L2L5, PHASE, L2, L5, 2, 5),
+    (lbl.R_TEC_L2L6, PHASE, L2, L6, 2, 6),
+    (lbl.R_TEC_L2L7, PHASE, L2, L7, 2, 7),
+    (lbl.R_TEC_L6L7, PHASE, L6, L7, 6, 7),
+
+    (lbl.R_TEC_P1P2, CODE, P1, P2, 1, 2),
+    (lbl.R_TEC_C1P2, CODE, C1, P2, 1, 2),
+    (lbl.R_TEC_C1C5, CODE, C1, C5, 1, 5),
+    (lbl.R_TEC_C1C2, CODE, C1, C2, 1, 2),
+    (lbl.R_TEC_C2C5, CODE, C2, C5, 2, 5),
+    (lbl.R_TEC_C2C6, CODE, C2, C6, 2, 6),
+    (lbl.R_TEC_C2C7, CODE, C2, C7, 2, 7),
+    (lbl.R_TEC_C6C7, CODE, C6, C7, 6, 7),
+
+    (lbl.R_TEC_L1C1, CODE_PHASE, L1, C1, 1, 1),
+    (lbl.R_TEC_L2C2, CODE_PHASE, L2, C2, 2, 2),
+    (lbl.R_TEC_L8C8, CODE_PHASE, L8, C8, 8, 8),
+)
+
+# frequencies of the bands, Hz
+FREQUENCIES = {
+    SAT_SYS_GPS: {1: gps.F1, 2: gps.F2, 5: gps.F5},
+    SAT_SYS_GEO: {1: geo.F1, 5: geo.F5},
+    SAT_SYS_BDS: {2: 1561.098 * 1e6, 6: 1268.52 * 1e6, 7: 1207.14 * 1e6},
+    SAT_SYS_GAL: {1: 1575.42 * 1e6, 5: 1176.45 * 1e6, 6: 1278.75 * 1e6,
+                  7: 1207.14 * 1e6, 8: 1191.795 * 1e6},
+}
+
+# GLONASS frequency channels
+GLO_CHANNELS = tuple(range(-7, 7))
+
+
+def tec_factor(f1, f2):
+    """tec_factor(f1, f2) -> the factor
+
+    TEC factor to calculate TEC, TECU.
+
+    Parameters
+    ----------
+    f1 : float
+    f2 : float
+
+    Returns
+    -------
+    factor : float
+
+    """
+    return 1 / 40.308 * (f1 ** 2 * f2 ** 2) / (f1 ** 2 - f2 ** 2) * 1.0e-16
+
+
+def glo_frequencies(k):
+    """glo_frequencies(k) -> {band: frequency}
+
+    Parameters
+    ----------
+    k : int
+        frequency channel
+    """
+    return {1: glonass.F1(k), 2: glonass.F2(k)}
+
+
+def combine(kind, coefficients, first, second):
+    """combine(kind, coefficients, first, second) -> tec
+
+    the combination of the observables; they could be floats or arrays.
+
+    Parameters
+    ----------
+    kind : str
+        PHASE, CODE or CODE_PHASE
+    coefficients : tuple
+        see TecCoefficients
+    first : float or numpy.ndarray
+        phase (PHASE, CODE_PHASE) or pseudorange (CODE) values
+    second : float or numpy.ndarray
+        phase (PHASE) or pseudorange (CODE, CODE_PHASE) values
+
+    Returns
+    -------
+    tec : float or numpy.ndarray
+        TECU
+    """
+    if kind == PHASE:
+        # c/f = λ
+        (factor, lambda1, lambda2) = coefficients
+        return factor * (lambda1 * first - lambda2 * second)
+
+    if kind == CODE:
+        (factor,) = coefficients
+        return factor * (second - first)
+
+    (factor, f1) = coefficients
+    return factor * (second - first * C / f1) * 1.0e-16
+
+
+class TecCoefficients(object):
+    """TecCoefficients(frequencies, labels=tecs.label.R_TEC_ALL) -> instance
+
+    the coefficients of the TEC combinations of a set of frequencies;
+    the combinations of the absent frequencies are left out.
+
+    Attributes
+    ----------
+    terms : list
+        [(label, kind, first observable, second observable,
+        coefficients), ...]
+
+    Parameters
+    ----------
+    frequencies : dict
+        {band: frequency, Hz}
+    labels : sequence
+        the combinations to calculate (tecs.label.R_TEC_*)
+    """
+
+    def __init__(self, frequencies, labels=lbl.R_TEC_ALL):
+        self.terms = []
+
+        for (label, kind, first, second, band1, band2) in COMBINATIONS:
+            if label not in labels:
+                continue
+
+            f1 = frequencies.get(band1)
+            f2 = frequencies.get(band2)
+            if not f1 or not f2:
+                continue
+
+            if kind == PHASE:
+                coefficients = (tec_factor(f1, f2), C / f1, C / f2)
+            elif kind == CODE:
+                coefficients = (tec_factor(f1, f2),)
+            else:
+                coefficients = (0.5 * f1 ** 2 / 40.308, f1)
+
+            self.terms.append((label, kind, first, second, coefficients))
+
+    def record(self, datum):
+        """record(datum) -> {label: tec}
+
+        the combinations of an observation record; those with an absent
+        (or zero) observable are left out.
+
+        Parameters
+        ----------
+        datum : dict
+            {obs type: (obs value, LLI, signal strength), ...}, see
+            tecs.gtb.tools.parse_rec()
+        """
+        tec = {}
+        for (label, kind, first, second, coefficients) in self.terms:
+            value1 = datum[first][0]
+            value2 = datum[second][0]
+            if value1 and value2:
+                tec[label] = combine(kind, coefficients, value1, value2)
+        return tec
+
+    def evaluate(self, observations):
+        """evaluate(observations) -> {label: numpy.ndarray}
+
+        the combinations over the arrays of the observations.
+
+        Parameters
+        ----------
+        observations : dict
+            {obs type: array-like}, e.g. {tecs.rinex.label.L1: ...}; nan
+            (or zero) where the value is absent
+
+        Returns
+        -------
+        tec : dict
+            nan where an observable is absent; the combinations of the
+            absent observation types are left out.
+        """
+        tec = {}
+        for (label, kind, first, second, coefficients) in self.terms:
+            if first not in observations or second not in observations:
+                continue
+
+            value1 = np.asarray(observations[first], dtype=float)
+            value2 = np.asarray(observations[second], dtype=float)
+
+            with np.errstate(invalid='ignore'):
+                values = combine(kind, coefficients, value1, value2)
+            tec[label] = np.where((value1 == 0) | (value2 == 0), np.nan,
+                                  values)
+        return tec
+
+
+class TecTable(object):
+    """TecTable(labels=tecs.label.R_TEC_ALL) -> instance
+
+    the coefficients of the TEC combinations per satellite system; the
+    GLONASS ones per frequency channel.
+
+    Parameters
+    ----------
+    labels : sequence
+        the combinations to calculate (tecs.label.R_TEC_*)
+    """
+
+    def __init__(self, labels=lbl.R_TEC_ALL):
+        self.labels = tuple(labels)
+        # {(system, k): TecCoefficients}
+        self._coefficients = {}
+
+        for system in FREQUENCIES:
+            self._coefficients[(system, None)] = TecCoefficients(
+                FREQUENCIES[system], self.labels)
+
+        for k in GLO_CHANNELS:
+            self._coefficients[(SAT_SYS_GLO, k)] = TecCoefficients(
+                glo_frequencies(k), self.labels)
+
+    def coefficients(self, system, k=None):
+        """coefficients(system, k=None) -> TecCoefficients or None
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        k : int, optional
+            GLONASS frequency channel
+
+        Returns
+        -------
+        coefficients : TecCoefficients
+            None if the system is unknown.
+        """
+        if system != SAT_SYS_GLO:
+            return self._coefficients.get((system, None))
+
+        if k is None:
+            return None
+
+        key = (system, k)
+        if key not in self._coefficients:
+            self._coefficients[key] = TecCoefficients(glo_frequencies(k),
+                                                      self.labels)
+        return self._coefficients[key]
+
+    def evaluate(self, system, observations, channels=None):
+        """evaluate(system, observations, channels=None) -> {label:
+        numpy.ndarray}
+
+        the combinations over the arrays of the observations of the
+        system's satellites.
+
+        Parameters
+        ----------
+        system : str
+        observations : dict
+            see TecCoefficients.evaluate()
+        channels : array-like, optional
+            GLONASS frequency channels of the observations
+
+        Returns
+        -------
+        tec : dict
+            empty if the system (or a channel) is unknown.
+        """
+        if system != SAT_SYS_GLO:
+            coefficients = self.coefficients(system)
+            if coefficients is None:
+                return {}
+            return coefficients.evaluate(observations)
+
+        if channels is None:
+            return {}
+
+        channels = np.asarray(channels)
+        observations = dict((o_type, np.asarray(values, dtype=float))
+                            for (o_type, values) in observations.items())
+
+        tec = {}
+        for k in np.unique(channels).tolist():
+            selected = channels == k
+            values = self.coefficients(system, k).evaluate(
+                dict((o_type, observations[o_type][selected])
+                     for o_type in observations))
+
+            for (label, column) in values.items():
+                if label not in tec:
+                    tec[label] = np.full(channels.shape, np.nan)
+                tec[label][selected] = column
+        return tec
@@ -27,7 +27,7 @@ from __future__ import unicode_literals
 
 # import sys
 # from tecs.rinex import label
-from tecs.rinex.label import OBS_TYPE_LABELS
+from tecs.rinex.label import OBS_TYPE_LABELS, S1, S2
 
 NAME = 'tecs.gtb.tools'
 
@@ -63,6 +63,38 @@ def parse_rec(rec):
     return datum
 
 
+def snr_value(rec, o_types):
+    """snr_value(rec, o_types) -> value or None
+
+    the value of the first (in the order of the names) observable of the
+    `o_types` in the record, as parse_rec() takes it.
+
+    Parameters
+    ----------
+    rec : dict
+        an observation record
+    o_types : tuple
+        e.g. tecs.rinex.label.S1
+    """
+    for o_type in sorted(rec):
+        if o_type in o_types:
+            return rec[o_type][0]
+    return None
+
+
+def below_snr_mask(rec, mask):
+    """below_snr_mask(rec, mask) -> bool
+
+    whether S1 or S2 of the record is below the mask; the missing values
+    aren't.
+    """
+    for o_types in (S1, S2):
+        value = snr_value(rec, o_types)
+        if value and value < mask:
+            return True
+    return False
+
+
 # def ask(yes=False, msg=None):
 #     """ask(yes=False, msg=None) -> True or raise SystemExit
 #
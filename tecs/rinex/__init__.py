@@ -24,11 +24,15 @@ rinex
 from __future__ import unicode_literals
 
 from tecs.rinex.basic import RinexError
-from tecs.rinex.futils import RE_VER, GZIP, CRX2RNX, expand_obs, expand_nav
+from tecs.rinex.crx import crx_version
+from tecs.rinex.futils import RE_VER, expand_obs, expand_nav
 from tecs.rinex.header import RinexVersionType
 
 from tecs.rinex.v2.o import Obs2, Obs21, Obs211
+from tecs.rinex.v2.o import CompactObs2, CompactObs21, CompactObs211
 from tecs.rinex.v3.o import Obs3, Obs301, Obs302, Obs303
+from tecs.rinex.v3.o import CompactObs3, CompactObs301, CompactObs302, \
+    CompactObs303
 
 from tecs.rinex.v2.n import Nav2, Nav21, Nav211
 from tecs.rinex.v3.n import Nav3, Nav301, Nav302, Nav303
@@ -49,6 +53,13 @@ def obs_file(filename):
     f_obj = expand_obs(filename)
 
     ver_line = f_obj.readline()
+
+    # Hatanaka-compressed: RINEX VERSION / TYPE follows CRINEX records
+    compact = crx_version(ver_line)
+    if compact is not None:
+        f_obj.readline()
+        ver_line = f_obj.readline()
+
     ver_line = ver_line.rstrip()
     match = RE_VER.match(ver_line)
 
@@ -72,6 +83,17 @@ def obs_file(filename):
         3.03: Obs303
     }
 
+    if compact is not None:
+        rnx_cls = {
+            2.00: CompactObs2,
+            2.10: CompactObs21,
+            2.11: CompactObs211,
+            3.00: CompactObs3,
+            3.01: CompactObs301,
+            3.02: CompactObs302,
+            3.03: CompactObs303
+        }
+
     if rinex_version in rnx_cls:
         return rnx_cls[rinex_version](f_obj, filename)
     else:
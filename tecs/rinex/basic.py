@@ -28,6 +28,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from builtins import next
 from builtins import object
+from itertools import islice
 
 from tecs.rinex.futils import get_rinex_date
 
@@ -118,6 +119,29 @@ class Rinex(object):
 
         return rec
 
+    def _skip_recs(self, f_obj, num):
+        """_skip_recs(f_obj, num) -> None
+
+        skips next `num` lines of the file without parsing them.
+
+        Parameters
+        ----------
+        f_obj : file-like object
+        num : int
+        """
+        skipped = sum(1 for _ in islice(f_obj, num))
+
+        if skipped != num:
+            msg = "unexpected end of the file."
+            raise RinexError(self.filename, msg)
+
+    def close(self):
+        """close() -> None
+
+        close the file.
+        """
+        self._fobj.close()
+
 
 class ObservationData(Rinex):
     def __init__(self, f_obj, filename):
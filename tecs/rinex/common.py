@@ -27,6 +27,189 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import datetime
+from builtins import object
+
+# origin of the internal time scale: the start of the GPS time
+GPS_EPOCH = datetime.datetime(1980, 1, 6)
+_GPS_EPOCH_ORDINAL = GPS_EPOCH.toordinal()
+
+NS_PER_SEC = 10 ** 9
+NS_PER_DAY = 24 * 60 * 60 * NS_PER_SEC
+NS_PER_WEEK = 7 * NS_PER_DAY
+
+# (year, month, day) -> day index
+_DAY_INDEX = {}
+
+
+def day_index(year, month, day):
+    """day_index(year, month, day) -> index
+
+    Parameters
+    ----------
+    year : int
+    month : int
+    day : int
+
+    Returns
+    -------
+    index : int
+        amount of days since the start of the GPS time.
+    """
+    key = (year, month, day)
+    try:
+        return _DAY_INDEX[key]
+    except KeyError:
+        index = datetime.date(year, month, day).toordinal()
+        index -= _GPS_EPOCH_ORDINAL
+        _DAY_INDEX[key] = index
+        return index
+
+
+def epoch2ns(epoch):
+    """epoch2ns(epoch) -> ns
+
+    converts the epoch components into the internal time representation.
+    Does the same checks as `validate_epoch`: YY -> YYYY, minutes and
+    seconds values in [60, 120] are carried over.
+
+    Parameters
+    ----------
+    epoch : list
+        epoch = [year, month, day, hour, min, nanosec], with nanosec is the
+        amount of nanoseconds since the start of the minute.
+
+    Returns
+    -------
+    ns : int
+        amount of nanoseconds since the start of the GPS time.
+    """
+    year, month, day, hour, minute, nanosec = epoch
+
+    # YY -> YYYY
+    if year < 100:
+        if year >= 89:
+            year += 1900
+        else:
+            year += 2000
+
+    if not 0 <= hour <= 23:
+        raise ValueError('hour must be in 0..23')
+
+    if not 0 <= minute <= 120:
+        raise ValueError('minute must be in 0..120')
+
+    if not 0 <= nanosec < 121 * NS_PER_SEC:
+        raise ValueError('second must be in 0..120')
+
+    ns = day_index(year, month, day) * 24 + hour
+    ns = (ns * 60 + minute) * 60 * NS_PER_SEC
+
+    return ns + nanosec
+
+
+def sec2ns(sec):
+    """sec2ns(sec) -> ns
+
+    converts a decimal string of seconds into nanoseconds without
+    a float round-trip; digits beyond nanoseconds are dropped.
+
+    Parameters
+    ----------
+    sec : str
+        e.g. ' 30.0000000', '-.123456789012'
+
+    Returns
+    -------
+    ns : int
+    """
+    sec = sec.strip()
+
+    sign = 1
+    if sec and sec[0] in '-+':
+        if sec[0] == '-':
+            sign = -1
+        sec = sec[1:]
+
+    whole, _, frac = sec.partition('.')
+    if not whole and not frac:
+        raise ValueError("can't convert '{}' to seconds".format(sec))
+
+    if not (whole or '0').isdigit() or not (frac or '0').isdigit():
+        raise ValueError("can't convert '{}' to seconds".format(sec))
+
+    ns = int(whole or 0) * NS_PER_SEC + int((frac + '0' * 9)[:9])
+
+    return sign * ns
+
+
+def datetime2ns(epoch):
+    """datetime2ns(epoch) -> ns
+
+    Parameters
+    ----------
+    epoch : datetime.date or datetime.datetime
+
+    Returns
+    -------
+    ns : int
+        amount of nanoseconds since the start of the GPS time.
+    """
+    ns = (epoch.toordinal() - _GPS_EPOCH_ORDINAL) * NS_PER_DAY
+
+    if isinstance(epoch, datetime.datetime):
+        sec = (epoch.hour * 60 + epoch.minute) * 60 + epoch.second
+        ns += sec * NS_PER_SEC + epoch.microsecond * 1000
+
+    return ns
+
+
+def ns2datetime(ns):
+    """ns2datetime(ns) -> datetime
+
+    Parameters
+    ----------
+    ns : int
+        amount of nanoseconds since the start of the GPS time.
+
+    Returns
+    -------
+    datetime : datetime.datetime
+        accurate to microsecond.
+    """
+    return GPS_EPOCH + datetime.timedelta(microseconds=int(ns) // 1000)
+
+
+def ns2date(ns):
+    """ns2date(ns) -> date
+
+    Parameters
+    ----------
+    ns : int
+        amount of nanoseconds since the start of the GPS time.
+
+    Returns
+    -------
+    date : datetime.date
+    """
+    return datetime.date.fromordinal(int(ns) // NS_PER_DAY +
+                                     _GPS_EPOCH_ORDINAL)
+
+
+def date2day(date):
+    """date2day(date) -> index
+
+    Parameters
+    ----------
+    date : datetime.date or None
+
+    Returns
+    -------
+    index : int or None
+        amount of days since the start of the GPS time.
+    """
+    if date is None:
+        return None
+    return date.toordinal() - _GPS_EPOCH_ORDINAL
 
 
 def validate_epoch(epoch):
@@ -48,43 +231,55 @@ def validate_epoch(epoch):
     -------
     datetime : datetime.datetime
     """
-    epoch = epoch[:]
+    nanosec = epoch[5] * NS_PER_SEC + epoch[6] * 1000
+    return ns2datetime(epoch2ns(list(epoch[:5]) + [nanosec]))
 
-    # YY -> YYYY
-    if epoch[0] < 100:
-        if epoch[0] >= 89:
-            epoch[0] += 1900
-        elif epoch[0] < 89:
-            epoch[0] += 2000
 
-    delta = datetime.timedelta(0)
+class EpochSampler(object):
+    """EpochSampler(interval, day=None) -> instance
 
-    # epoch[-2] - seconds; epoch[-3] - minutes
-    # we do all calculation in seconds so we use multiplier
-    for i, ier in [(-2, 1), (-3, 60)]:
-        if 60 <= epoch[i] <= 120:
-            sec = (epoch[i] - 59) * ier
-            delta += datetime.timedelta(seconds=sec)
-            epoch[i] = 59
+    picks epochs with the given sampling interval: the first epoch is
+    picked, then every epoch which is at least `interval` after the latest
+    picked one (or equals to it).
 
-    epoch = datetime.datetime(*epoch) + delta
+    Parameters
+    ----------
+    interval : int
+        sampling interval, ns
+    day : int, optional
+        day index of the data; epochs of the other days are always picked
+        and don't affect the sampling.
+    """
 
-    return epoch
+    def __init__(self, interval, day=None):
+        self.interval = interval
+        self.day = day
+        self.latest = None
 
+    def pick(self, epoch):
+        """pick(epoch) -> bool
 
-def sec2sec_ms(sec):
-    """sec2sec_ms(sec) -> sec, microsec
+        Parameters
+        ----------
+        epoch : int
+            ns since the start of the GPS time
 
-    Parameters
-    ----------
-    sec : float
+        Returns
+        -------
+        picked : bool
+        """
+        if epoch is None:
+            return True
 
-    Returns
-    -------
-    seconds : int
-    microsec : int
-    """
-    microsec = (sec - int(sec)) * 1e+6
-    microsec = float("%.1f" % microsec)
+        if self.day is not None and epoch // NS_PER_DAY != self.day:
+            return True
+
+        if self.latest is None or self.latest == epoch:
+            self.latest = epoch
+            return True
+
+        if epoch - self.latest < self.interval:
+            return False
 
-    return int(sec), int(microsec)
+        self.latest = epoch
+        return True
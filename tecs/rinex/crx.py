@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: crx.py
+Description: Compact RINEX (Hatanaka) 1.0/3.0 decoder
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+from builtins import object
+from builtins import range
+
+from tecs.rinex.basic import RinexError
+
+NAME = 'tecs.rinex.crx'
+
+RE_CRX_VER = re.compile(r'^\s*(\d+\.?\d*).*CRINEX VERS\s+/ TYPE$', re.I)
+
+
+def crx_version(line):
+    """crx_version(line) -> version or None
+
+    Parameters
+    ----------
+    line : str
+        the first line of a file
+
+    Returns
+    -------
+    version : float or None
+        version of the Compact RINEX format; None if the line is not
+        a 'CRINEX VERS / TYPE' record.
+    """
+    match = RE_CRX_VER.match(line.rstrip())
+    if not match:
+        return None
+    return float(match.group(1))
+
+
+def repair(old, diff):
+    """repair(old, diff) -> line
+
+    restore the line from its character-wise difference: ' ' keeps
+    the old character, '&' stands for a space, any other character
+    replaces the old one.
+
+    Parameters
+    ----------
+    old : str
+        previous state of the line
+    diff : str
+        difference
+
+    Returns
+    -------
+    line : str
+    """
+    if len(old) < len(diff):
+        old += ' ' * (len(diff) - len(old))
+
+    line = list(old)
+    for i, c in enumerate(diff):
+        if c == ' ':
+            continue
+        line[i] = ' ' if c == '&' else c
+
+    return ''.join(line)
+
+
+class CrxDecoder(object):
+    """CrxDecoder(version, filename) -> instance
+
+    restores the observation data from the Compact RINEX records; the
+    values are kept as the integers the way they are differenced in
+    the file (the last three digits are the decimals of the RINEX value).
+
+    Parameters
+    ----------
+    version : float
+        Compact RINEX version, 1.0 or 3.0
+    filename : str
+        name of the file (for the error messages)
+    """
+
+    def __init__(self, version, filename):
+        self.version = version
+        self.filename = filename
+
+        if version < 3:
+            self._init_char = '&'
+            self._flag_pos = 28
+        else:
+            self._init_char = '>'
+            self._flag_pos = 31
+
+        # the latest restored epoch record
+        self._epoch = ''
+        # arcs of the receiver clock offset and of the observations:
+        # [arc_order, [value, 1st difference, ..., nth difference]]
+        self._clock = None
+        self._data = {}
+        # LLI and signal strength flags
+        self._flags = {}
+
+    def _restore(self, arc, field):
+        """_restore(arc, field) -> arc
+
+        restore the value using its difference (or start a new arc).
+
+        Parameters
+        ----------
+        arc : list or None
+            [arc_order, differences]
+        field : str
+            'n&value' to start an arc of the order n, or the n-th
+            difference
+
+        Returns
+        -------
+        arc : list
+        """
+        try:
+            if len(field) > 1 and field[1] == '&':
+                return [int(field[0]), [int(field[2:])]]
+
+            diff = int(field)
+        except ValueError:
+            msg = "wrong compact data field: '%s'" % field
+            raise RinexError(self.filename, msg)
+
+        if arc is None:
+            msg = "difference without an initialized arc: '%s'" % field
+            raise RinexError(self.filename, msg)
+
+        arc_order, u = arc
+        order = min(len(u), arc_order)
+
+        if order == len(u):
+            u.append(diff)
+        else:
+            u[order] = diff
+
+        for i in range(order - 1, -1, -1):
+            u[i] += u[i + 1]
+
+        return arc
+
+    def epoch_record(self, line):
+        """epoch_record(line) -> epoch
+
+        Parameters
+        ----------
+        line : str
+            epoch record of the compact file
+
+        Returns
+        -------
+        epoch : str
+            restored RINEX epoch record (all the satellites are in the
+            same line; no receiver clock offset).
+        """
+        if line[:1] == self._init_char:
+            if self.version < 3:
+                line = ' ' + line[1:]
+            epoch = line
+        else:
+            epoch = repair(self._epoch, line)
+
+        # special events don't change the reference record
+        flag = epoch[self._flag_pos:self._flag_pos + 1]
+        if not flag.isdigit() or int(flag) <= 1:
+            self._epoch = epoch
+
+        return epoch
+
+    def clock_offset(self, line):
+        """clock_offset(line) -> offset or None
+
+        Parameters
+        ----------
+        line : str
+            receiver clock offset record of the compact file
+
+        Returns
+        -------
+        offset : int or None
+            receiver clock offset in units of the last digit of the
+            RINEX value (1e-9 s for ver.2 and 1e-12 s for ver.3).
+        """
+        if not line.strip():
+            self._clock = None
+            return None
+
+        self._clock = self._restore(self._clock, line.strip())
+        return self._clock[1][0]
+
+    def data_record(self, sat, line, obs_num):
+        """data_record(sat, line, obs_num) -> values, flags
+
+        Parameters
+        ----------
+        sat : str
+            satellite
+        line : str
+            data record of the compact file
+        obs_num : int
+            number of the observation types
+
+        Returns
+        -------
+        values : list
+            observation values (int, 1e-3) or None if absent
+        flags : str
+            LLI and signal strength flags, two characters per observation
+        """
+        arcs = self._data.get(sat)
+        if arcs is None or len(arcs) != obs_num:
+            arcs = [None] * obs_num
+            self._data[sat] = arcs
+
+        fields = line.split(' ', obs_num)
+
+        values = [None] * obs_num
+        for i in range(obs_num):
+            field = fields[i] if i < len(fields) else ''
+
+            if not field:
+                arcs[i] = None
+                continue
+
+            arcs[i] = self._restore(arcs[i], field)
+            values[i] = arcs[i][1][0]
+
+        flags = fields[obs_num] if len(fields) > obs_num else ''
+        flags = repair(self._flags.get(sat, ''), flags)
+
+        if len(flags) < 2 * obs_num:
+            flags += ' ' * (2 * obs_num - len(flags))
+
+        # absent observations have no flags
+        if None in values:
+            flags = list(flags)
+            for i, val in enumerate(values):
+                if val is None:
+                    flags[2 * i:2 * i + 2] = '  '
+            flags = ''.join(flags)
+
+        self._flags[sat] = flags
+
+        return values, flags
+
+    def close_epoch(self, sats):
+        """close_epoch(sats) -> None
+
+        forget the arcs of the satellites which are absent in the epoch.
+
+        Parameters
+        ----------
+        sats : list
+            satellites of the epoch
+        """
+        sats = set(sats)
+        for sat in list(self._data):
+            if sat not in sats:
+                del self._data[sat]
+                self._flags.pop(sat, None)
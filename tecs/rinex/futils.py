@@ -37,11 +37,21 @@ import os
 
 import os.path
 import re
-import subprocess
 import sys
-import tempfile
+import zlib
 from string import Template
 
+from tecs.rinex.common import datetime2ns
+from tecs.rinex.lzw import LZW_MAGIC, lzw_chunks
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
 NAME = 'tecs.rinex.futils'
 
 RE_VER = re.compile(r'^\s*(\d+\.?\d*).*RINEX VERSION / TYPE$', re.I)
@@ -61,12 +71,14 @@ RE_RNX = re.compile(r'(.*)\.(\d{2}o|rnx)', re.I)
 # RE_CLASSIC_NAV = re.compile(r'^(\w{4})(\d{3})\w\.(\d{2})([nglph])', re.I)
 # Z_EXT = r'({})$'.format(ARCH)
 
-GZIP = ['gzip', '-cd']
-CRX2RNX = ['crx2rnx', '-']
+GZIP_MAGIC = b'\x1f\x8b'
 
-if os.name == 'nt':
-    GZIP[0] = r'apps/gzip.exe'
-    CRX2RNX[0] = r'apps/crx2rnx.exe'
+# directories of the archive trees: YYYY/DDD
+RE_YEAR_DIR = re.compile(r'^\d{4}$')
+RE_DOY_DIR = re.compile(r'^\d{3}$')
+
+# size of the chunks to read/decompress, bytes
+CHUNK_SIZE = 64 * 1024
 
 
 def _compose_res():
@@ -107,57 +119,128 @@ class UncompressError(Exception):
         return self.err_msg
 
 
-def write_ascii_lines(src, dst):
-    for line in src:
-        line = line.decode(
-            encoding='ascii',
-            errors='ignore',
-        )
-        dst.write(line)
-
-
-def expand_nav(filename):
-    """expand_nav(filename) -> f_obj
+def gzip_chunks(f_obj, chunk_size=CHUNK_SIZE):
+    """gzip_chunks(f_obj, chunk_size=CHUNK_SIZE) -> generator
 
-    decompresses file using gzip (.z|.gz).
+    decompress the gzip stream (all its members).
 
     Parameters
     ----------
-    filename : str
+    f_obj : file
+        binary file-like object
+    chunk_size : int
+        size of the compressed chunks to read, bytes
 
     Returns
     -------
-    f_obj : file
+    chunk : bytes
+        decompressed data
     """
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    started = False
 
-    gzip = GZIP + [filename]
+    while True:
+        data = f_obj.read(chunk_size)
+        if not data:
+            break
 
-    if not RE_Z.match(filename):
-        return open(filename)
+        while data:
+            started = True
+            chunk = decoder.decompress(data)
+            if chunk:
+                yield chunk
 
-    try:
-        gzip_pipe = subprocess.Popen(
-            gzip,
-            stdout=subprocess.PIPE,
-        )
+            if not decoder.eof:
+                break
 
-        tmp_file = tempfile.TemporaryFile(mode='w+')
-        write_ascii_lines(gzip_pipe.stdout, tmp_file)
+            # the next member
+            data = decoder.unused_data
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            started = False
 
-        gzip_pipe.stdout.close()
+    if started and not decoder.eof:
+        raise ValueError('unexpected end of the compressed data')
 
-        tmp_file.seek(0)
-        return tmp_file
 
-    except (OSError, ValueError) as err:
-        msg = "can't uncompress the file (%s)." % err
-        raise UncompressError(filename, msg)
+class DecompressedFile(io.RawIOBase):
+    """DecompressedFile(filename, decoder) -> raw stream
 
+    a stream of the data decompressed on the fly, chunk by chunk. Only
+    rewinding (seek(0)) is supported: it restarts the decompression.
 
-def expand_obs(filename):
-    """expand_obs(filename) -> f_obj
+    Parameters
+    ----------
+    filename : str
+    decoder : callable
+        decoder(f_obj) -> generator of the decompressed chunks
+    """
+
+    def __init__(self, filename, decoder):
+        super(DecompressedFile, self).__init__()
+        self.filename = filename
+        self._decoder = decoder
+        self._f_obj = None
+        self._chunks = None
+        self._pending = b''
+        self._pos = 0
+        self.seek(0)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+            except (ValueError, zlib.error) as err:
+                raise UncompressError(self.filename, str(err))
+
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._pos
+
+        if whence != io.SEEK_SET or offset != 0:
+            raise io.UnsupportedOperation('only rewinding is supported')
+
+        if self._f_obj is not None:
+            self._f_obj.close()
+
+        try:
+            self._f_obj = io.open(self.filename, 'rb')
+        except (OSError, IOError) as err:
+            raise UncompressError(self.filename, str(err))
+
+        self._chunks = self._decoder(self._f_obj)
+        self._pending = b''
+        self._pos = 0
+        return 0
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if self._f_obj is not None:
+            self._f_obj.close()
+            self._f_obj = None
+        super(DecompressedFile, self).close()
+
+
+def open_compressed(filename):
+    """open_compressed(filename) -> f_obj
 
-    decompresses and applies crx2rnx to the file.
+    open gzip (.gz, .z) or compress (.Z) file; the data are decompressed
+    while reading.
 
     Parameters
     ----------
@@ -166,77 +249,76 @@ def expand_obs(filename):
     Returns
     -------
     f_obj : file
+        text file-like object
     """
+    try:
+        with io.open(filename, 'rb') as f_obj:
+            magic = f_obj.read(2)
+    except (OSError, IOError) as err:
+        raise UncompressError(filename, str(err))
+
+    if magic == GZIP_MAGIC:
+        decoder = gzip_chunks
+    elif magic == LZW_MAGIC:
+        decoder = lzw_chunks
+    else:
+        raise UncompressError(filename, 'unknown compression format.')
 
-    gzip = GZIP + [filename]
-    crx2rnx = CRX2RNX + [filename]
+    raw = DecompressedFile(filename, decoder)
+    return io.TextIOWrapper(
+        io.BufferedReader(raw, CHUNK_SIZE),
+        encoding='ascii',
+        errors='ignore',
+    )
 
-    f_bn = os.path.basename(filename)
-    if not RE_OBS.match(f_bn):
-        msg = "Not an observation rinex file."
-        raise UncompressError(filename, msg)
-    del f_bn
 
-    tmp_file = tempfile.TemporaryFile(mode='w+')
+def expand_nav(filename):
+    """expand_nav(filename) -> f_obj
 
-    # rinex + .Z
-    if RE_Z.match(filename):
-        # gzip
-        try:
-            gzip_pipe = subprocess.Popen(
-                gzip,
-                stdout=subprocess.PIPE,
-            )
-        except OSError as err:
-            msg = "can't execute gzip: %s" % str(err)
-            raise UncompressError(filename, msg)
+    decompresses file (.z|.Z|.gz).
 
-        # \d{2}o.Z
-        if RE_RNX.match(filename):
-            write_ascii_lines(gzip_pipe.stdout, tmp_file)
+    Parameters
+    ----------
+    filename : str
 
-        # \d{2}d.Z
-        elif RE_CRX.match(filename):
-            try:
-                crx2rnx_pipe = subprocess.Popen(
-                    crx2rnx[0],
-                    stdin=gzip_pipe.stdout,
-                    stdout=subprocess.PIPE,
-                )
+    Returns
+    -------
+    f_obj : file
+    """
 
-            except (OSError, ValueError) as err:
-                msg = "can't execute crx2rnx: %s" % str(err)
-                raise UncompressError(filename, msg)
+    if not RE_Z.match(filename):
+        return open(filename)
 
-            write_ascii_lines(crx2rnx_pipe.stdout, tmp_file)
-            crx2rnx_pipe.stdout.close()
+    return open_compressed(filename)
 
-        gzip_pipe.stdout.close()
 
-        tmp_file.seek(0)
-        return tmp_file
+def expand_obs(filename):
+    """expand_obs(filename) -> f_obj
 
-    # \d{2}d
-    elif RE_CRX.match(filename):
+    decompresses the file (if needed); Hatanaka-compressed files are
+    returned as is, they are decoded by the reader.
 
-        try:
-            crx2rnx_pipe = subprocess.Popen(
-                crx2rnx,
-                stdout=subprocess.PIPE,
-            )
-        except (OSError, ValueError) as err:
-            msg = "can't execute crx2rnx: %s" % str(err)
-            raise UncompressError(filename, msg)
+    Parameters
+    ----------
+    filename : str
 
-        write_ascii_lines(crx2rnx_pipe.stdout, tmp_file)
+    Returns
+    -------
+    f_obj : file
+    """
 
-        crx2rnx_pipe.stdout.close()
+    f_bn = os.path.basename(filename)
+    if not RE_OBS.match(f_bn):
+        msg = "Not an observation rinex file."
+        raise UncompressError(filename, msg)
+    del f_bn
 
-        tmp_file.seek(0)
-        return tmp_file
+    # \d{2}[od].Z
+    if RE_Z.match(filename):
+        return open_compressed(filename)
 
-    # \d{2}o
-    elif RE_RNX.match(filename):
+    # \d{2}[od]
+    elif RE_RNX.match(filename) or RE_CRX.match(filename):
         o_file = io.open(
             filename,
             'r',
@@ -319,6 +401,237 @@ def find_files(d_list, f_test):
     return f_bunch
 
 
+def _scandir(path):
+    """_scandir(path) -> (files, dirs)
+
+    Returns
+    -------
+    files : list
+        names of the files of the directory
+    dirs : list
+        names of the subdirectories
+    """
+    files = []
+    dirs = []
+
+    if scandir is not None:
+        for entry in scandir(path):
+            if entry.is_dir():
+                dirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    else:
+        for name in os.listdir(path):
+            if os.path.isdir(os.path.join(path, name)):
+                dirs.append(name)
+            else:
+                files.append(name)
+
+    return files, dirs
+
+
+def _in_range(date, date_range):
+    """_in_range(date, date_range) -> bool
+    """
+    return date_range[0] <= date <= date_range[1]
+
+
+def walk_files(d_list, f_test, date_range=None):
+    """walk_files(d_list, f_test, date_range=None) -> generator
+
+    walk the directories recursively and yield the matched files
+    directory by directory, so the processing could start before the
+    whole tree is scanned. The files and the subdirectories go in the
+    order of their names.
+
+    Parameters
+    ----------
+    d_list : list
+        directories
+    f_test : re.Pattern
+        file names to match
+    date_range : tuple, optional
+        (first, last) dates (datetime.date); the files of the other
+        dates are skipped; the same for the subdirectories named as
+        the year (YYYY) or the day of the year (YYYY/DDD) of the
+        archive trees.
+
+    Returns
+    -------
+    files : list
+        paths to the matched files of a directory
+    """
+    logger = logging.getLogger(NAME + '.walk_files')
+
+    # (path, year of the parent directory)
+    stack = [(d, None) for d in reversed(d_list)]
+
+    while stack:
+        (path, year) = stack.pop()
+
+        try:
+            (files, dirs) = _scandir(path)
+        except OSError as err:
+            logger.error("Can't list {}: {}".format(path, err))
+            continue
+
+        files = sorted(f for f in files if f_test.match(f))
+        files = [os.path.join(path, f) for f in files]
+
+        if date_range and files:
+            dates = [get_rinex_date(f) for f in files]
+            files = [f for (f, date) in zip(files, dates)
+                     if date is None or _in_range(date, date_range)]
+
+        if files:
+            yield files
+
+        subdirs = []
+        for name in sorted(dirs):
+            sub_year = None
+
+            if date_range and RE_YEAR_DIR.match(name):
+                sub_year = int(name)
+                if not date_range[0].year <= sub_year <= date_range[1].year:
+                    continue
+
+            elif date_range and year and RE_DOY_DIR.match(name):
+                try:
+                    date = datetime.datetime.strptime(
+                        '{}-{}'.format(year, name), '%Y-%j').date()
+                except ValueError:
+                    date = None
+                if date and not _in_range(date, date_range):
+                    continue
+
+            subdirs.append((os.path.join(path, name), sub_year))
+
+        stack.extend(reversed(subdirs))
+
+
+def read_file_list(f_obj):
+    """read_file_list(f_obj) -> files
+
+    read the paths listed in the file (one per line); empty lines and
+    '#' comments are skipped.
+
+    Parameters
+    ----------
+    f_obj : file
+        text file-like object
+
+    Returns
+    -------
+    files : list
+    """
+    files = []
+    for line in f_obj:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        files.append(line)
+    return files
+
+
+def group_obs_files(filenames):
+    """group_obs_files(filenames) -> groups
+
+    group the observation files by station and day: the sub-daily
+    (hourly, 15-minute) files of the same station-day go to the same
+    group, ordered by their names (i.e. by time).
+
+    Parameters
+    ----------
+    filenames : list
+        paths to the observation files
+
+    Returns
+    -------
+    groups : list
+        list of lists of the paths, ordered by the first file
+    """
+    groups = {}
+    keys = []
+
+    for filename in filenames:
+        base_fn = os.path.basename(filename)
+        date = get_rinex_date(filename)
+
+        # files without the date can't be merged with the others
+        if date is None:
+            key = filename
+        else:
+            key = (base_fn[0:4].lower(), date)
+
+        if key not in groups:
+            groups[key] = []
+            keys.append(key)
+
+        groups[key].append(filename)
+
+    bunch = []
+    for key in keys:
+        bunch.append(sorted(groups[key], key=os.path.basename))
+
+    bunch.sort(key=lambda g: os.path.basename(g[0]))
+
+    return bunch
+
+
+def stream_obs_groups(batches):
+    """stream_obs_groups(batches) -> generator
+
+    group the observation files coming in batches (e.g. directory by
+    directory from walk_files()) by station and day, see
+    group_obs_files(). The files of a date are held until a batch
+    without that date comes, so the sub-daily files of a station-day
+    kept in the sibling directories (e.g. YYYY/DDD/HH/) go to the same
+    group.
+
+    Parameters
+    ----------
+    batches : iterable
+        lists of the paths to the observation files
+
+    Returns
+    -------
+    o_files : list
+        paths to the observation files of a station-day
+    """
+    logger = logging.getLogger(NAME + '.stream_obs_groups')
+
+    # [(date, filename), ...]
+    pending = []
+    # the station-days already yielded
+    done = set()
+
+    def flush(files):
+        for o_files in group_obs_files(files):
+            date = get_rinex_date(o_files[0])
+            if date is not None:
+                key = (os.path.basename(o_files[0])[0:4].lower(), date)
+                if key in done:
+                    msg = ('{}: the files of the station-day are found '
+                           'apart from the others of it.')
+                    logger.warning(msg.format(o_files[0]))
+                done.add(key)
+            yield o_files
+
+    for files in batches:
+        files = [(get_rinex_date(f), f) for f in files]
+        dates = set(date for (date, _) in files)
+
+        left = [f for (date, f) in pending if date not in dates]
+        pending = [(date, f) for (date, f) in pending if date in dates]
+        pending.extend(files)
+
+        for o_files in flush(left):
+            yield o_files
+
+    for o_files in flush([f for (_, f) in pending]):
+        yield o_files
+
+
 def get_dir_list(line, delimiter=','):
     """get_dir_list(line, delimiter) -> list
 
@@ -387,6 +700,7 @@ def load_xyz_file(fname):
     Returns
     -------
     xyz_data : dict
+        {epoch: (x, y, z)}, epoch in ns since the start of the GPS time.
     """
     logger = logging.getLogger(NAME + '.load_xyz_file')
     date_fmt = '%Y-%m-%d%H:%M:%S'
@@ -404,9 +718,10 @@ def load_xyz_file(fname):
 
         (cdate, ctime, x, y, z) = re.split(r'\s+', rec)
         epoch = datetime.datetime.strptime(cdate + ctime, date_fmt)
+        epoch = datetime2ns(epoch)
 
         if epoch in xyz_data:
-            err = '{}: {} duplicate epoch'.format(fname, str(epoch))
+            err = '{}: {} {} duplicate epoch'.format(fname, cdate, ctime)
             logger.info(err)
 
         try:
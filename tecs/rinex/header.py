@@ -32,7 +32,7 @@ from builtins import str
 from builtins import range
 from builtins import object
 
-from tecs.rinex.common import sec2sec_ms, validate_epoch
+from tecs.rinex.common import epoch2ns, sec2ns
 from tecs.rinex.label import SAT_SYS_BDS
 
 NAME = 'tecs.rinex.header'
@@ -96,7 +96,8 @@ class TimeOfFirstObs(HeaderLabel):
     Attributes
     ----------
     self.value : tuple
-        value = (epoch, time_system)
+        value = (epoch, time_system), with epoch in nanoseconds since the
+        start of the GPS time.
     """
 
     def __init__(self, version):
@@ -113,14 +114,12 @@ class TimeOfFirstObs(HeaderLabel):
         epoch = list(map(int, epoch))
 
         if self.version == 2.0:
-            sec = float(header_slice[30:43])
+            sec = sec2ns(header_slice[30:43])
         else:
-            sec = float(header_slice[30:44])
+            sec = sec2ns(header_slice[30:44])
 
-        sec, microsec = sec2sec_ms(sec)
-
-        epoch += [sec, microsec]
-        epoch = validate_epoch(epoch)
+        epoch.append(sec)
+        epoch = epoch2ns(epoch)
 
         time_system = header_slice[48:51]
 
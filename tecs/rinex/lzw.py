@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: lzw.py
+Description: decoder of the Unix `compress` (.Z) files
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from builtins import bytes
+from builtins import int
+from builtins import range
+
+NAME = 'tecs.rinex.lzw'
+
+LZW_MAGIC = b'\x1f\x9d'
+
+INIT_BITS = 9
+CLEAR = 256
+BLOCK_MODE = 0x80
+BITS_MASK = 0x1f
+
+
+def lzw_chunks(f_obj, chunk_size=64 * 1024):
+    """lzw_chunks(f_obj, chunk_size=65536) -> generator
+
+    decompress the .Z stream.
+
+    The codes are packed by groups of `n_bits` bytes (8 codes); when the
+    code width grows or the table is cleared the rest of the current
+    group is skipped, so the data is read group by group.
+
+    Parameters
+    ----------
+    f_obj : file
+        binary file-like object
+    chunk_size : int
+        approximate size of the chunks to yield, bytes
+
+    Returns
+    -------
+    chunk : bytes
+        decompressed data
+
+    Raises
+    ------
+    ValueError
+        if the stream is not a .Z one or it is corrupted.
+    """
+    header = bytes(f_obj.read(3))
+    if len(header) < 3 or header[:2] != LZW_MAGIC:
+        raise ValueError('not in the compress (.Z) format')
+
+    max_bits = header[2] & BITS_MASK
+    block_mode = header[2] & BLOCK_MODE
+
+    if not INIT_BITS <= max_bits <= 16:
+        raise ValueError('unsupported code width: %d bits' % max_bits)
+
+    max_max_code = 1 << max_bits
+
+    def init_table():
+        t = [bytes([i]) for i in range(256)]
+        if block_mode:
+            # placeholder for the CLEAR code
+            t.append(b'')
+        return t
+
+    table = init_table()
+    n_bits = INIT_BITS
+    max_code = (1 << n_bits) - 1
+    prev = None
+
+    out = []
+    out_size = 0
+
+    while True:
+        group = f_obj.read(n_bits)
+        if not group:
+            break
+
+        bits = int.from_bytes(group, 'little')
+        mask = (1 << n_bits) - 1
+
+        for _ in range(len(group) * 8 // n_bits):
+            code = bits & mask
+            bits >>= n_bits
+
+            if prev is None:
+                if code >= 256:
+                    raise ValueError('corrupt input: wrong first code')
+                prev = table[code]
+                out.append(prev)
+                out_size += 1
+                continue
+
+            if code == CLEAR and block_mode:
+                table = init_table()
+                n_bits = INIT_BITS
+                max_code = (1 << n_bits) - 1
+                prev = None
+                break
+
+            if code < len(table):
+                entry = table[code]
+            elif code == len(table):
+                # KwKwK
+                entry = prev + prev[:1]
+            else:
+                raise ValueError('corrupt input: unknown code %d' % code)
+
+            out.append(entry)
+            out_size += len(entry)
+
+            if len(table) < max_max_code:
+                table.append(prev + entry[:1])
+
+            prev = entry
+
+            if len(table) > max_code:
+                # the code width grows: skip the rest of the group
+                n_bits += 1
+                if n_bits == max_bits:
+                    max_code = max_max_code
+                else:
+                    max_code = (1 << n_bits) - 1
+                break
+
+        if out_size >= chunk_size:
+            yield b''.join(out)
+            out = []
+            out_size = 0
+
+    if out:
+        yield b''.join(out)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: navstore.py
+Description: on-disk store of the parsed navigation files
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import logging
+import os
+import os.path
+import tempfile
+from builtins import object
+
+import numpy as np
+
+from tecs.rinex.nmsg import ephemeris_message
+
+NAME = 'tecs.rinex.navstore'
+
+# version of the store layout; entries of the other versions are ignored
+STORE_FORMAT = 1
+
+INDEX_EXT = 'json'
+DATA_EXT = 'npy'
+
+# os.replace() is not available in Python 2
+_replace = getattr(os, 'replace', os.rename)
+
+
+class StoredNav(object):
+    """StoredNav(filename, ephemeris) -> instance
+
+    navigation file loaded from the store; it has the same `filename`,
+    `ephemeris` and `message` as the parsed one. The `message` dicts are
+    built from the memory-mapped arrays on the first use only.
+
+    Parameters
+    ----------
+    filename : str
+        path to the source file
+    ephemeris : dict
+        {system: ephemeris structured array}
+    """
+
+    def __init__(self, filename, ephemeris):
+        self.filename = filename
+        self.ephemeris = ephemeris
+        self._message = None
+
+    @property
+    def message(self):
+        """message -> {system: {number: {epoch: eph}}}
+
+        see tecs.rinex.nmsg.ephemeris_message()
+        """
+        if self._message is None:
+            self._message = {}
+            for system in self.ephemeris:
+                self._message[system] = ephemeris_message(
+                    self.ephemeris[system])
+        return self._message
+
+
+class NavStore(object):
+    """NavStore(path) -> instance
+
+    the ephemeris arrays of the parsed navigation files kept in the
+    `path` directory, one .npy file per system; the arrays are
+    memory-mapped when loaded. An entry is used while the size and the
+    modification time of the source file are those it was stored with.
+
+    Parameters
+    ----------
+    path : str
+        directory of the store
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _entry(self, filename):
+        """_entry(filename) -> entry
+
+        Returns
+        -------
+        entry : str
+            path to the files of the entry without the extension
+        """
+        key = os.path.abspath(filename).encode('utf-8')
+        key = hashlib.sha1(key).hexdigest()
+        return os.path.join(self.path, key)
+
+    @staticmethod
+    def _source_id(filename):
+        """_source_id(filename) -> (size, mtime)
+        """
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime
+
+    def load(self, filename):
+        """load(filename) -> nav_obj or None
+
+        Parameters
+        ----------
+        filename : str
+            path to the navigation file
+
+        Returns
+        -------
+        nav_obj : StoredNav or None
+            None if there is no valid entry for the file.
+        """
+        logger = logging.getLogger(NAME + '.load')
+
+        entry = self._entry(filename)
+
+        try:
+            with io.open('{}.{}'.format(entry, INDEX_EXT)) as f_obj:
+                index = json.load(f_obj)
+            size, mtime = self._source_id(filename)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if (index.get('format') != STORE_FORMAT or
+                index.get('size') != size or
+                index.get('mtime') != mtime):
+            msg = '{}: the stored ephemeris is out of date.'.format(filename)
+            logger.debug(msg)
+            return None
+
+        ephemeris = {}
+        try:
+            for system in index['systems']:
+                data = '{}.{}.{}'.format(entry, system, DATA_EXT)
+                ephemeris[system] = np.load(data, mmap_mode='r')
+        except (IOError, OSError, ValueError, KeyError) as err:
+            msg = "{}: can't load the stored ephemeris ({})."
+            logger.warning(msg.format(filename, err))
+            return None
+
+        return StoredNav(filename, ephemeris)
+
+    def save(self, nav_obj):
+        """save(nav_obj) -> None
+
+        store the ephemeris of the parsed navigation file; failures are
+        logged, the store is optional.
+
+        Parameters
+        ----------
+        nav_obj : rinex.(v2|v3).n.NavN
+        """
+        logger = logging.getLogger(NAME + '.save')
+
+        filename = nav_obj.filename
+        entry = self._entry(filename)
+
+        try:
+            size, mtime = self._source_id(filename)
+
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+
+            # the data first, then the index: the entry is valid once
+            # its index is in place
+            for system in nav_obj.ephemeris:
+                data = '{}.{}.{}'.format(entry, system, DATA_EXT)
+                atomic_write(data, lambda f: np.save(
+                    f, nav_obj.ephemeris[system]))
+
+            index = json.dumps(dict(
+                format=STORE_FORMAT,
+                source=os.path.abspath(filename),
+                size=size,
+                mtime=mtime,
+                systems=sorted(nav_obj.ephemeris),
+            ))
+            atomic_write('{}.{}'.format(entry, INDEX_EXT),
+                         lambda f: f.write(index.encode('utf-8')))
+
+        except (IOError, OSError) as err:
+            msg = "{}: can't store the ephemeris ({})."
+            logger.warning(msg.format(filename, err))
+
+
+def atomic_write(filename, write):
+    """atomic_write(filename, write) -> None
+
+    write the file via a temporary one in the same directory, so the
+    other processes never see it partially written.
+
+    Parameters
+    ----------
+    filename : str
+    write : callable
+        write(f_obj) writes the data into the binary file object
+    """
+    directory = os.path.dirname(filename) or os.curdir
+    (fd, tmp_name) = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f_obj:
+            write(f_obj)
+        _replace(tmp_name, filename)
+    except (IOError, OSError):
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
@@ -28,16 +28,49 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from builtins import object
 
+import numpy as np
+
 from tecs.rinex.label import SAT_SYS_GPS, SAT_SYS_GLO, SAT_SYS_GAL, \
     SAT_SYS_GEO, SAT_SYS_BDS, SAT_SYS_QZSS, SAT_SYS_IRNSS
 
 NAME = 'tecs.rinex.nmsg'
 
 
+def ephemeris_message(ephemeris):
+    """ephemeris_message(ephemeris) -> message
+
+    Parameters
+    ----------
+    ephemeris : numpy.ndarray
+        ephemeris structured array of a system
+        (see GNSSNavigationMessage.dtype())
+
+    Returns
+    -------
+    message : dict
+        {number: {epoch: eph}}, eph is the tuple of the broadcast orbits
+        values.
+    """
+    message = {}
+    for (num, epoch, eph) in zip(ephemeris['number'].tolist(),
+                                 ephemeris['epoch'].tolist(),
+                                 ephemeris['eph'].tolist()):
+        if num not in message:
+            message[num] = {}
+        message[num][epoch] = eph
+
+    return message
+
+
 class GNSSNavigationMessage(object):
     system = None
     vals_per_orbit = ()
 
+    # names of the SV clock values (the epoch record) and of the
+    # broadcast orbits values
+    clock_fields = ()
+    fields = ()
+
     date = None
 
     def __init__(self, number, epoch, sv_clock):
@@ -49,11 +82,42 @@ class GNSSNavigationMessage(object):
 
         self._message = None
 
+    @classmethod
+    def dtype(cls):
+        """dtype() -> numpy.dtype
+
+        Returns
+        -------
+        dtype : numpy.dtype
+            record of the ephemeris array: satellite number, epoch (ns),
+            SV clock values and the broadcast orbits values (`eph`, in
+            the order of the file, so eph[i] is the i-th value).
+        """
+        return np.dtype([
+            ('number', np.int32),
+            ('epoch', np.int64),
+            ('sv_clock', [(f, np.float64) for f in cls.clock_fields]),
+            ('eph', [(f, np.float64) for f in cls.fields]),
+        ])
+
 
 class GPSNavigationMessage(GNSSNavigationMessage):
     system = SAT_SYS_GPS
     vals_per_orbit = (4, 4, 4, 4, 4, 4, 2)
 
+    clock_fields = ('bias', 'drift', 'drift_rate')
+    # Galileo, BDS, QZSS and IRNSS messages have the same layout; some
+    # of the values (week, health, etc.) have their own meaning there.
+    fields = (
+        'iode', 'crs', 'delta_n', 'm0',
+        'cuc', 'e', 'cus', 'sqrt_a',
+        'toe', 'cic', 'omega0', 'cis',
+        'i0', 'crc', 'omega', 'omega_dot',
+        'idot', 'l2_codes', 'week', 'l2p_flag',
+        'accuracy', 'health', 'tgd', 'iodc',
+        'trans_time', 'fit_interval',
+    )
+
     @property
     def message(self):
         return self._message
@@ -67,6 +131,13 @@ class GLONASSNavigationMessage(GNSSNavigationMessage):
     system = SAT_SYS_GLO
     vals_per_orbit = (4, 4, 4)
 
+    clock_fields = ('bias', 'freq_bias', 'frame_time')
+    fields = (
+        'x', 'vx', 'ax', 'health',
+        'y', 'vy', 'ay', 'freq_num',
+        'z', 'vz', 'az', 'age',
+    )
+
 
 class GalileoNavigationMessage(GPSNavigationMessage):
     system = SAT_SYS_GAL
@@ -75,6 +146,13 @@ class GalileoNavigationMessage(GPSNavigationMessage):
 class SBASNavigationMessage(GLONASSNavigationMessage):
     system = SAT_SYS_GEO
 
+    clock_fields = ('bias', 'freq_bias', 'trans_time')
+    fields = (
+        'x', 'vx', 'ax', 'health',
+        'y', 'vy', 'ay', 'accuracy',
+        'z', 'vz', 'az', 'iodn',
+    )
+
 
 class BDSNavigationMessage(GPSNavigationMessage):
     system = SAT_SYS_BDS
@@ -28,31 +28,317 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 from builtins import map
+from builtins import object
 
 import re
 import datetime
 import logging
+import os
+import os.path
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
 
 from tecs.rinex import nav_file
-from tecs.rinex.futils import find_files
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import datetime2ns, ns2datetime, NS_PER_SEC, \
+    NS_PER_WEEK, NS_PER_DAY
+from tecs.rinex.futils import find_files, UncompressError
 from tecs.rinex.label import SAT_SYS_GPS, SAT_SYS_GLO, SAT_SYS_GEO, \
     SAT_SYS_GAL, SAT_SYS_MIX, SAT_SYS_BDS
+from tecs.rinex.nmsg import ephemeris_message
 from tecs.sat import gps
 
 NAME = 'tecs.rinex.nmutils'
 
+# start of the system time, ns since the start of the GPS time
+EPOCH_START = {
+    # GPS epoch started at 00:00:00 UT January 6, 1980
+    SAT_SYS_GPS: datetime2ns(gps.epoch_start),
+    # BDS epoch started at 00:00:00 UT January 1, 2006
+    SAT_SYS_BDS: datetime2ns(datetime.datetime(2006, 1, 1, 0, 0, 0)),
+    # Galileo epoch started at 00:00:00 GPS August 22, 1999
+    # 13 leap seconds have been introduced into UTC since 1980
+    SAT_SYS_GAL: datetime2ns(datetime.datetime(1999, 8, 22, 0, 0, 13)),
+}
+
+# the max time difference between an epoch and a message, ns
+MESSAGE_RANGE = {
+    # 2 hours GPS & BDS (?)
+    SAT_SYS_GPS: 7200 * NS_PER_SEC,
+    SAT_SYS_BDS: 7200 * NS_PER_SEC,
+    # 3 hours Galileo
+    SAT_SYS_GAL: 10800 * NS_PER_SEC,
+    # in 15 minutes range
+    SAT_SYS_GLO: 900 * NS_PER_SEC,
+    # in 4 minutes and 16 seconds range
+    SAT_SYS_GEO: 256 * NS_PER_SEC,
+}
+
+
+# type of the classic navigation files of the systems
+NAV_ID = {
+    SAT_SYS_GPS: 'n',
+    SAT_SYS_GLO: 'g',
+    SAT_SYS_GEO: 'h',
+    SAT_SYS_GAL: 'l',
+    SAT_SYS_MIX: 'p'
+}
+
+# names of the navigation files: station, date and system
+RE_CLASSIC_NAV = re.compile(r'^(\w{4})(\d{3})\w\.(\d{2})(\w)', re.I)
+RE_MODERN_NAV = re.compile(
+    r'^(\w{4})\w{5}_\w_(\d{4})(\d{3})\d{4}_\w{3}(_\w{3})?_(\w)N\.rnx', re.I)
+
+# systems with the GPS-like (Keplerian) ephemeris
+GPS_WAY = (SAT_SYS_GPS, SAT_SYS_BDS, SAT_SYS_GAL)
+
+# number of the parsed navigation files to keep in NavCache
+NAV_CACHE_SIZE = 16
+
+# compiled regular expressions of the priorities
+_PRIORITY_RE = {}
+
 
 class NMError(Exception):
     pass
 
 
+class NavIndex(object):
+    """NavIndex(paths) -> instance
+
+    index of the navigation files of the directories: the directories
+    are listed once, the files are grouped by date and satellite system;
+    the choice of a file according to the priority is kept for reuse.
+    refresh() lists again only the directories which have changed.
+
+    The files are matched the same way compose_navigation_re() does.
+
+    Parameters
+    ----------
+    paths : list
+        navigation files paths
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+
+        # {path: (mtime, [(date, system, station, filename), ...])}
+        self._dirs = {}
+        # {(date, system): [filename, ...]}
+        self._files = {}
+        # {(date, system, priority): filename}
+        self._selected = {}
+
+        self.refresh()
+
+    @staticmethod
+    def _parse_name(name):
+        """_parse_name(name) -> (date, system, station) or None
+        """
+        match = RE_CLASSIC_NAV.match(name)
+        if match:
+            system = None
+            for (sys_code, nav_id) in NAV_ID.items():
+                if nav_id == match.group(4).lower():
+                    system = sys_code
+            date_str = '{}-{}'.format(match.group(3), match.group(2))
+            d_fmt = '%y-%j'
+        else:
+            match = RE_MODERN_NAV.match(name)
+            if not match:
+                return None
+            system = match.group(5).upper()
+            date_str = '{}-{}'.format(match.group(2), match.group(3))
+            d_fmt = '%Y-%j'
+
+        if system is None:
+            return None
+
+        try:
+            date = datetime.datetime.strptime(date_str, d_fmt).date()
+        except ValueError:
+            return None
+
+        return date, system, match.group(1).lower()
+
+    def _list_dir(self, path):
+        """_list_dir(path) -> entries
+        """
+        entries = []
+        for name in os.listdir(path):
+            info = self._parse_name(name)
+            if info is not None:
+                entries.append(info + (os.path.join(path, name),))
+        return entries
+
+    def refresh(self):
+        """refresh() -> None
+
+        list the directories which have changed since the last time.
+        """
+        logger = logging.getLogger(NAME + '.NavIndex.refresh')
+
+        changed = False
+        for path in self.paths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError as err:
+                logger.warning("Can't list {}: {}".format(path, err))
+                mtime = None
+
+            if path in self._dirs and self._dirs[path][0] == mtime:
+                continue
+
+            entries = []
+            if mtime is not None:
+                entries = self._list_dir(path)
+
+            self._dirs[path] = (mtime, entries)
+            changed = True
+
+            msg = '{}: {} navigation files.'.format(path, len(entries))
+            logger.debug(msg)
+
+        if not changed:
+            return
+
+        # in the order of the directories
+        self._files = {}
+        for path in self.paths:
+            for (date, system, _, filename) in self._dirs[path][1]:
+                key = (date, system)
+                if key not in self._files:
+                    self._files[key] = []
+                self._files[key].append(filename)
+
+        self._selected = {}
+
+    def find(self, epoch, system):
+        """find(epoch, system) -> files
+
+        Parameters
+        ----------
+        epoch : datetime.datetime
+        system : str
+
+        Returns
+        -------
+        files : list
+            navigation files of the date and the system
+        """
+        return list(self._files.get((epoch.date(), system), []))
+
+    def select(self, epoch, system, priority=None):
+        """select(epoch, system, priority=None) -> filename or None
+
+        Parameters
+        ----------
+        epoch : datetime.datetime
+        system : str
+        priority : list, optional
+            see load_navigation_message()
+
+        Returns
+        -------
+        filename : str or None
+        """
+        priority = tuple(priority or ())
+        key = (epoch.date(), system, priority)
+
+        if key not in self._selected:
+            files = self._files.get(key[:2], [])
+            filename = files[0] if files else None
+            if files and priority:
+                filename = get_prior_file(files, priority)
+            self._selected[key] = filename
+
+        return self._selected[key]
+
+
+class NavCache(object):
+    """NavCache(size=NAV_CACHE_SIZE, store=None) -> instance
+
+    parsed navigation files. Each file is parsed once and serves all the
+    satellite systems it contains (e.g. a mixed RINEX 3 file); the least
+    recently used files are dropped when there are more than `size` of
+    them.
+
+    Parameters
+    ----------
+    size : int, optional
+        max number of the files to keep
+    store : tecs.rinex.navstore.NavStore, optional
+        on-disk store: the files are loaded from it if possible, the
+        parsed ones are saved into it.
+    """
+
+    def __init__(self, size=NAV_CACHE_SIZE, store=None):
+        self.size = size
+        self.store = store
+        # filename -> nav object or RinexError
+        self._files = OrderedDict()
+
+    def __contains__(self, filename):
+        return filename in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, filename):
+        """get(filename) -> nav_obj
+
+        Parameters
+        ----------
+        filename : str
+            path to the navigation file
+
+        Returns
+        -------
+        nav_obj : rinex.(v2|v3).n.NavN
+
+        Raises
+        ------
+        RinexError
+            if the file can't be read; the error is kept as well, so the
+            file isn't parsed again.
+        """
+        if filename in self._files:
+            nav_obj = self._files.pop(filename)
+        else:
+            nav_obj = None
+            if self.store is not None:
+                nav_obj = self.store.load(filename)
+
+            if nav_obj is None:
+                try:
+                    nav_obj = nav_file(filename)
+                except RinexError as err:
+                    nav_obj = err
+                else:
+                    if self.store is not None:
+                        self.store.save(nav_obj)
+
+        self._files[filename] = nav_obj
+        while len(self._files) > self.size:
+            self._files.popitem(last=False)
+
+        if isinstance(nav_obj, RinexError):
+            raise nav_obj
+
+        return nav_obj
+
+
 def get_week_sec(epoch, epoch_start):
     """get_week_sec(epoch, epoch_start) -> gps_sec
 
     Parameters
     ----------
-    epoch : datetime.datetime
-    epoch_start : datetime.datetime
+    epoch : int
+        ns since the start of the GPS time
+    epoch_start : int
+        start of the system time, ns since the start of the GPS time
 
     Returns
     -------
@@ -60,13 +346,7 @@ def get_week_sec(epoch, epoch_start):
         amount of seconds from the start of current GPS week.
 
     """
-    cur_gps_epoch = epoch - epoch_start
-    gps_week = cur_gps_epoch.days / 7.
-
-    gps_sec = (gps_week - int(gps_week)) * (7 * 24 * 60 * 60)
-    gps_sec += cur_gps_epoch.seconds
-
-    return gps_sec
+    return (epoch - epoch_start) % NS_PER_WEEK / NS_PER_SEC
 
 
 def compose_navigation_re(system, epoch):
@@ -83,13 +363,7 @@ def compose_navigation_re(system, epoch):
     --------
     re : re.Pattern
     """
-    nav_id = {
-        SAT_SYS_GPS: 'n',
-        SAT_SYS_GLO: 'g',
-        SAT_SYS_GEO: 'h',
-        SAT_SYS_GAL: 'l',
-        SAT_SYS_MIX: 'p'
-    }
+    nav_id = NAV_ID
 
     classic_nav_tmpl = r'^(\w{{4}}){day}\w\.{year}{system}'
 
@@ -122,11 +396,23 @@ def compose_navigation_re(system, epoch):
     return re.compile(re_str, (re.I | re.X))
 
 
+def _priority_re(priority):
+    """_priority_re(priority) -> list
+
+    compiled regular expressions of the priority (kept for reuse).
+    """
+    priority = tuple(priority)
+    if priority not in _PRIORITY_RE:
+        _PRIORITY_RE[priority] = list(
+            map(re.compile, priority, (re.I,) * len(priority)))
+    return _PRIORITY_RE[priority]
+
+
 def get_prior_file(files, priority):
     if not files:
         return None
 
-    query = list(map(re.compile, priority, (re.I,) * len(priority)))
+    query = _priority_re(priority)
     for q in query:
         for f in files:
             if q.search(f):
@@ -135,44 +421,92 @@ def get_prior_file(files, priority):
     return files[0]
 
 
-def load_navigation_message(paths, epoch, system, priority=None):
-    """load_navigation_message(paths, epoch, system, priority=None)
+class NavTimeline(object):
+    """NavTimeline(system, nav_obj, adjacent) -> instance
 
-    loads navigation message according to priority.
+    messages of the system from the navigation file of the day merged
+    with those from the files of the adjacent days, so the messages of
+    each satellite make a continuous timeline across the midnight.
+
+    The ephemeris arrays of the files are kept as they are (see
+    EphemerisIndex.from_ephemeris()), the `message` dicts are merged on
+    the first use only.
 
     Parameters
     ----------
-    paths : list
-        navigation files paths
-    epoch : datetime.datetime
-        epoch of the navigation message
     system : str
         satellite system
-    priority : list
-        list of 4-chars codes of the stations, it's a queue to find nav-file:
-        we try to find priority[0] nav-message, then priority[1] and so on; if
-        we found none, take the first found.
+    nav_obj : rinex.(v2|v3).n.NavN
+        navigation file of the day
+    adjacent : list
+        navigation files of the previous and the next days
     """
 
-    # navigation files corresponded to the date and the system
-    nav_files = find_nav_files(paths, epoch, system)
+    def __init__(self, system, nav_obj, adjacent):
+        self.filename = nav_obj.filename
+        self.filenames = [nav_obj.filename] + [n.filename for n in adjacent]
+        self.system = system
+
+        # {system: [ephemeris, ...]}, the messages of the day go last:
+        # they win
+        self.ephemeris = {system: [nav.ephemeris[system]
+                                   for nav in list(adjacent) + [nav_obj]
+                                   if system in nav.ephemeris]}
+        self._message = None
+
+    @property
+    def message(self):
+        """message -> {system: {number: {epoch: eph}}}
+        """
+        if self._message is None:
+            merged = {}
+            for ephemeris in self.ephemeris[self.system]:
+                for (number, sat_message) in \
+                        ephemeris_message(ephemeris).items():
+                    if number not in merged:
+                        merged[number] = {}
+                    merged[number].update(sat_message)
+
+            self._message = {self.system: merged}
+        return self._message
+
+
+def _load_nav_file(paths, epoch, system, priority, cache):
+    """_load_nav_file(paths, epoch, system, priority, cache) -> nav_obj
+
+    Parameters
+    ----------
+    epoch : datetime.datetime
+
+    see load_navigation_message()
+    """
+    if isinstance(paths, NavIndex):
+        found_nav = (paths.select(epoch, system, priority) or
+                     paths.select(epoch, SAT_SYS_MIX, priority))
+    else:
+        # navigation files corresponded to the date and the system
+        nav_files = find_nav_files(paths, epoch, system)
 
-    if not nav_files:
-        nav_files = find_nav_files(paths, epoch, SAT_SYS_MIX)
         if not nav_files:
-            no_file = "Can't find any navigation file for the '{}' on {}."
-            raise NMError(no_file.format(system, epoch.strftime('%Y-%j')))
+            nav_files = find_nav_files(paths, epoch, SAT_SYS_MIX)
 
-    found_nav = nav_files[0]
+        found_nav = nav_files[0] if nav_files else None
 
-    # priority of the navigation files
-    if priority:
-        found_nav = get_prior_file(nav_files, priority)
+        # priority of the navigation files
+        if nav_files and priority:
+            found_nav = get_prior_file(nav_files, priority)
+
+    if found_nav is None:
+        no_file = "Can't find any navigation file for the '{}' on {}."
+        raise NMError(no_file.format(system, epoch.strftime('%Y-%j')))
 
     # could raise RinexError
-    nav_obj = nav_file(found_nav)
+    if cache is not None:
+        nav_obj = cache.get(found_nav)
+    else:
+        nav_obj = nav_file(found_nav)
 
-    if system not in nav_obj.message:
+    if system not in nav_obj.ephemeris:
         # FIXME should I try another nav-file?
         no_system = "Can't find any navigation message for the '{}' on {}."
         raise NMError(no_system.format(system, epoch.strftime('%Y-%j')))
@@ -180,12 +514,326 @@ def load_navigation_message(paths, epoch, system, priority=None):
     return nav_obj
 
 
+def load_navigation_message(paths, epoch, system, priority=None,
+                            cache=None, adjacent=False):
+    """load_navigation_message(paths, epoch, system, priority=None,
+            cache=None, adjacent=False)
+
+    loads navigation message according to priority.
+
+    Parameters
+    ----------
+    paths : list or NavIndex
+        navigation files paths or their index
+    epoch : int
+        epoch of the navigation message, ns since the start of the GPS time
+    system : str
+        satellite system
+    priority : list
+        list of 4-chars codes of the stations, it's a queue to find nav-file:
+        we try to find priority[0] nav-message, then priority[1] and so on; if
+        we found none, take the first found.
+    cache : NavCache, optional
+        parsed navigation files; if given, the file is taken from it
+        instead of being parsed again.
+    adjacent : bool, optional
+        if True, the messages of the previous and the next days' files
+        (if any) are merged with the day's ones; NavTimeline is returned.
+    """
+    logger = logging.getLogger(NAME + '.load_navigation_message')
+
+    epoch = ns2datetime(epoch)
+
+    nav_obj = _load_nav_file(paths, epoch, system, priority, cache)
+
+    if not adjacent:
+        return nav_obj
+
+    adjacent_navs = []
+    for days in (-1, 1):
+        day = epoch + datetime.timedelta(days=days)
+        try:
+            adjacent_navs.append(
+                _load_nav_file(paths, day, system, priority, cache))
+        except (NMError, RinexError, UncompressError) as err:
+            msg = '{} (the adjacent day of {}).'.format(err, nav_obj.filename)
+            logger.debug(msg)
+
+    return NavTimeline(system, nav_obj, adjacent_navs)
+
+
 def find_nav_files(paths, epoch, system):
     f_test = compose_navigation_re(system, epoch)
     nav_files = find_files(paths, f_test)
     return nav_files
 
 
+class EphemerisIndex(object):
+    """EphemerisIndex(system, message) -> instance
+
+    sorted reference times of the messages of each satellite of the
+    system; a message is looked up by bisection, for a single epoch or
+    for an array of them.
+
+    The message is selected the way it always was: the one of the epoch
+    itself if any, else the first message of the epoch's day for GPS and
+    BDS (`first_msg`), else the earliest message within MESSAGE_RANGE of
+    the epoch. The messages could be of several days (see NavTimeline).
+
+    Parameters
+    ----------
+    system : str
+        satellite system
+    message : dict
+        {number: {epoch: eph}}; see from_ephemeris() for the arrays.
+    """
+
+    def __init__(self, system, message):
+        self.system = system
+
+        # {number: [epoch, ...]}, {number: numpy.ndarray}
+        self._times = {}
+        self.times = {}
+        # {number: [eph, ...]}; None for the messages of the arrays which
+        # haven't been taken yet (see eph())
+        self._ephemeris = {}
+
+        # the `eph` arrays and {number: (sources, rows)} of the messages
+        # (see from_ephemeris())
+        self._sources = []
+        self._rows = {}
+
+        for number in message:
+            times = sorted(message[number])
+            self._times[number] = times
+            self.times[number] = np.array(times, dtype=np.int64)
+            self._ephemeris[number] = [message[number][t] for t in times]
+
+        self._gps_way = system in GPS_WAY
+        self._range = MESSAGE_RANGE.get(system)
+
+    @classmethod
+    def from_ephemeris(cls, system, ephemeris):
+        """from_ephemeris(system, ephemeris) -> instance
+
+        the index of the ephemeris arrays. The arrays (memory-mapped ones
+        included) are used as they are: only the reference times are
+        taken out of them, the tuple of a message is made when the
+        message is taken first.
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        ephemeris : numpy.ndarray or list
+            ephemeris structured array of the system (see
+            tecs.rinex.nmsg.GNSSNavigationMessage.dtype()) or the arrays
+            of several files; the messages of the later ones win.
+        """
+        if isinstance(ephemeris, np.ndarray):
+            ephemeris = [ephemeris]
+
+        index = cls(system, {})
+        if not ephemeris:
+            return index
+
+        index._sources = [e['eph'] for e in ephemeris]
+
+        numbers = np.concatenate([e['number'] for e in ephemeris])
+        epochs = np.concatenate([e['epoch'] for e in ephemeris])
+        sources = np.concatenate([np.full(len(e), i, dtype=np.int64)
+                                  for (i, e) in enumerate(ephemeris)])
+        rows = np.concatenate([np.arange(len(e), dtype=np.int64)
+                               for e in ephemeris])
+
+        # the latest message of the same number and epoch wins
+        order = np.lexsort((rows, sources, epochs, numbers))
+        numbers = numbers[order]
+        epochs = epochs[order].astype(np.int64)
+        sources = sources[order]
+        rows = rows[order]
+
+        latest = np.ones(len(order), dtype=bool)
+        latest[:-1] = ((numbers[1:] != numbers[:-1]) |
+                       (epochs[1:] != epochs[:-1]))
+        numbers = numbers[latest]
+        epochs = epochs[latest]
+        sources = sources[latest]
+        rows = rows[latest]
+
+        (sat_numbers, first) = np.unique(numbers, return_index=True)
+        bounds = first.tolist() + [len(numbers)]
+
+        for (k, number) in enumerate(sat_numbers.tolist()):
+            sat = slice(bounds[k], bounds[k + 1])
+            index.times[number] = epochs[sat]
+            index._times[number] = epochs[sat].tolist()
+            index._ephemeris[number] = [None] * len(index._times[number])
+            index._rows[number] = (sources[sat].tolist(),
+                                   rows[sat].tolist())
+
+        return index
+
+    def __contains__(self, number):
+        return number in self._ephemeris
+
+    def __len__(self):
+        return len(self._ephemeris)
+
+    def __iter__(self):
+        return iter(sorted(self._ephemeris))
+
+    def eph(self, number, i):
+        """eph(number, i) -> eph
+
+        Parameters
+        ----------
+        number : int
+            satellite number
+        i : int
+            index of the message of the satellite (see select_batch())
+
+        Returns
+        -------
+        eph : tuple
+            ephemeris; the tuple made of the arrays is kept, the message
+            is the same object each time.
+        """
+        ephemeris = self._ephemeris[number]
+        eph = ephemeris[i]
+        if eph is None:
+            (sources, rows) = self._rows[number]
+            eph = self._sources[sources[i]][rows[i]].item()
+            ephemeris[i] = eph
+        return eph
+
+    def _check_range(self):
+        if self._range is None:
+            msg = 'Unsupported satellite system {}.'.format(self.system)
+            raise Exception(msg)
+
+    def select(self, epoch, number, first_msg=False):
+        """select(epoch, number, first_msg=False) -> seconds, ephemeris
+
+        Parameters
+        ----------
+        epoch : int
+            ns since the start of the GPS time
+        number : int
+            satellite number
+        first_msg : bool, optional
+            take the first message of the epoch's day (GPS and BDS).
+
+        Returns
+        -------
+        seconds : float
+            * GPS (and similar): seconds = week second;
+            * GLONASS (and similar): seconds = dt.
+        ephemeris : tuple
+            ephemeris; None instead of the pair if there is no message.
+        """
+        times = self._times[number]
+
+        week_second = None
+        if self._gps_way:
+            week_second = get_week_sec(epoch, EPOCH_START[self.system])
+
+        i = bisect_left(times, epoch)
+        if i < len(times) and times[i] == epoch:
+            if self._gps_way:
+                return week_second, self.eph(number, i)
+            return 0, self.eph(number, i)
+
+        self._check_range()
+
+        if first_msg and self.system in (SAT_SYS_GPS, SAT_SYS_BDS):
+            day_start = epoch - epoch % NS_PER_DAY
+            i = bisect_left(times, day_start)
+            if i < len(times) and times[i] < day_start + NS_PER_DAY:
+                return week_second, self.eph(number, i)
+
+        # the earliest message within the range
+        i = bisect_left(times, epoch - self._range)
+        if i == len(times) or times[i] - epoch > self._range:
+            return None
+
+        if self._gps_way:
+            return week_second, self.eph(number, i)
+        return (epoch - times[i]) / NS_PER_SEC, self.eph(number, i)
+
+    def select_batch(self, epochs, number, first_msg=False):
+        """select_batch(epochs, number, first_msg=False) -> seconds, indices
+
+        select the messages for an array of epochs at once.
+
+        Parameters
+        ----------
+        epochs : array_like
+            ns since the start of the GPS time
+        number : int
+            satellite number
+        first_msg : bool, optional
+            take the first message of the epoch's day (GPS and BDS).
+
+        Returns
+        -------
+        seconds : numpy.ndarray
+            week seconds (GPS and similar) or dt (GLONASS and similar);
+            nan if there is no message for the epoch.
+        indices : numpy.ndarray
+            indices of the messages of the satellite (see eph()); -1 if
+            there is no message for the epoch.
+        """
+        epochs = np.asarray(epochs, dtype=np.int64)
+        times = self.times[number]
+        num = len(times)
+
+        # the epoch itself
+        exact = np.searchsorted(times, epochs)
+        found = exact < num
+        found[found] = times[exact[found]] == epochs[found]
+
+        indices = np.where(found, exact, -1)
+        pending = ~found
+
+        if pending.any():
+            self._check_range()
+
+        if pending.any() and first_msg and self.system in (SAT_SYS_GPS,
+                                                           SAT_SYS_BDS):
+            # the first message of the epoch's day
+            day_start = epochs - epochs % NS_PER_DAY
+            first = np.searchsorted(times, day_start)
+            in_day = first < num
+            in_day[in_day] = (times[first[in_day]] <
+                              day_start[in_day] + NS_PER_DAY)
+            in_day &= pending
+            indices[in_day] = first[in_day]
+            pending &= ~in_day
+
+        if pending.any():
+            # the earliest message within the range
+            first = np.searchsorted(times, epochs - self._range)
+            valid = first < num
+            valid[valid] = (times[first[valid]] - epochs[valid] <=
+                            self._range)
+            valid &= pending
+            indices[valid] = first[valid]
+
+        seconds = np.full(len(epochs), np.nan)
+        selected = indices >= 0
+
+        if self._gps_way:
+            start = EPOCH_START[self.system]
+            seconds[selected] = ((epochs[selected] - start) % NS_PER_WEEK /
+                                 NS_PER_SEC)
+        else:
+            seconds[selected] = ((epochs[selected] -
+                                  times[indices[selected]]) / NS_PER_SEC)
+
+        return seconds, indices
+
+
 def select_navigation_message(epoch, system, number, message, first_msg=False):
     """select_navigation_message(epoch, system, number, message,
             first_msg=False) -> seconds, ephemeris
@@ -195,10 +843,13 @@ def select_navigation_message(epoch, system, number, message, first_msg=False):
 
     Parameters
     ---------
-    epoch : datetime.datetime
+    epoch : int
+        ns since the start of the GPS time
     system : str
     number : int
     message : dict
+        {system: {number: {epoch: eph}}} or {system: EphemerisIndex};
+        the index is built on the fly for the former.
     first_msg : bool, optional
         If the `first_msg` is True return the first message of
         the day.
@@ -229,83 +880,8 @@ def select_navigation_message(epoch, system, number, message, first_msg=False):
         logger.info(msg.format(sys=system, sat=number))
         return None
 
-    gps_way = (SAT_SYS_GPS, SAT_SYS_BDS, SAT_SYS_GAL)
-    # glo_way = (SAT_SYS_GLO, SAT_SYS_GEO)
-
-    epoch_start = None
-    week_second = None
-    if system == SAT_SYS_GPS:
-        # GPS epoch started at 00:00:00 UT January 6, 1980
-        epoch_start = gps.epoch_start
-
-    elif system == SAT_SYS_BDS:
-        # BDS epoch started at 00:00:00 UT January 1, 2006
-        epoch_start = datetime.datetime(2006, 1, 1, 0, 0, 0)
-
-    elif system == SAT_SYS_GAL:
-        # Galileo epoch started at 00:00:00 GPS August 22, 1999
-        # 13 leap seconds have been introduced into UTC since 1980
-        epoch_start = datetime.datetime(1999, 8, 22, 0, 0, 13)
-
-    if system in gps_way:
-        week_second = get_week_sec(epoch, epoch_start)
-
-    time = epoch.time()
-    # number of seconds from start of the day
-    obs_dt = datetime.timedelta(0, (time.hour * 60 ** 2 +
-                                    time.minute * 60 +
-                                    time.second))
-
-    message_times = sorted(message[system][number].keys())
-
-    # no need to look for
-    if time in message[system][number]:
-        if system in gps_way:
-            t = week_second
-        else:
-            t = 0
-        return t, message[system][number][time]
-
-    # time deltas
-    if system in (SAT_SYS_GPS, SAT_SYS_BDS):
-        # the first message of the day
-        if first_msg:
-            return week_second, message[system][number][message_times[0]]
-
-        # 2 hours GPS & BDS (?)
-        dt = datetime.timedelta(0, 7200)
-
-    # 3 hours Galileo
-    elif system == SAT_SYS_GAL:
-        dt = datetime.timedelta(0, 10800)
-
-    elif system == SAT_SYS_GLO:
-        # in 15 minutes range
-        dt = datetime.timedelta(0, 900)
-
-    elif system == SAT_SYS_GEO:
-        # in 4 minutes and 16 seconds range
-        dt = datetime.timedelta(0, 256)
-
-    else:
-        msg = 'Unsupported satellite system {}.'.format(system)
-        raise Exception(msg)
-
-    for mt in message_times:
-        mt_dt = datetime.timedelta(0, (mt.hour * 60 ** 2 +
-                                       mt.minute * 60 +
-                                       mt.second))
-        ier = 1
-        if obs_dt > mt_dt:
-            diff = obs_dt - mt_dt
-        else:
-            diff = mt_dt - obs_dt
-            ier = -1
-
-        if dt >= diff:
-            diff = diff.total_seconds() * ier
-            if system in gps_way:
-                diff = week_second
-            return diff, message[system][number][mt]
+    sat_index = message[system]
+    if not isinstance(sat_index, EphemerisIndex):
+        sat_index = EphemerisIndex(system, sat_index)
 
-    return None
+    return sat_index.select(epoch, number, first_msg)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: sp3.py
+Description: SP3 precise orbit files
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+import logging
+import os
+import os.path
+import re
+from builtins import object
+
+import numpy as np
+
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import NS_PER_SEC, datetime2ns
+from tecs.rinex.futils import UncompressError, expand_nav
+from tecs.rinex.label import SAT_SYS_GPS
+from tecs.sat.orbit import ORBIT_GRID_ORDER, PreciseOrbit
+
+NAME = 'tecs.rinex.sp3'
+
+# the time systems of the epochs which are the GPS time
+GPS_TIME_SYSTEMS = ('GPS', 'ccc', '')
+
+# igsWWWWD.sp3, codWWWWD.eph
+RE_CLASSIC_SP3 = re.compile(r'^\w{3}(\d{4})(\d)\.(sp3|eph)(\.z|\.gz)?$', re.I)
+# IGS0OPSFIN_20161020000_01D_15M_ORB.SP3.gz
+RE_MODERN_SP3 = re.compile(
+    r'^\w{10}_(\d{4})(\d{3})\d{4}_01D_\w{3}_ORB\.SP3(\.gz)?$', re.I)
+
+GPS_EPOCH_START = datetime.date(1980, 1, 6)
+
+
+class SP3(object):
+    """SP3(filename) -> instance
+
+    satellite positions of an SP3 (a, c, d) file.
+
+    Attributes
+    ----------
+    epochs : numpy.ndarray
+        epochs of the positions, ns since the start of the GPS time
+    positions : dict
+        {(system, number): numpy.ndarray (epochs, 3)}, meters; nan where
+        the position is missing
+    interval : float
+        interval between the epochs, seconds
+
+    Parameters
+    ----------
+    filename : str
+        path to the file (could be compressed)
+
+    Raises
+    ------
+    RinexError
+        if the file can't be parsed
+    UncompressError
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.interval = None
+        self.time_system = ''
+
+        epochs = []
+        records = {}
+
+        f_obj = expand_nav(filename)
+        try:
+            self._read(f_obj, epochs, records)
+        except (ValueError, IndexError) as err:
+            raise RinexError(filename, "can't parse the SP3 file: %s" % err)
+        finally:
+            f_obj.close()
+
+        if self.time_system not in GPS_TIME_SYSTEMS:
+            msg = "the time system '{}' is not supported.".format(
+                self.time_system)
+            raise RinexError(filename, msg)
+
+        self.epochs = np.array(epochs, dtype=np.int64)
+
+        self.positions = {}
+        for sat in records:
+            positions = np.full((len(epochs), 3), np.nan)
+            for (i, xyz) in records[sat]:
+                positions[i] = xyz
+            self.positions[sat] = positions
+
+    def _read(self, f_obj, epochs, records):
+        """_read(f_obj, epochs, records) -> None
+        """
+        line = f_obj.readline()
+        if not line.startswith('#'):
+            raise RinexError(self.filename, 'not an SP3 file.')
+
+        for line in f_obj:
+            if line.startswith('##'):
+                self.interval = float(line[24:38])
+
+            elif line.startswith('%c') and not self.time_system:
+                self.time_system = line[9:12].strip()
+
+            elif line.startswith('*'):
+                epoch = datetime.datetime(int(line[3:7]), int(line[8:10]),
+                                          int(line[11:13]), int(line[14:16]),
+                                          int(line[17:19]))
+                epoch = datetime2ns(epoch) + int(round(float(line[20:31]) *
+                                                       NS_PER_SEC))
+                epochs.append(epoch)
+
+            elif line.startswith('P'):
+                system = line[1]
+                if system == ' ':
+                    # SP3-a
+                    system = SAT_SYS_GPS
+                number = int(line[2:4])
+
+                xyz = (float(line[4:18]), float(line[18:32]),
+                       float(line[32:46]))
+                # bad or absent values
+                if xyz == (0., 0., 0.):
+                    continue
+
+                sat = (system, number)
+                if sat not in records:
+                    records[sat] = []
+                records[sat].append((len(epochs) - 1,
+                                     tuple(v * 1000 for v in xyz)))
+
+            elif line.startswith('EOF'):
+                break
+
+
+def sp3_date(name):
+    """sp3_date(name) -> date or None
+
+    Parameters
+    ----------
+    name : str
+        file name of the SP3 file
+
+    Returns
+    -------
+    date : datetime.date
+    """
+    match = RE_CLASSIC_SP3.match(name)
+    if match:
+        days = int(match.group(1)) * 7 + int(match.group(2))
+        return GPS_EPOCH_START + datetime.timedelta(days)
+
+    match = RE_MODERN_SP3.match(name)
+    if match:
+        date_str = '{}-{}'.format(match.group(1), match.group(2))
+        try:
+            return datetime.datetime.strptime(date_str, '%Y-%j').date()
+        except ValueError:
+            return None
+
+    return None
+
+
+class SP3Index(object):
+    """SP3Index(paths) -> instance
+
+    SP3 files of the directories by date; the directories are listed
+    once.
+
+    Parameters
+    ----------
+    paths : list
+        directories
+    """
+
+    def __init__(self, paths):
+        logger = logging.getLogger(NAME + '.SP3Index')
+
+        self.paths = list(paths)
+        # {date: [filename, ...]}
+        self._files = {}
+
+        for path in self.paths:
+            try:
+                names = sorted(os.listdir(path))
+            except OSError as err:
+                logger.warning("Can't list {}: {}".format(path, err))
+                continue
+
+            for name in names:
+                date = sp3_date(name)
+                if date is not None:
+                    self._files.setdefault(date, []).append(
+                        os.path.join(path, name))
+
+    def find(self, date):
+        """find(date) -> filename or None
+
+        the first file of the date (in the order of the directories and
+        the names).
+
+        Parameters
+        ----------
+        date : datetime.date
+
+        Returns
+        -------
+        filename : str
+        """
+        files = self._files.get(date)
+        if not files:
+            return None
+        return files[0]
+
+
+def load_precise_orbit(sp3_index, date, order=ORBIT_GRID_ORDER, store=None):
+    """load_precise_orbit(sp3_index, date, order=ORBIT_GRID_ORDER,
+            store=None) -> orbit or None
+
+    load the SP3 files of the date and of the adjacent days (to
+    interpolate at the day boundaries).
+
+    Parameters
+    ----------
+    sp3_index : SP3Index
+    date : datetime.date
+    order : int
+        order of the interpolating polynomial
+    store : tecs.sat.orbitstore.OrbitStore, optional
+        the positions are taken from the store if they are there, and
+        stored otherwise.
+
+    Returns
+    -------
+    orbit : tecs.sat.orbit.GridOrbit
+        None if there is no SP3 file of the date.
+    """
+    logger = logging.getLogger(NAME + '.load_precise_orbit')
+
+    filename = sp3_index.find(date)
+    if filename is None:
+        msg = "Can't find any SP3 file on {}.".format(date)
+        logger.warning(msg)
+        return None
+
+    filenames = [filename]
+    for day in (-1, 1):
+        adjacent = sp3_index.find(date + datetime.timedelta(day))
+        if adjacent is not None:
+            filenames.append(adjacent)
+
+    key = '{}.sp3'.format(date.strftime('%Y-%j'))
+    if store is not None:
+        orbit = store.load(key, filenames, order=order)
+        if orbit is not None:
+            return orbit
+
+    try:
+        sp3_files = [SP3(filename)]
+    except (RinexError, UncompressError) as err:
+        logger.error(str(err))
+        return None
+
+    for adjacent in filenames[1:]:
+        try:
+            sp3_files.append(SP3(adjacent))
+        except (RinexError, UncompressError) as err:
+            logger.debug(str(err))
+
+    orbit = PreciseOrbit(sp3_files, order)
+
+    if store is not None:
+        store.save(key, orbit, filenames)
+
+    return orbit
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: stream.py
+Description: observation files of a station-day read as a single one
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+from builtins import next
+from builtins import object
+
+from tecs.rinex import obs_file
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import EpochSampler, date2day
+from tecs.rinex.futils import UncompressError
+
+NAME = 'tecs.rinex.stream'
+
+
+class ObsStream(object):
+    """ObsStream(filenames) -> instance
+
+    observation files of the same station-day (hourly, 15-minute ones)
+    read as a single file. The files are opened one by one; the header
+    values (`xyz`, obs types, etc.) are those of the file being read.
+    The epochs already read from the previous files are skipped, so the
+    overlapping files give no duplicates. `name` (the first file and the
+    number of the others) stays the same while the files are read.
+
+    The records iterator survives the errors: if a file can't be read,
+    the error is raised and the next call goes on with the next file.
+
+    Parameters
+    ----------
+    filenames : list
+        paths to the files ordered by time
+
+    Raises
+    ------
+    RinexError, UncompressError
+        if the first file can't be opened.
+    """
+
+    def __init__(self, filenames):
+        self.filenames = list(filenames)
+
+        # the station-day in the messages
+        self.name = self.filenames[0]
+        if len(self.filenames) > 1:
+            self.name = '{} (+{} more)'.format(self.filenames[0],
+                                               len(self.filenames) - 1)
+
+        # the current file
+        self._index = 0
+        self._obs = obs_file(self.filenames[0])
+
+        self._time_sys = self._obs.tofo.value[1]
+
+        self._records = None
+        self._sampler = None
+        self._sat_filter = None
+        self._systems = None
+
+        # the latest epoch of the previous files and of the current one
+        self._latest = None
+        self._cur_latest = None
+
+    def __getattr__(self, name):
+        # header of the current file
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._obs, name)
+
+    def __iter__(self):
+        return self
+
+    def _open_next(self):
+        """_open_next() -> None
+
+        open the next file.
+
+        Raises
+        ------
+        StopIteration
+            if there are no more files.
+        RinexError, UncompressError
+            if the file can't be opened.
+        """
+        logger = logging.getLogger(NAME + '._open_next')
+
+        self._index += 1
+        if self._index >= len(self.filenames):
+            raise StopIteration
+
+        filename = self.filenames[self._index]
+
+        obs = obs_file(filename)
+        time_sys = obs.tofo.value[1]
+        if time_sys != self._time_sys:
+            obs.close()
+            msg = "system time '{}' differs from '{}' of {}.".format(
+                time_sys, self._time_sys, self.filenames[0])
+            raise RinexError(filename, msg)
+
+        msg = '{}: go on with {}.'.format(self._obs.filename, filename)
+        logger.debug(msg)
+
+        self._obs = obs
+        self._records = obs.read_records(sampler=self._sampler,
+                                         sat_filter=self._sat_filter,
+                                         systems=self._systems)
+
+    def _close_current(self):
+        """_close_current() -> None
+        """
+        self._obs.close()
+        self._records = None
+
+        if self._cur_latest is not None:
+            self._latest = self._cur_latest
+
+    def __next__(self):
+        while True:
+            if self._records is None:
+                self._open_next()
+
+            try:
+                epoch, sat, data = next(self._records)
+            except StopIteration:
+                self._close_current()
+                continue
+            except (RinexError, UncompressError):
+                self._close_current()
+                raise
+
+            # overlapping files
+            if self._latest is not None and epoch <= self._latest:
+                continue
+
+            if self._cur_latest is None or epoch > self._cur_latest:
+                self._cur_latest = epoch
+
+            return epoch, sat, data
+
+    def read_records(self, sampling_interval=None, sat_filter=None,
+                     systems=None):
+        """read_records(sampling_interval=None, sat_filter=None,
+        systems=None) -> iterator
+
+        Parameters
+        ----------
+        sampling_interval : int, optional
+            if given, epochs (of the file date) are decimated to this
+            interval, ns; the sampling is continuous across the files.
+        sat_filter : object, optional
+            sat_filter.pick(epoch, sat) -> bool; the records of the
+            satellites it doesn't pick are skipped without parsing.
+        systems : sequence, optional
+            satellite systems to read; the epochs without records of
+            them don't take part in the decimation.
+
+        Returns
+        -------
+            dataset : tuple
+            (epoch, sat, data) with
+                data = { obs_1: val, obs_2: val, ... }
+        """
+        if sampling_interval:
+            self._sampler = EpochSampler(sampling_interval,
+                                         date2day(self._obs.filename_date))
+
+        self._sat_filter = sat_filter
+        self._systems = systems
+
+        self._records = self._obs.read_records(sampler=self._sampler,
+                                               sat_filter=sat_filter,
+                                               systems=systems)
+
+        return self
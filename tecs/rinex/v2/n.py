@@ -28,17 +28,25 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 from builtins import map
+from builtins import range
 
 import logging
+from itertools import islice
+
+import numpy as np
 
 from tecs.rinex.basic import NavigationMessage, read_header, RinexError
-from tecs.rinex.common import validate_epoch, sec2sec_ms
+from tecs.rinex.common import epoch2ns, sec2ns, date2day, ns2datetime, \
+    NS_PER_DAY
 from tecs.rinex.header import RinexVersionType
 from tecs.rinex.nmsg import GPSNavigationMessage, GLONASSNavigationMessage, \
-    SBASNavigationMessage
+    SBASNavigationMessage, ephemeris_message
 
 NAME = 'tecs.rinex.v2.n'
 
+# the exponent of the values could be written as 'D'
+EXP_TABLE = {ord('D'): 'e', ord('d'): 'e'}
+
 
 class Nav2(NavigationMessage):
     _name = NAME + '.Nav2'
@@ -66,10 +74,14 @@ class Nav2(NavigationMessage):
 
         self.ver_type = RinexVersionType(self.version)
         self.date = self.filename_date
+        self._day = date2day(self.date)
 
         header = read_header(f_obj)
         self._parse_header(header)
 
+        # {system: ephemeris structured array}
+        self.ephemeris = {}
+        # {system: {number: {epoch: eph}}}
         self.message = {}
         try:
             self._read_message()
@@ -80,64 +92,130 @@ class Nav2(NavigationMessage):
 
         logger = logging.getLogger(self._name + '._read_message')
 
-        orbits = []
-        num_of_orbits = 0
-        system, num, epoch, sv_clock, reader = (None,) * 5
-        vals_per_orbit = None
+        # epoch records and broadcast orbits lines of the systems:
+        # {system: ([(number, epoch, sv_clock), ...], [line, ...])}
+        records = {}
 
         for line in self._fobj:
             # sv/epoch/sc clock
-            if not line[0:self.spaces].isspace():
-                system, num, epoch, sv_clock = self._parse_epoch_record(
-                    line)
-
-                if system in self.msg_reader:
-                    reader = self.msg_reader[system](num, epoch, sv_clock)
-                else:
-                    msg = "unknown satellite system '{}'.".format(system)
-                    raise RinexError(self.filename, msg)
-
-                vals_per_orbit = reader.vals_per_orbit
-                num_of_orbits = reader.num_of_orbits
-                continue
+            if line[0:self.spaces].isspace():
+                msg = 'error occurred while reading the file.'
+                raise RinexError(self.filename, msg)
+
+            system, num, epoch, sv_clock = self._parse_epoch_record(line)
+
+            if system not in self.msg_reader:
+                msg = "unknown satellite system '{}'.".format(system)
+                raise RinexError(self.filename, msg)
 
             # broadcast orbits
-            if num_of_orbits:
-                orbits.append(line)
-                num_of_orbits -= 1
-                if num_of_orbits:
-                    continue
+            num_of_orbits = len(self.msg_reader[system].vals_per_orbit)
+            orbits = list(islice(self._fobj, num_of_orbits))
 
-            if reader is None or vals_per_orbit is None:
+            if len(orbits) != num_of_orbits:
                 msg = 'error occurred while reading the file.'
                 raise RinexError(self.filename, msg)
 
-            if self.date != epoch.date():
+            if self._day != epoch // NS_PER_DAY:
                 msg_fmt = ("date extracted from the file name '{}' doesn't "
                            "match the date of the navigation message: "
-                           "{} != {} ({}).")
+                           "{} != {}.")
                 msg = msg_fmt.format(self.filename,
                                      self.date,
-                                     epoch.date(),
-                                     epoch.time())
+                                     ns2datetime(epoch))
                 logger.info(msg)
-
-                orbits = []
-                reader = None
                 continue
 
-            # message
-            reader.message = self._read_orbits(orbits, vals_per_orbit)
+            if system not in records:
+                records[system] = ([], [])
+
+            records[system][0].append((num, epoch, sv_clock))
+            records[system][1].extend(orbits)
+
+        for system in records:
+            epochs, orbits = records[system]
+            ephemeris = self._decode_orbits(system, epochs, orbits)
+            self.ephemeris[system] = ephemeris
+            self.message[system] = ephemeris_message(ephemeris)
+
+    def _decode_orbits(self, system, epochs, orbits):
+        """_decode_orbits(system, epochs, orbits) -> ephemeris
+
+        decode the broadcast orbits of the system all at once.
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        epochs : list
+            [(number, epoch, sv_clock), ...] of the messages
+        orbits : list
+            broadcast orbits lines of the messages
+
+        Returns
+        -------
+        ephemeris : numpy.ndarray
+            structured array (see GNSSNavigationMessage.dtype()) sorted
+            by the satellite number and the epoch; the latest message
+            wins if there are some with the same number and epoch.
+        """
+        reader = self.msg_reader[system]
+        vals_per_orbit = reader.vals_per_orbit
+        num_of_orbits = len(vals_per_orbit)
+
+        # fixed width fields of the lines
+        width = self.rec_len * 4
+        start = self.orbit_start
+        text = ''.join(
+            [l.rstrip('\r\n')[start:start + width].ljust(width)
+             for l in orbits])
+        text = text.translate(EXP_TABLE).encode('ascii', 'replace')
+
+        fields = np.frombuffer(text, dtype='S{}'.format(self.rec_len))
+        fields = fields.reshape(len(epochs), num_of_orbits * 4)
+
+        columns = [o * 4 + i
+                   for (o, num) in enumerate(vals_per_orbit)
+                   for i in range(num)]
+        fields = fields[:, columns]
+        fields[fields == b' ' * self.rec_len] = b'0'
+
+        try:
+            values = fields.astype(np.float64)
+        except ValueError:
+            # find out the message to complain about
+            for i in range(len(epochs)):
+                self._read_orbits(
+                    orbits[i * num_of_orbits:(i + 1) * num_of_orbits],
+                    vals_per_orbit)
+            msg = "can't read the messages of '{}'.".format(system)
+            raise RinexError(self.filename, msg)
+
+        ephemeris = np.empty(len(epochs), dtype=reader.dtype())
+        if not epochs:
+            return ephemeris
+
+        (numbers, times, sv_clocks) = zip(*epochs)
+        ephemeris['number'] = numbers
+        ephemeris['epoch'] = times
+
+        for (i, field) in enumerate(reader.clock_fields):
+            ephemeris['sv_clock'][field] = [c[i] for c in sv_clocks]
+
+        for (i, field) in enumerate(reader.fields):
+            ephemeris['eph'][field] = values[:, i]
 
-            if system not in self.message:
-                self.message[system] = {}
-            if num not in self.message[system]:
-                self.message[system][num] = {}
+        # the latest message of the same number and epoch wins
+        order = np.lexsort((np.arange(len(ephemeris)),
+                            ephemeris['epoch'],
+                            ephemeris['number']))
+        ephemeris = ephemeris[order]
 
-            self.message[system][num][epoch.time()] = tuple(reader.message)
+        key = ephemeris[['number', 'epoch']]
+        latest = np.ones(len(ephemeris), dtype=bool)
+        latest[:-1] = key[1:] != key[:-1]
 
-            orbits = []
-            reader = None
+        return ephemeris[latest]
 
     def _read_orbits(self, orbits, vals_per_orbit):
         broadcast_orbits = []
@@ -180,10 +258,9 @@ class Nav2(NavigationMessage):
         try:
             system = self.file_types[system]
             number = int(number)
-            sec = sec2sec_ms(float(sec))
             epoch = list(map(int, epoch))
-            epoch += list(sec)
-            epoch = validate_epoch(epoch)
+            epoch.append(sec2ns(sec))
+            epoch = epoch2ns(epoch)
             sv_clock = list(map(float, sv_clock))
         except (ValueError, KeyError):
             msg = "Can't read epoch: {}.".format(epoch_record)
@@ -34,7 +34,9 @@ import re
 
 from tecs.rinex.basic import ObservationData
 from tecs.rinex.basic import RinexError
-from tecs.rinex.common import validate_epoch
+from tecs.rinex.crx import CrxDecoder
+from tecs.rinex.common import epoch2ns, sec2ns, ns2datetime, date2day, \
+    NS_PER_SEC, EpochSampler
 from tecs.rinex.header import RinexVersionType, ApproxPositionXYX, Interval, \
     TimeOfFirstObs
 
@@ -130,7 +132,8 @@ class Obs2(ObservationData):
         """get_prn(rec, i) -> prn"""
         val = rec[i:i + 3]
         if not val:
-            err = "can't extract satellite:\n%s <%s>" % (cur_epoch, rec)
+            err = "can't extract satellite:\n%s <%s>" % (
+                ns2datetime(cur_epoch), rec)
             raise RinexError(self.filename, err)
 
         # system identifier
@@ -145,7 +148,7 @@ class Obs2(ObservationData):
             cur_sat = int(cur_sat)
         except ValueError:
             err = 'wrong PRN (%s) in epoch record:\n<%s>' % (
-                cur_sat, cur_epoch)
+                cur_sat, ns2datetime(cur_epoch))
             raise RinexError(self.filename, err)
 
         cur_sat = "%02d" % cur_sat
@@ -191,7 +194,7 @@ class Obs2(ObservationData):
                 dt = rec[0] - epoch
 
                 if dt:
-                    deltas.append(dt.total_seconds())
+                    deltas.append(dt / NS_PER_SEC)
                     epoch_count += 1
 
                 epoch = rec[0]
@@ -338,7 +341,33 @@ class Obs2(ObservationData):
         Returns
         -------
         epoch_components : tuple
-            (datetime, epoch-flag, num-of-satellites, rcvr-clock-offset, prns)
+            (epoch, epoch-flag, num-of-satellites, rcvr-clock-offset, prns)
+            with epoch in nanoseconds since the start of the GPS time.
+        """
+        (cur_epoch, epoch_flag,
+         sat_num, receiver_offset) = self._parse_epoch_header(epoch)
+
+        if epoch_flag > 1:
+            return cur_epoch, epoch_flag, sat_num, receiver_offset, None
+
+        prns = self._read_prns(epoch, sat_num, cur_epoch)
+
+        return cur_epoch, epoch_flag, sat_num, receiver_offset, prns
+
+    def _parse_epoch_header(self, epoch):
+        """_parse_epoch_header(epoch) -> epoch_components
+
+        parse the first line of an epoch record except the list of PRNs.
+
+        Parameters
+        ----------
+        epoch : str
+            epoch record
+
+        Returns
+        -------
+        epoch_components : tuple
+            (epoch, epoch-flag, num-of-satellites, rcvr-clock-offset)
         """
 
         # assume that the first element is an epoch
@@ -358,7 +387,7 @@ class Obs2(ObservationData):
 
             try:
                 sat_num = int(epoch[29:32])
-                return None, epoch_flag, sat_num, None, None
+                return None, epoch_flag, sat_num, None
 
             except ValueError:
                 err = "wrong event flag:\n%s" % epoch
@@ -372,14 +401,9 @@ class Obs2(ObservationData):
                 val = int(val)
                 d.append(val)
 
-            sec = float(epoch[15:26])
-            microsec = (sec - int(sec)) * 1e+6
-            microsec = float("%.5f" % microsec)
+            d.append(sec2ns(epoch[15:26]))
 
-            d.append(int(sec))
-            d.append(int(microsec))
-
-            cur_epoch = validate_epoch(d)
+            cur_epoch = epoch2ns(d)
 
         except (IndexError, ValueError) as err:
             msg = "wrong date in epoch record '%s': %s" % (epoch, str(err))
@@ -399,6 +423,27 @@ class Obs2(ObservationData):
             err = 'wrong satellite number in epoch record:\n%s' % epoch
             raise RinexError(self.filename, err)
 
+        return cur_epoch, epoch_flag, sat_num, receiver_offset
+
+    def _read_prns(self, epoch, sat_num, cur_epoch):
+        """_read_prns(epoch, sat_num, cur_epoch) -> prns
+
+        read the list of PRNs of the epoch record (continuation lines are
+        read from the file).
+
+        Parameters
+        ----------
+        epoch : str
+            the first line of the epoch record
+        sat_num : int
+            number of satellites
+        cur_epoch : int
+            epoch, ns
+
+        Returns
+        -------
+        prns : list
+        """
         # 4. list of PRNs (sat.num + sys identifier)
         prev_epoch_line = ''
         prns = []
@@ -444,70 +489,120 @@ class Obs2(ObservationData):
                 prev_epoch_line, epoch)
             raise RinexError(self.filename, err)
 
-        return cur_epoch, epoch_flag, sat_num, receiver_offset, prns
+        return prns
 
-    def read_records(self):
-        """read_records() -> generator
+    def _handle_event(self, cur_epoch, epoch_flag, sat_num):
+        """_handle_event(cur_epoch, epoch_flag, sat_num) -> None
 
-        Returns
-        -------
-            dataset : tuple
-            (epoch, sat, data) with
-                data = { obs_1: val, obs_2: val, ... }
+        handle the epoch flag != 0; the special records which follow the
+        epoch record are read from the file.
+
+        Parameters
+        ----------
+        cur_epoch : int or None
+            epoch, ns
+        epoch_flag : int
+        sat_num : int
+            number of satellites or special records
         """
+        # 1. Power failure between previous and current epoch
+        if epoch_flag == 1:
+            msg = ('%s - power failure between previous and current '
+                   'epoch %s.') % (self.filename, ns2datetime(cur_epoch))
+            self._logger.info(msg)
 
-        for line in self._fobj:
-            (cur_epoch, epoch_flag,
-             sat_num, receiver_offset, prns) = self.read_epoch(line.rstrip())
+        # 3. New site occupation
+        elif epoch_flag == 3:
+            msg = "New site occupation: {} - {}."
+            msg = msg.format(cur_epoch, self.filename)
+            self._logger.info(msg)
 
-            # if the flag != 0
+            header_slice = []
+            while sat_num > 0:
+                h_str = self._next_rec(self._fobj)
+                header_slice.append(h_str)
+                sat_num -= 1
+
+            self._parse_header(header_slice)
+
+        # 4. Header information
+        elif epoch_flag == 4:
+            header_slice = []
+            while sat_num > 0:
+                sat_num -= 1
+                h_str = self._next_rec(self._fobj)
+                header_slice.append(h_str)
+                msg = "%s: %s." % (self.filename, h_str)
+                self._logger.debug(msg)
 
-            # 1. Power failure between previous and current epoch
-            if epoch_flag == 1:
-                msg = ('%s - power failure between previous and current '
-                       'epoch %s.') % (self.filename, cur_epoch)
-                self._logger.info(msg)
+            self._parse_header(header_slice)
 
-            # 3. New site occupation
-            elif epoch_flag == 3:
-                msg = "New site occupation: {} - {}."
-                msg = msg.format(cur_epoch, self.filename)
-                self._logger.info(msg)
+        # n. Some other
+        elif epoch_flag > 1:
+            msg = 'epoch flag = %s; %s record(s) to follow: %s - %s.' % (
+                epoch_flag, sat_num, cur_epoch, self.filename)
+            self._logger.debug(msg)
 
-                header_slice = []
-                while sat_num > 0:
-                    h_str = self._next_rec(self._fobj)
-                    header_slice.append(h_str)
-                    sat_num -= 1
+            while sat_num > 0:
+                msg = self._next_rec(self._fobj)
 
-                self._parse_header(header_slice)
-                continue
+                self._logger.debug(msg)
+                sat_num -= 1
 
-            # 4. Header information
-            elif epoch_flag == 4:
-                header_slice = []
-                while sat_num > 0:
-                    sat_num -= 1
-                    h_str = self._next_rec(self._fobj)
-                    header_slice.append(h_str)
-                    msg = "%s: %s." % (self.filename, h_str)
-                    self._logger.debug(msg)
-
-                self._parse_header(header_slice)
-                continue
+    def read_records(self, sampling_interval=None, sampler=None,
+                     sat_filter=None, systems=None):
+        """read_records(sampling_interval=None, sampler=None,
+        sat_filter=None, systems=None) -> generator
 
-            # n. Some other
-            elif epoch_flag > 1:
-                msg = 'epoch flag = %s; %s record(s) to follow: %s - %s.' % (
-                    epoch_flag, sat_num, cur_epoch, self.filename)
-                self._logger.debug(msg)
+        Parameters
+        ----------
+        sampling_interval : int, optional
+            if given, epochs (of the file date) are decimated to this
+            interval, ns; skipped epochs are not parsed.
+        sampler : EpochSampler, optional
+            sampler to use instead of a new one (e.g. the one shared by
+            the files of the same day); overrides `sampling_interval`.
+        sat_filter : object, optional
+            sat_filter.pick(epoch, sat) -> bool; the records of the
+            satellites it doesn't pick are skipped without parsing.
+        systems : sequence, optional
+            satellite systems to read; the records of the others are
+            skipped without parsing, the epochs without records of these
+            systems don't take part in the decimation.
+
+        Returns
+        -------
+            dataset : tuple
+            (epoch, sat, data) with
+                data = { obs_1: val, obs_2: val, ... }
+        """
+        if sampler is None and sampling_interval:
+            sampler = EpochSampler(sampling_interval,
+                                   date2day(self.filename_date))
 
-                while sat_num > 0:
-                    msg = self._next_rec(self._fobj)
+        for line in self._fobj:
+            line = line.rstrip()
+            (cur_epoch, epoch_flag,
+             sat_num, receiver_offset) = self._parse_epoch_header(line)
 
-                    self._logger.debug(msg)
-                    sat_num -= 1
+            # if the flag != 0
+            if epoch_flag:
+                self._handle_event(cur_epoch, epoch_flag, sat_num)
+                if epoch_flag > 1:
+                    continue
 
+            prns = self._read_prns(line, sat_num, cur_epoch)
+            if systems is not None:
+                selected = [prn for prn in prns if prn[0] in systems]
+            else:
+                selected = prns
+
+            # decimation: skip the records without parsing
+            if not selected or (sampler is not None and
+                                not sampler.pick(cur_epoch)):
+                self._skip_recs(self._fobj,
+                                len(prns) * len(self.lines_per_rec))
+                self.preceding_epoch = cur_epoch
                 continue
 
             # FIXME should I?
@@ -517,6 +612,12 @@ class Obs2(ObservationData):
             # read the records
             for cur_prn in prns:
 
+                if (systems is not None and cur_prn[0] not in systems or
+                        sat_filter is not None and
+                        not sat_filter.pick(cur_epoch, cur_prn)):
+                    self._skip_recs(self._fobj, len(self.lines_per_rec))
+                    continue
+
                 data = []
 
                 for n in self.lines_per_rec:
@@ -541,7 +642,7 @@ class Obs2(ObservationData):
                 # it could be epoch duplicate: just skip
                 if cur_epoch == self.preceding_epoch:
                     msg = "%s - duplicate dates: %s" % (
-                        self.filename, str(cur_epoch))
+                        self.filename, str(ns2datetime(cur_epoch)))
                     self._logger.info(msg)
                     continue
 
@@ -647,3 +748,151 @@ class Obs211(Obs21):
 
     def set_logger(self):
         self._logger = logging.getLogger(NAME + '.Obs211')
+
+
+class CompactObs2(Obs2):
+    """CompactObs2(f_obj, filename) -> instance
+
+    Compact RINEX 1.0 (Hatanaka-compressed RINEX ver.2) observation data;
+    the records are restored by CrxDecoder directly, without RINEX text.
+
+    Parameters
+    ----------
+    f_obj : file
+        file-like object
+
+    filename : str
+        a name of the file
+    """
+    CRX_VERSION = 1.0
+
+    def set_logger(self):
+        self._logger = logging.getLogger(NAME + '.CompactObs2')
+
+    def _compose_record(self, values, flags):
+        """_compose_record(values, flags) -> data
+
+        Parameters
+        ----------
+        values : list
+            observation values (int, 1e-3) or None
+        flags : str
+            LLI and signal strength flags
+
+        Returns
+        -------
+        data : dict
+            { obs_1: (val, lli, sig_strength), ... } as Obs2 returns
+        """
+        data = {}
+        for i, o_type in enumerate(self.properties['obs types']):
+            val = values[i]
+            if val is None:
+                data[o_type] = (None, 0, 0)
+                continue
+
+            lli, sig_strength = flags[2 * i], flags[2 * i + 1]
+            data[o_type] = (val / 1000.,
+                            int(lli) if lli.isdigit() else 0,
+                            int(sig_strength) if sig_strength.isdigit() else 0)
+
+        return data
+
+    def read_records(self, sampling_interval=None, sampler=None,
+                     sat_filter=None, systems=None):
+        """read_records(sampling_interval=None, sampler=None,
+        sat_filter=None, systems=None) -> generator
+
+        Parameters
+        ----------
+        sampling_interval : int, optional
+            if given, epochs (of the file date) are decimated to this
+            interval, ns.
+        sampler : EpochSampler, optional
+            sampler to use instead of a new one (e.g. the one shared by
+            the files of the same day); overrides `sampling_interval`.
+        sat_filter : object, optional
+            sat_filter.pick(epoch, sat) -> bool; the records of the
+            satellites it doesn't pick are skipped without parsing.
+        systems : sequence, optional
+            satellite systems to read; the records of the others are
+            skipped without parsing, the epochs without records of these
+            systems don't take part in the decimation.
+
+        Returns
+        -------
+            dataset : tuple
+            (epoch, sat, data) with
+                data = { obs_1: val, obs_2: val, ... }
+        """
+        if sampler is None and sampling_interval:
+            sampler = EpochSampler(sampling_interval,
+                                   date2day(self.filename_date))
+
+        crx = CrxDecoder(self.CRX_VERSION, self.filename)
+
+        for line in self._fobj:
+            line = crx.epoch_record(line.rstrip())
+            (cur_epoch, epoch_flag,
+             sat_num, receiver_offset) = self._parse_epoch_header(line)
+
+            # if the flag != 0
+            if epoch_flag:
+                self._handle_event(cur_epoch, epoch_flag, sat_num)
+                if epoch_flag > 1:
+                    continue
+
+            # the offset isn't used (see Obs2), but its differences have
+            # to be kept going
+            crx.clock_offset(self._next_rec(self._fobj))
+
+            # all the PRNs are in the epoch record
+            prns = [self._get_prn(line, i, cur_epoch)
+                    for i in range(32, 32 + 3 * sat_num, 3)]
+
+            # values have to be restored anyway to keep the differences
+            # going, skipped epochs just aren't composed
+            skip = (
+                systems is not None and
+                not any(prn[0] in systems for prn in prns) or
+                sampler is not None and not sampler.pick(cur_epoch))
+
+            if cur_epoch == self.preceding_epoch and not skip:
+                msg = "%s - duplicate dates: %s" % (
+                    self.filename, str(ns2datetime(cur_epoch)))
+                self._logger.info(msg)
+                skip = True
+
+            obs_num = len(self.properties['obs types'])
+
+            for cur_prn in prns:
+                rec = self._next_rec(self._fobj)
+                values, flags = crx.data_record(cur_prn, rec, obs_num)
+
+                if skip:
+                    continue
+
+                if (systems is not None and cur_prn[0] not in systems or
+                        sat_filter is not None and
+                        not sat_filter.pick(cur_epoch, cur_prn)):
+                    continue
+
+                yield (cur_epoch, cur_prn,
+                       self._compose_record(values, flags))
+
+            crx.close_epoch(prns)
+            self.preceding_epoch = cur_epoch
+
+
+class CompactObs21(CompactObs2, Obs21):
+    """Compact RINEX 1.0, RINEX obs v2.1"""
+
+    def set_logger(self):
+        self._logger = logging.getLogger(NAME + '.CompactObs21')
+
+
+class CompactObs211(CompactObs2, Obs211):
+    """Compact RINEX 1.0, RINEX obs v2.11"""
+
+    def set_logger(self):
+        self._logger = logging.getLogger(NAME + '.CompactObs211')
@@ -30,7 +30,7 @@ from __future__ import unicode_literals
 from builtins import map
 
 from tecs.rinex.basic import RinexError
-from tecs.rinex.common import validate_epoch
+from tecs.rinex.common import epoch2ns, NS_PER_SEC
 from tecs.rinex.nmsg import GPSNavigationMessage, GLONASSNavigationMessage, \
     GalileoNavigationMessage, SBASNavigationMessage, BDSNavigationMessage, \
     QZSSNavigationMessage, IRNSSNavigationMessage
@@ -86,7 +86,8 @@ class Nav3(Nav2):
         try:
             number = int(number)
             epoch = list(map(int, epoch))
-            epoch = validate_epoch(epoch)
+            epoch[-1] *= NS_PER_SEC
+            epoch = epoch2ns(epoch)
             sv_clock = list(map(float, sv_clock))
         except ValueError:
             msg = "Can't read epoch: {}.".format(epoch_record)
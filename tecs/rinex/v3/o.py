@@ -28,13 +28,15 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 from builtins import map
+from builtins import range
 
 import logging
-from datetime import timedelta
 
 from tecs.rinex.basic import ObservationData
 from tecs.rinex.basic import RinexError
-from tecs.rinex.common import validate_epoch, sec2sec_ms
+from tecs.rinex.crx import CrxDecoder
+from tecs.rinex.common import epoch2ns, sec2ns, ns2datetime, date2day, \
+    NS_PER_SEC, EpochSampler
 from tecs.rinex.header import RinexVersionType, TimeOfFirstObs, \
     ApproxPositionXYX, Interval, SysNObsTypes
 
@@ -75,9 +77,6 @@ class Obs3(ObservationData):
         self._data_chunks = []
         self._det_data_chunks()
 
-    def _next_rec(self, f_obj):
-        pass
-
     def _det_data_chunks(self):
         """_det_data_chunks(self) -> None
 
@@ -115,7 +114,7 @@ class Obs3(ObservationData):
                 raise RinexError(self.filename, err_msg.format('None'))
 
         dt = epoch_records[1] - epoch_records[0]
-        dt = dt.total_seconds()
+        dt = dt / NS_PER_SEC
 
         if dt <= 0:
             raise RinexError(self.filename, err_msg.format(dt))
@@ -138,7 +137,7 @@ class Obs3(ObservationData):
     def _next_epoch(self):
         """_next_epoch() -> None
 
-        retrieves datetime of the next epoch record.
+        retrieves the epoch (ns) of the next epoch record.
 
         Notes
         -----
@@ -181,14 +180,10 @@ class Obs3(ObservationData):
             (epoch, epoch_flag, num_of_sat, clock_offset)
 
             with
-            epoch: datetime,
+            epoch: int, nanoseconds since the start of the GPS time,
             epoch_flag: int,
             num_of_sat: int
-            clock_offset: datetime.timedelta
-
-        Notes
-        -----
-        timestamps accurate to microsecond
+            clock_offset: int, nanoseconds
         """
 
         if not epoch_record[0] == self._epoch_id:
@@ -199,16 +194,11 @@ class Obs3(ObservationData):
         epoch = [epoch_record[i:i + 3] for i in range(6, 17, 3)]
         epoch = [epoch_record[1:6]] + epoch
 
-        sec = epoch_record[18:29]
-
         try:
-            sec = float(sec)
-            sec, micro_sec = sec2sec_ms(sec)
-
-            epoch += [sec, micro_sec]
             epoch = list(map(int, epoch))
+            epoch.append(sec2ns(epoch_record[18:29]))
 
-            epoch = validate_epoch(epoch)
+            epoch = epoch2ns(epoch)
         except ValueError:
             epoch = None
 
@@ -226,11 +216,9 @@ class Obs3(ObservationData):
             raise RinexError(self.filename, msg)
 
         try:
-            sec = float(epoch_record[42:])
-            sec, micro_sec = sec2sec_ms(sec)
-            clock_offset = timedelta(0, sec, micro_sec)
+            clock_offset = sec2ns(epoch_record[42:])
         except ValueError:
-            clock_offset = timedelta(0)
+            clock_offset = 0
 
         return epoch, epoch_flag, num_of_sat, clock_offset
 
@@ -317,21 +305,48 @@ class Obs3(ObservationData):
         logger = logging.getLogger(self._name + '_handle_power_failure')
         msg = '{file} {epoch}: ' \
               'power failure between previous and current epoch.'
-        msg = msg.format(file=self.filename, epoch=epoch)
+        msg = msg.format(file=self.filename, epoch=ns2datetime(epoch))
         logger.info(msg)
 
-    def read_records(self):
-        """read_records() -> generator
+    def read_records(self, sampling_interval=None, sampler=None,
+                     sat_filter=None, systems=None):
+        """read_records(sampling_interval=None, sampler=None,
+        sat_filter=None, systems=None) -> generator
 
         iterate over data records it the file; return (epoch, sat, dataset).
+
+        Parameters
+        ----------
+        sampling_interval : int, optional
+            if given, epochs (of the file date) are decimated to this
+            interval, ns; skipped epochs are not parsed.
+        sampler : EpochSampler, optional
+            sampler to use instead of a new one (e.g. the one shared by
+            the files of the same day); overrides `sampling_interval`.
+        sat_filter : object, optional
+            sat_filter.pick(epoch, sat) -> bool; the records of the
+            satellites it doesn't pick are skipped without parsing.
+        systems : sequence, optional
+            satellite systems to read; the records of the others are
+            skipped without parsing, the epochs without records of these
+            systems don't take part in the decimation.
         """
         epoch, epoch_flag, num_of_sat, clock_offset = (None,) * 4
         special_records = []
+        # whether the decimation has picked the current epoch
+        sampled = True
+
+        if sampler is None and sampling_interval:
+            sampler = EpochSampler(sampling_interval,
+                                   date2day(self.filename_date))
 
         for line in self._fobj:
             if line[0] == self._epoch_id:
                 epoch, epoch_flag, num_of_sat, clock_offset = \
                     self._parse_epoch_record(line)
+
+                # decimation: decided on the first record to read
+                sampled = sampler is None
                 continue
 
             if epoch_flag > 1:
@@ -350,6 +365,25 @@ class Obs3(ObservationData):
 
             if num_of_sat > 0:
                 num_of_sat -= 1
+
+                # the unknown systems are left to _parse_obs_record()
+                sat = line[0:3].replace(' ', '0')
+                known = sat[0:1] in self.sys_n_obs.value
+                if known and systems is not None and sat[0] not in systems:
+                    continue
+
+                # decimation: skip the records without parsing
+                if not sampled:
+                    if not sampler.pick(epoch):
+                        self._skip_recs(self._fobj, num_of_sat)
+                        num_of_sat = 0
+                        continue
+                    sampled = True
+
+                if (known and sat_filter is not None and
+                        not sat_filter.pick(epoch, sat)):
+                    continue
+
                 sat, dataset = self._parse_obs_record(line)
 
                 if not sat[0] in self.sys_n_obs.value:
@@ -392,3 +426,171 @@ class Obs303(Obs302):
 
     def __init__(self, fobj, filename):
         super(Obs303, self).__init__(fobj, filename)
+
+
+class CompactObs3(Obs3):
+    """CompactObs3(fobj, filename) -> instance
+
+    Compact RINEX 3.0 (Hatanaka-compressed RINEX ver.3) observation data;
+    the records are restored by CrxDecoder directly, without RINEX text.
+    """
+    CRX_VERSION = 3.0
+
+    # the satellites list of the epoch record
+    _sats_pos = 41
+
+    def __init__(self, fobj, filename):
+        # _det_interval() runs inside Obs3.__init__()
+        self._epochs = None
+        super(CompactObs3, self).__init__(fobj, filename)
+        self._epochs = None
+
+    def _next_epoch(self):
+        """_next_epoch() -> None
+
+        retrieves the epoch (ns) of the next epoch record.
+
+        Notes
+        -----
+        changes self._fobj position.
+        """
+        if self._epochs is None:
+            self._epochs = self._decode_epochs()
+
+        for epoch, epoch_flag, clock_offset, records in self._epochs:
+            # special event: no epoch
+            if epoch_flag > 1:
+                continue
+            return epoch
+
+        return None
+
+    def _decode_epochs(self):
+        """_decode_epochs() -> generator
+
+        Returns
+        -------
+        epoch_components : tuple
+            (epoch, epoch_flag, clock_offset, records) with
+            records = [(sat, values, flags), ...] or the list of special
+            records if epoch_flag > 1.
+        """
+        crx = CrxDecoder(self.CRX_VERSION, self.filename)
+
+        for line in self._fobj:
+            line = crx.epoch_record(line.rstrip())
+            epoch, epoch_flag, num_of_sat, clock_offset = \
+                self._parse_epoch_record(line)
+
+            if epoch_flag > 1:
+                special_records = [self._next_rec(self._fobj)
+                                   for _ in range(num_of_sat)]
+                yield epoch, epoch_flag, None, special_records
+                continue
+
+            # 1e-12 s -> ns
+            clock_offset = crx.clock_offset(self._next_rec(self._fobj))
+            if clock_offset is not None:
+                clock_offset = int(clock_offset / 1000)
+
+            sats = []
+            for i in range(num_of_sat):
+                pos = self._sats_pos + 3 * i
+                sats.append(line[pos:pos + 3].replace(' ', '0'))
+
+            records = []
+            for sat in sats:
+                if sat[0] not in self.sys_n_obs.value:
+                    msg = 'No such satellite {}'.format(sat)
+                    raise RinexError(self.filename, msg)
+
+                obs_num = len(self.sys_n_obs.value[sat[0]])
+                values, flags = crx.data_record(sat,
+                                                self._next_rec(self._fobj),
+                                                obs_num)
+                records.append((sat, values, flags))
+
+            crx.close_epoch(sats)
+
+            yield epoch, epoch_flag, clock_offset, records
+
+    def read_records(self, sampling_interval=None, sampler=None,
+                     sat_filter=None, systems=None):
+        """read_records(sampling_interval=None, sampler=None,
+        sat_filter=None, systems=None) -> generator
+
+        iterate over data records it the file; return (epoch, sat, dataset).
+
+        Parameters
+        ----------
+        sampling_interval : int, optional
+            if given, epochs (of the file date) are decimated to this
+            interval, ns.
+        sampler : EpochSampler, optional
+            sampler to use instead of a new one (e.g. the one shared by
+            the files of the same day); overrides `sampling_interval`.
+        sat_filter : object, optional
+            sat_filter.pick(epoch, sat) -> bool; the records of the
+            satellites it doesn't pick are skipped without parsing.
+        systems : sequence, optional
+            satellite systems to read; the records of the others are
+            skipped without parsing, the epochs without records of these
+            systems don't take part in the decimation.
+        """
+        if sampler is None and sampling_interval:
+            sampler = EpochSampler(sampling_interval,
+                                   date2day(self.filename_date))
+
+        empty = (0,) * 3
+
+        for epoch, epoch_flag, clock_offset, records in self._decode_epochs():
+            if epoch_flag > 1:
+                self._handle_event(epoch, epoch_flag, records)
+                continue
+
+            if epoch_flag == 1:
+                self._handle_power_failure(epoch)
+
+            if systems is not None:
+                records = [rec for rec in records if rec[0][0] in systems]
+
+            if not records or (sampler is not None and
+                               not sampler.pick(epoch)):
+                continue
+
+            for sat, values, flags in records:
+                if sat_filter is not None and not sat_filter.pick(epoch, sat):
+                    continue
+
+                sat_obs = self.sys_n_obs.value[sat[0]]
+
+                # imitation of o.v2.Obs return
+                rec = {}
+                for i, val in enumerate(values):
+                    lli, sig_strength = flags[2 * i], flags[2 * i + 1]
+
+                    if val is None and lli == sig_strength == ' ':
+                        rec[sat_obs[i]] = empty
+                        continue
+
+                    rec[sat_obs[i]] = (
+                        0.0 if val is None else val / 1000.,
+                        int(lli) if lli.isdigit() else 0,
+                        int(sig_strength) if sig_strength.isdigit() else 0)
+
+                yield epoch, sat, rec
+
+
+class CompactObs301(CompactObs3, Obs301):
+    """CompactObs301
+    """
+
+
+class CompactObs302(CompactObs3, Obs302):
+    """CompactObs302
+    """
+
+
+class CompactObs303(CompactObs3, Obs303):
+    """CompactObs303
+    """
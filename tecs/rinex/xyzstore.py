@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: xyzstore.py
+Description: coordinates of the sites loaded from the xyz-files
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+import io
+import logging
+import os
+import os.path
+from bisect import bisect_right
+from builtins import object
+
+from tecs.rinex.common import NS_PER_SEC, datetime2ns
+from tecs.rinex.futils import CRD_EXT
+from tecs.sat.common import xyz2lbh_deg
+
+NAME = 'tecs.rinex.xyzstore'
+
+
+class XYZError(Exception):
+    """XYZError(filename, msg)
+    """
+
+    def __init__(self, filename, msg):
+        super(XYZError, self).__init__()
+        self.err_msg = "%s: %s" % (filename, msg)
+
+    def __str__(self):
+        return self.err_msg
+
+
+def site_name(filename):
+    """site_name(filename) -> site
+
+    Parameters
+    ----------
+    filename : str
+        path to the observation or xyz-file
+
+    Returns
+    -------
+    site : str
+        the four-character site name, in lower case
+    """
+    return os.path.basename(filename)[0:4].lower()
+
+
+class SiteXYZ(object):
+    """SiteXYZ() -> instance
+
+    positions of a site ordered by time; a position is valid from its
+    epoch till the next one. The geodetic coordinates are computed
+    once, when the position is added.
+    """
+
+    def __init__(self):
+        self.epochs = []
+        self.xyz = []
+        self.lbh = []
+
+    def update(self, positions):
+        """update(positions) -> None
+
+        Parameters
+        ----------
+        positions : dict
+            {epoch: (x, y, z)}; the position replaces the one of the same
+            epoch.
+        """
+        merged = dict(zip(self.epochs, zip(self.xyz, self.lbh)))
+
+        for epoch in positions:
+            xyz = positions[epoch]
+            if epoch in merged and merged[epoch][0] == xyz:
+                continue
+            merged[epoch] = (xyz, xyz2lbh_deg(*xyz))
+
+        self.epochs = sorted(merged)
+        self.xyz = [merged[e][0] for e in self.epochs]
+        self.lbh = [merged[e][1] for e in self.epochs]
+
+    def lookup(self, epoch):
+        """lookup(epoch) -> (xyz, lbh) or None
+
+        Parameters
+        ----------
+        epoch : int
+            ns since the start of the GPS time
+
+        Returns
+        -------
+        xyz : tuple
+            (x, y, z) valid at the epoch
+        lbh : tuple
+            (l, b, h), deg, deg, m
+        """
+        i = bisect_right(self.epochs, epoch) - 1
+        if i < 0:
+            return None
+        return self.xyz[i], self.lbh[i]
+
+    def __len__(self):
+        return len(self.epochs)
+
+
+class XYZStore(object):
+    """XYZStore() -> instance
+
+    coordinates of the sites. The xyz-files contain the records
+
+        [site] YYYY-MM-DD HH:MM:SS x y z
+
+    where `site` could be omitted if the file name starts with it (e.g.
+    usud0700.11o.xyz).
+    """
+
+    def __init__(self):
+        self.sites = {}
+        self._files = set()
+
+    def get(self, site):
+        """get(site) -> site_xyz or None
+
+        Parameters
+        ----------
+        site : str
+
+        Returns
+        -------
+        site_xyz : SiteXYZ
+        """
+        return self.sites.get(site.lower())
+
+    def __contains__(self, site):
+        return site.lower() in self.sites
+
+    def load(self, path):
+        """load(path) -> None
+
+        Parameters
+        ----------
+        path : str
+            xyz-file or directory with the xyz-files
+
+        Raises
+        ------
+        XYZError
+            if a file can't be read or parsed.
+        """
+        if not os.path.isdir(path):
+            self.load_file(path)
+            return
+
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(CRD_EXT):
+                self.load_file(os.path.join(path, name))
+
+    def load_file(self, filename):
+        """load_file(filename) -> None
+
+        load the file unless it is already loaded.
+
+        Parameters
+        ----------
+        filename : str
+
+        Raises
+        ------
+        XYZError
+            if the file can't be read or parsed.
+        """
+        logger = logging.getLogger(NAME + '.load_file')
+
+        key = os.path.abspath(filename)
+        if key in self._files:
+            return
+
+        positions = {}
+        try:
+            with io.open(filename) as f_obj:
+                self._read(f_obj, site_name(filename), positions)
+        except (IOError, OSError, ValueError) as err:
+            raise XYZError(filename, err)
+
+        for site in positions:
+            if site not in self.sites:
+                self.sites[site] = SiteXYZ()
+            self.sites[site].update(positions[site])
+
+            msg = '{}: {} positions of {}.'
+            logger.debug(msg.format(filename, len(positions[site]), site))
+
+        self._files.add(key)
+
+    @staticmethod
+    def _read(f_obj, default_site, positions):
+        """_read(f_obj, default_site, positions) -> None
+
+        Parameters
+        ----------
+        f_obj : file
+        default_site : str
+            site of the records without the site name
+        positions : dict
+            {site: {epoch: (x, y, z)}} to update
+        """
+        # ns of the dates already met
+        days = {}
+
+        for (num, rec) in enumerate(f_obj, 1):
+            fields = rec.split('#', 1)[0].split()
+            if not fields:
+                continue
+
+            if len(fields) == 6:
+                site = fields[0].lower()
+                fields = fields[1:]
+            elif len(fields) == 5:
+                site = default_site
+            else:
+                raise ValueError('line {}: wrong record.'.format(num))
+
+            (c_date, c_time, x, y, z) = fields
+
+            try:
+                if c_date not in days:
+                    (year, month, day) = [int(i) for i in c_date.split('-')]
+                    days[c_date] = datetime2ns(
+                        datetime.datetime(year, month, day))
+
+                (hours, minutes, seconds) = c_time.split(':')
+                epoch = days[c_date] + (
+                    (int(hours) * 60 + int(minutes)) * 60 * NS_PER_SEC +
+                    int(round(float(seconds) * NS_PER_SEC)))
+
+                xyz = (float(x), float(y), float(z))
+            except ValueError as err:
+                raise ValueError('line {}: {}'.format(num, err))
+
+            positions.setdefault(site, {})[epoch] = xyz
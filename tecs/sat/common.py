@@ -26,16 +26,55 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import logging
+from builtins import object
 from math import pi, sin, cos, atan, atan2, sqrt
 
+import numpy as np
+
 from tecs.sat import datum
 
 NAME = 'tecs.sat.common'
 
 
+def _geodetic(x, y, z, atan2):
+    """_geodetic(x, y, z, atan2) -> (b, h)
+
+    latitude and height by the closed-form solution; the same code for
+    floats and arrays.
+
+    Note
+    ----
+    H. Vermeille Direct transformation from geocentric coordinates to
+        geodetic coordinates // Journal of Geodesy. 2002. 76. P. 451-454.
+    """
+    datum_a = datum.a
+    e_2 = datum.e ** 2
+    e_4 = e_2 ** 2
+
+    q_2 = x ** 2 + y ** 2
+
+    p = q_2 / datum_a ** 2
+    q = (1 - e_2) / datum_a ** 2 * z ** 2
+    r = (p + q - e_4) / 6
+    s = e_4 * p * q / (4 * r ** 3)
+    t = (1 + s + (s * (2 + s)) ** 0.5) ** (1 / 3)
+    u = r * (1 + t + 1 / t)
+    v = (u ** 2 + e_4 * q) ** 0.5
+    w = e_2 * (u + v - q) / (2 * v)
+    k = (u + v + w ** 2) ** 0.5 - w
+    d = k * q_2 ** 0.5 / (k + e_2)
+
+    d_z = (d ** 2 + z ** 2) ** 0.5
+
+    b = 2 * atan2(z, d + d_z)
+    h = (k + e_2 - 1) / k * d_z
+
+    return b, h
+
+
 # noinspection PyPep8Naming
 def xyz2lbh(x, y, z):
-    """xyz2lbh_deg(x, y, z) -> (l, b, h)
+    """xyz2lbh(x, y, z) -> (l, b, h)
 
     cartesian to geodetic coordinates conversion.
 
@@ -52,20 +91,11 @@ def xyz2lbh(x, y, z):
     h : float
         height, meters
 
-    Note
-    ----
-    К.Ф. Афонин Высшая геодезия. Системы координат и преобразования
-        между ними // Новосибирск. СГГА. 2011 г. 55 с.
+    Raises
+    ------
+    ArithmeticError
+        at the centre of the Earth.
     """
-
-    datum_e = datum.e
-    datum_a = datum.a
-
-    # threshold
-    e_B = 1e-12
-
-    Q = sqrt(x ** 2 + y ** 2)
-
     # L - longitude
     if x == 0:
         if y > 0:
@@ -75,86 +105,281 @@ def xyz2lbh(x, y, z):
     else:
         L = atan2(y, x)
 
-    # B - latitude
-    # initial values
-    Bi1 = z / Q * 1 / (1 - datum_e ** 2)
-    Bi = Bi1
-    N = 0
+    (B, H) = _geodetic(x, y, z, atan2)
 
-    while 1:
-        W = sqrt(1 - datum_e ** 2 * sin(Bi) ** 2)
-        N = datum_a / W
-        T = z + N * datum_e ** 2 * sin(Bi)
+    return L, B, H
 
-        Bi1 = atan2(T, Q)
 
-        if abs(Bi1 - Bi) <= e_B:
-            break
+def xyz2lbh_array(x, y, z):
+    """xyz2lbh_array(x, y, z) -> (l, b, h)
 
-        Bi = Bi1
+    cartesian to geodetic coordinates conversion for arrays (see
+    xyz2lbh()).
 
-    B = Bi1
+    Parameters
+    ----------
+    x, y, z : array_like
+        meters
 
-    # H - height
-    H = Q * cos(B) + z * sin(B) - N * (1 - datum_e ** 2 * sin(B) ** 2)
+    Returns
+    -------
+    l, b : numpy.ndarray
+        longitude and latitude, radians
 
-    return L, B, H
+    h : numpy.ndarray
+        height, meters
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
 
+    # L - longitude
+    l = np.where(x == 0, np.where(y > 0, pi / 2, 3 * pi / 2),
+                 np.arctan2(y, x))
 
-def compute_el_az(obs, sat):
-    """compute_el_az(obs, sat) -> el, az
+    with np.errstate(divide='ignore', invalid='ignore'):
+        (b, h) = _geodetic(x, y, z, np.arctan2)
 
-    computes elevation and azimuth to satellite.
+    return l, b, h
+
+
+def lbh2xyz(l, b, h):
+    """lbh2xyz(l, b, h) -> (x, y, z)
+
+    geodetic to cartesian coordinates conversion; floats or arrays.
+
+    Parameters
+    ----------
+    l, b : float or numpy.ndarray
+        longitude and latitude, radians
+
+    h : float or numpy.ndarray
+        height, meters
+
+    Returns
+    -------
+    x, y, z : float or numpy.ndarray
+        meters
+    """
+    e_2 = datum.e ** 2
+
+    sin_b = np.sin(b)
+    cos_b = np.cos(b)
+
+    n = datum.a / (1 - e_2 * sin_b ** 2) ** 0.5
+
+    x = (n + h) * cos_b * np.cos(l)
+    y = (n + h) * cos_b * np.sin(l)
+    z = (n * (1 - e_2) + h) * sin_b
+
+    return x, y, z
+
+
+class TopocentricFrame(object):
+    """TopocentricFrame(obs) -> instance
+
+    observer's position prepared to compute elevations and azimuths of
+    the satellites: the geodetic coordinates and the rotation to the
+    local east-north-up frame are computed once.
 
     Parameters
     ----------
     obs : tuple
         obs = (x, y, z); cartesian coordinates of the observer
 
-    sat : tuple
-        sat = (x, y, z); cartesian coordinates of the satellite
+    Raises
+    ------
+    ArithmeticError
+        if the geodetic coordinates can't be computed.
+    """
+
+    def __init__(self, obs):
+        self.xyz = tuple(obs)
+
+        (l_0, b_0) = xyz2lbh(*obs)[0:2]
+        self.l_0 = l_0
+
+        self.sin_l0 = sin(l_0)
+        self.cos_l0 = cos(l_0)
+        self.sin_b0 = sin(b_0)
+        self.cos_b0 = cos(b_0)
+
+        # east, north
+        self.rotation = np.array([
+            [-self.sin_l0, self.cos_l0, 0],
+            [-self.cos_l0 * self.sin_b0, -self.sin_l0 * self.sin_b0,
+             self.cos_b0],
+        ])
+
+    def el_az(self, sat):
+        """el_az(sat) -> el, az
+
+        Parameters
+        ----------
+        sat : tuple
+            sat = (x, y, z); cartesian coordinates of the satellite
+
+        Returns
+        -------
+        el : float
+            elevation, deg
+        az : float
+            azimuth, deg
+        """
+        datum_re = datum.r_e
+
+        (x_0, y_0, z_0) = self.xyz
+        (x_s, y_s, z_s) = sat
+
+        (l_s, b_s) = xyz2lbh(*sat)[0:2]
+
+        r_k = sqrt(x_s ** 2 + y_s ** 2 + z_s ** 2)
+
+        cos_sigma = (self.sin_b0 * sin(b_s) +
+                     self.cos_b0 * cos(b_s) * cos(l_s - self.l_0))
+        sigma = atan(sqrt(1 - cos_sigma ** 2) / cos_sigma)
+
+        (sin_l0, cos_l0) = (self.sin_l0, self.cos_l0)
+        (sin_b0, cos_b0) = (self.sin_b0, self.cos_b0)
+
+        x_t = -(x_s - x_0) * sin_l0 + (y_s - y_0) * cos_l0
+        y_t = (-(x_s - x_0) * cos_l0 * sin_b0 -
+               (y_s - y_0) * sin_l0 * sin_b0 + (z_s - z_0) * cos_b0)
+
+        el = atan((cos(sigma) - datum_re / r_k) / sin(sigma))
+        az = atan2(x_t, y_t)
+
+        el *= 180 / pi
+        az *= 180 / pi
+
+        # 0 - 360
+        if az < 0:
+            az += 360
+
+        return el, az
+
+    def el_az_array(self, x, y, z):
+        """el_az_array(x, y, z) -> el, az
+
+        Parameters
+        ----------
+        x, y, z : array_like
+            cartesian coordinates of the satellites, meters
+
+        Returns
+        -------
+        el : numpy.ndarray
+            elevations, deg
+        az : numpy.ndarray
+            azimuths, deg; nan if the values can't be computed.
+        """
+        sat = np.array([x, y, z], dtype=np.float64)
+
+        (l_s, b_s) = xyz2lbh_array(*sat)[0:2]
+
+        r_k = np.sqrt((sat ** 2).sum(axis=0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cos_sigma = (self.sin_b0 * np.sin(b_s) +
+                         self.cos_b0 * np.cos(b_s) * np.cos(l_s - self.l_0))
+            sigma = np.arctan(np.sqrt(1 - cos_sigma ** 2) / cos_sigma)
+
+            (x_t, y_t) = self.rotation.dot(
+                sat - np.array(self.xyz).reshape(3, 1))
+
+            el = np.arctan((np.cos(sigma) - datum.r_e / r_k) / np.sin(sigma))
+
+        az = np.arctan2(x_t, y_t)
+
+        el = np.degrees(el)
+        az = np.degrees(az)
+
+        # 0 - 360
+        az[az < 0] += 360
+
+        return el, az
+
+
+def el_az_matrix(frames, x, y, z):
+    """el_az_matrix(frames, x, y, z) -> el, az
+
+    elevations and azimuths of all the satellites from all the
+    observers at once.
+
+    Parameters
+    ----------
+    frames : sequence
+        TopocentricFrame instances of the observers
+    x, y, z : array_like
+        cartesian coordinates of the satellites, meters
 
     Returns
     -------
-    el : float
-        elevation, deg
-    az : float
-        azimuth, deg
+    el : numpy.ndarray
+        (observers, satellites) elevations, deg
+    az : numpy.ndarray
+        (observers, satellites) azimuths, deg; nan if the values can't
+        be computed.
     """
+    sat = np.array([x, y, z], dtype=np.float64)
 
-    datum_re = datum.r_e
+    (l_s, b_s) = xyz2lbh_array(*sat)[0:2]
+    r_k = np.sqrt((sat ** 2).sum(axis=0))
 
-    (x_0, y_0, z_0) = obs
-    (x_s, y_s, z_s) = sat
+    # (observers, 1)
+    l_0 = np.array([[f.l_0] for f in frames])
+    sin_b0 = np.array([[f.sin_b0] for f in frames])
+    cos_b0 = np.array([[f.cos_b0] for f in frames])
 
-    (l_0, b_0) = xyz2lbh(*obs)[0:2]
-    (l_s, b_s) = xyz2lbh(*sat)[0:2]
+    # (observers, 2, 3), (observers, 3, 1)
+    rotation = np.array([f.rotation for f in frames]).reshape(-1, 2, 3)
+    obs = np.array([f.xyz for f in frames],
+                   dtype=np.float64).reshape(-1, 3, 1)
 
-    r_k = sqrt(x_s ** 2 + y_s ** 2 + z_s ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_sigma = (sin_b0 * np.sin(b_s) +
+                     cos_b0 * np.cos(b_s) * np.cos(l_s - l_0))
+        sigma = np.arctan(np.sqrt(1 - cos_sigma ** 2) / cos_sigma)
 
-    sigma = atan(
-        sqrt(1 - (
-            sin(b_0) * sin(b_s) + cos(b_0) * cos(b_s) * cos(l_s - l_0)) ** 2)
-        / (sin(b_0) * sin(b_s) + cos(b_0) * cos(b_s) * cos(l_s - l_0))
-    )
+        # (observers, 2, satellites)
+        (x_t, y_t) = np.einsum('mij,mjn->imn', rotation, sat - obs)
 
-    x_t = -(x_s - x_0) * sin(l_0) + (y_s - y_0) * cos(l_0)
-    y_t = (-(x_s - x_0) * cos(l_0) * sin(b_0) -
-           (y_s - y_0) * sin(l_0) * sin(b_0) + (z_s - z_0) * cos(b_0))
+        el = np.arctan((np.cos(sigma) - datum.r_e / r_k) / np.sin(sigma))
 
-    el = atan((cos(sigma) - datum_re / r_k) / sin(sigma))
-    az = atan2(x_t, y_t)
+    az = np.arctan2(x_t, y_t)
 
-    el *= 180 / pi
-    az *= 180 / pi
+    el = np.degrees(el)
+    az = np.degrees(az)
 
     # 0 - 360
-    if az < 0:
-        az += 360
+    az[az < 0] += 360
 
     return el, az
 
 
+def compute_el_az(obs, sat):
+    """compute_el_az(obs, sat) -> el, az
+
+    computes elevation and azimuth to satellite.
+
+    Parameters
+    ----------
+    obs : tuple
+        obs = (x, y, z); cartesian coordinates of the observer
+
+    sat : tuple
+        sat = (x, y, z); cartesian coordinates of the satellite
+
+    Returns
+    -------
+    el : float
+        elevation, deg
+    az : float
+        azimuth, deg
+    """
+    return TopocentricFrame(obs).el_az(sat)
+
+
 def xyz2lbh_deg(x, y, z):
     """warp for xyz2lbg()
     """
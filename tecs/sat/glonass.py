@@ -23,7 +23,11 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from math import sqrt
+from builtins import object
+from collections import OrderedDict
+
+import numpy as np
+
 from tecs.sat import datum
 
 
@@ -40,7 +44,247 @@ def F2(k):
     return 1.246 * 1e9 + k * 437.5 * 1e3
 
 
-# noinspection PyPep8Naming,PyShadowingNames
+# integration step, seconds
+INTEGRATION_STEP = 60.
+# number of the messages to keep the integrated states of
+STATES_CACHE_SIZE = 1024
+# number of the whole-step states to keep per message (a message is used
+# within about 15 minutes of its reference time)
+STATES_PER_MESSAGE = 64
+
+
+def _derivatives(state, acc):
+    """_derivatives(state, acc) -> derivatives
+
+    equations of motion in PZ-90 (GLONASS ICD ver 5.1, 2008, A.3.1.2).
+
+    Parameters
+    ----------
+    state : tuple
+        (x, y, z, vx, vy, vz), m, m/s; floats or arrays
+    acc : tuple
+        (ax, ay, az) lunisolar accelerations, m/s^2
+
+    Returns
+    -------
+    derivatives : tuple
+        (vx, vy, vz, dvx, dvy, dvz)
+    """
+    (x, y, z, vx, vy, vz) = state
+
+    r2 = x ** 2 + y ** 2 + z ** 2
+    r = r2 ** 0.5
+
+    first_sd = -(datum.mu / r ** 3)
+    second_sd = 3 / 2. * datum.J0sqd * datum.mu * datum.ae ** 2 / r ** 5
+    z2_r2 = 5 * z ** 2 / r2
+
+    dvx = (first_sd * x - second_sd * x * (1 - z2_r2) +
+           datum.omega ** 2 * x + 2 * datum.omega * vy + acc[0])
+    dvy = (first_sd * y - second_sd * y * (1 - z2_r2) +
+           datum.omega ** 2 * y - 2 * datum.omega * vx + acc[1])
+    dvz = first_sd * z - second_sd * z * (3 - z2_r2) + acc[2]
+
+    return vx, vy, vz, dvx, dvy, dvz
+
+
+def _rk4_step(state, h, acc):
+    """_rk4_step(state, h, acc) -> state
+
+    the classic Runge-Kutta step.
+
+    Parameters
+    ----------
+    state : tuple
+        (x, y, z, vx, vy, vz); floats or arrays
+    h : float or array
+        step, seconds
+    acc : tuple
+        (ax, ay, az) lunisolar accelerations
+
+    Returns
+    -------
+    state : tuple
+        (x, y, z, vx, vy, vz) in h seconds
+    """
+    k1 = _derivatives(state, acc)
+    k2 = _derivatives([s + h / 2 * k for (s, k) in zip(state, k1)], acc)
+    k3 = _derivatives([s + h / 2 * k for (s, k) in zip(state, k2)], acc)
+    k4 = _derivatives([s + h * k for (s, k) in zip(state, k3)], acc)
+
+    return tuple(s + h / 6 * (d1 + 2 * d2 + 2 * d3 + d4)
+                 for (s, d1, d2, d3, d4) in zip(state, k1, k2, k3, k4))
+
+
+class StateIntegrator(object):
+    """StateIntegrator(step=INTEGRATION_STEP, size=STATES_CACHE_SIZE,
+    states=STATES_PER_MESSAGE)
+
+    integrates the state vector of the GLONASS (and SBAS) messages in
+    fixed steps forward and backward from the reference time. The states
+    at the whole steps (up to `states` of them per message) are kept, so
+    the next epoch is integrated from the nearest state already
+    computed; a part of the step is made at the end.
+
+    Parameters
+    ----------
+    step : float
+        integration step, seconds
+    size : int
+        number of the messages to keep the states of
+    states : int
+        number of the states to keep per message
+    """
+
+    def __init__(self, step=INTEGRATION_STEP, size=STATES_CACHE_SIZE,
+                 states=STATES_PER_MESSAGE):
+        self.step = step
+        self.size = size
+        self.states = states
+        # {eph: (acc, {k: state})}, k is the number of the step
+        self._states = OrderedDict()
+
+    def _message_states(self, eph):
+        """_message_states(eph) -> acc, states
+        """
+        if eph in self._states:
+            self._states[eph] = self._states.pop(eph)
+            return self._states[eph]
+
+        # meters
+        state = (eph[0] * 1000, eph[4] * 1000, eph[8] * 1000,
+                 eph[1] * 1000, eph[5] * 1000, eph[9] * 1000)
+        acc = (eph[2] * 1000, eph[6] * 1000, eph[10] * 1000)
+
+        self._states[eph] = (acc, {0: state})
+        while len(self._states) > self.size:
+            self._states.popitem(last=False)
+
+        return self._states[eph]
+
+    def _state(self, acc, states, target, nearest=None):
+        """_state(acc, states, target, nearest=None) -> state
+
+        the state at the whole step `target`, integrated from the nearest
+        kept state or from `nearest`, (k, state), if it is closer; the
+        states are kept while there are less than self.states of them.
+        """
+        direction = 1 if target > 0 else -1
+
+        k = target
+        while k not in states:
+            k -= direction
+        state = states[k]
+
+        # `nearest` is between the reference time and the target
+        if nearest is not None and direction * nearest[0] > direction * k:
+            (k, state) = nearest
+
+        h = direction * self.step
+        while k != target:
+            state = _rk4_step(state, h, acc)
+            k += direction
+            if len(states) < self.states:
+                states[k] = state
+
+        return state
+
+    def _whole_steps(self, eph, dt):
+        """_whole_steps(eph, dt) -> acc, state, rest
+
+        Returns
+        -------
+        acc : tuple
+            lunisolar accelerations
+        state : tuple
+            state at the last whole step towards dt
+        rest : float
+            seconds from the state to dt
+        """
+        (acc, states) = self._message_states(eph)
+
+        target = int(dt / self.step)
+        state = self._state(acc, states, target)
+
+        return acc, state, dt - target * self.step
+
+    def position(self, eph, dt):
+        """position(eph, dt) -> (x, y, z)
+
+        Parameters
+        ----------
+        eph : tuple
+            ephemeris
+        dt : float
+            difference between time of the ephemeris and observation
+            time, seconds
+
+        Returns
+        -------
+        x : float
+            X, meters
+        y : float
+            Y, meters
+        z : float
+            Z, meters
+        """
+        (acc, state, rest) = self._whole_steps(eph, dt)
+
+        if rest:
+            state = _rk4_step(state, rest, acc)
+
+        return state[0], state[1], state[2]
+
+    def positions(self, eph, dts):
+        """positions(eph, dts) -> (x, y, z)
+
+        Parameters
+        ----------
+        eph : tuple
+            ephemeris
+        dts : array_like
+            differences between time of the ephemeris and observation
+            times, seconds
+
+        Returns
+        -------
+        x : numpy.ndarray
+            X, meters
+        y : numpy.ndarray
+            Y, meters
+        z : numpy.ndarray
+            Z, meters
+        """
+        dts = np.asarray(dts, dtype=np.float64)
+
+        if not len(dts):
+            return np.array([]), np.array([]), np.array([])
+
+        (acc, states) = self._message_states(eph)
+
+        # the states at the whole steps, outwards from the reference time
+        targets = np.trunc(dts / self.step).astype(np.int64)
+        steps = sorted(set(targets.tolist()))
+
+        whole = {}
+        for side in ([k for k in steps if k > 0],
+                     [k for k in reversed(steps) if k <= 0]):
+            nearest = None
+            for k in side:
+                nearest = (k, self._state(acc, states, k, nearest))
+                whole[k] = nearest[1]
+
+        base = [whole[k] for k in targets.tolist()]
+        base = tuple(np.array(v) for v in zip(*base))
+
+        state = _rk4_step(base, dts - targets * self.step, acc)
+
+        return state[0], state[1], state[2]
+
+
+INTEGRATOR = StateIntegrator()
+
+
 def compute_sat_xyz(eph, dt):
     """compute_sat_xyz(eph, dt) -> (x, y, z)
 
@@ -63,81 +307,30 @@ def compute_sat_xyz(eph, dt):
     z : float
         Z, meters
     """
+    return INTEGRATOR.position(tuple(eph), dt)
 
-    # meters
-    x0 = eph[0] * 1000
-    vX = eph[1] * 1000
-    aX = eph[2] * 1000
-
-    y0 = eph[4] * 1000
-    vY = eph[5] * 1000
-    aY = eph[6] * 1000
 
-    z0 = eph[8] * 1000
-    vZ = eph[9] * 1000
-    aZ = eph[10] * 1000
+def compute_sat_xyz_array(eph, dts):
+    """compute_sat_xyz_array(eph, dts) -> (x, y, z)
 
-    if dt == 0:
-        return x0, y0, z0
+    calculates geocentric coordinates of the satellite for several
+    moments at once.
 
-    r = sqrt(x0 ** 2 + y0 ** 2 + z0 ** 2)
-
-    # - GLONASS ICD ver 5.1, 2008.
-    first_sd = -(datum.mu / r ** 3)
-    second_sd = 3 / 2. * datum.J0sqd * datum.mu * datum.ae ** 2 / r ** 5
+    Parameters
+    ----------
+    eph : list
+        list with ephemeris
+    dts : array_like
+        differences between time of the ephemeris and observation times,
+        seconds
 
-    # - x, y, z
-    # noinspection PyPep8
-    fx = lambda x, z: (first_sd * x - second_sd * x *
-                       (1 - 5 * z ** 2 / r ** 2) +
-                       datum.omega ** 2 * x + 2 * datum.omega * vY + aX)
-
-    # noinspection PyPep8
-    fy = lambda y, z: (first_sd * y - second_sd * y *
-                       (1 - 5 * z ** 2 / r ** 2) +
-                       datum.omega ** 2 * y - 2 * datum.omega * vX + aY)
-
-    # noinspection PyPep8
-    fz = lambda z: (first_sd * z - second_sd * z *
-                    (3 - 5 * z ** 2 / r ** 2) + aZ)
-
-    x = dict()
-    kx = dict()
-
-    y = dict()
-    ky = dict()
-
-    z = dict()
-    kz = dict()
-
-    # 1
-    kx[1] = fx(x0, z0) * dt
-    ky[1] = fy(y0, z0) * dt
-    kz[1] = fz(z0) * dt
-
-    x[1] = x0 + vX * dt / 2. + kx[1] * dt / 8.
-    y[1] = y0 + vY * dt / 2. + ky[1] * dt / 8.
-    z[1] = z0 + vZ * dt / 2. + kz[1] * dt / 8.
-
-    # 2
-    kx[2] = fx(x[1], z[1]) * dt
-    ky[2] = fy(y[1], z[1]) * dt
-    kz[2] = fz(z[1]) * dt
-
-    x[2] = x0 + vX * dt / 2. + kx[2] * dt / 8.
-    y[2] = y0 + vY * dt / 2. + ky[2] * dt / 8.
-    z[2] = z0 + vZ * dt / 2. + kz[2] * dt / 8.
-
-    # 3
-    kx[3] = fx(x[2], z[2]) * dt
-    ky[3] = fy(y[2], z[2]) * dt
-    kz[3] = fz(z[2]) * dt
-
-    # result
-    xyz = (
-        x0 + vX * dt + (kx[1] + kx[2] + kx[3]) * dt / 6,
-        y0 + vY * dt + (ky[1] + ky[2] + ky[3]) * dt / 6,
-        z0 + vZ * dt + (kz[1] + kz[2] + kz[3]) * dt / 6
-    )
-
-    return xyz
+    Returns
+    -------
+    x : numpy.ndarray
+        X, meters
+    y : numpy.ndarray
+        Y, meters
+    z : numpy.ndarray
+        Z, meters
+    """
+    return INTEGRATOR.positions(tuple(eph), dts)
@@ -25,8 +25,11 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import datetime
+from builtins import range
 from math import sin, cos, atan2, sqrt
 
+import numpy as np
+
 from tecs.sat import datum
 
 # start of the GPS epoch
@@ -37,6 +40,22 @@ F1 = 1575.42 * 1e6
 F2 = 1227.60 * 1e6
 F5 = 1176.45 * 1e6
 
+# Kepler's equation: the Newton's method converges quadratically for the
+# near-circular orbits, a few iterations are enough
+KEPLER_MAX_ITER = 10
+# rad; ~1e-6 m along the orbit
+KEPLER_TOL = 1e-13
+
+# names of the broadcast orbits values in the order of the ephemeris tuple
+# (see tecs.rinex.nmsg.GPSNavigationMessage)
+ORBIT_FIELDS = (
+    'iode', 'crs', 'delta_n', 'm0',
+    'cuc', 'e', 'cus', 'sqrt_a',
+    'toe', 'cic', 'omega0', 'cis',
+    'i0', 'crc', 'omega', 'omega_dot',
+    'idot',
+)
+
 
 def compute_sat_xyz(ephemeris, sec):
     """compute_sat_xyz(ephemeris, sec) -> (x, y, z)
@@ -121,3 +140,121 @@ def compute_sat_xyz(ephemeris, sec):
     z = rk * sin(uk) * sin(ik)
 
     return x, y, z
+
+
+def solve_kepler(mk, e0, max_iter=KEPLER_MAX_ITER):
+    """solve_kepler(mk, e0, max_iter=KEPLER_MAX_ITER) -> ek
+
+    solves Kepler's equation E - e sin(E) = M by the Newton's method.
+
+    Parameters
+    ----------
+    mk : numpy.ndarray
+        mean anomaly, rad
+    e0 : numpy.ndarray
+        eccentricity
+    max_iter : int
+        maximum number of the iterations
+
+    Returns
+    -------
+    ek : numpy.ndarray
+        eccentric anomaly, rad
+    """
+    ek = np.array(mk, dtype=np.float64)
+
+    for _ in range(max_iter):
+        d_ek = (ek - e0 * np.sin(ek) - mk) / (1 - e0 * np.cos(ek))
+        ek -= d_ek
+        if np.all(np.abs(d_ek) < KEPLER_TOL):
+            break
+
+    return ek
+
+
+def compute_sat_xyz_array(ephemeris, sec):
+    """compute_sat_xyz_array(ephemeris, sec) -> (x, y, z)
+
+    calculates geocentric coordinates of the satellites for several
+    moments at once.
+
+    Parameters
+    ----------
+    ephemeris : numpy.ndarray or tuple
+        structured array of the broadcast orbits (the `eph` part of
+        GPSNavigationMessage.dtype()), one record or one per moment; or
+        the ephemeris tuple (see compute_sat_xyz())
+    sec : array_like
+        amount of seconds since the start of the week, seconds
+
+    Returns
+    -------
+    x : numpy.ndarray
+        X, meters
+    y : numpy.ndarray
+        Y, meters
+    z : numpy.ndarray
+        Z, meters
+    """
+    sec = np.asarray(sec, dtype=np.float64)
+
+    if getattr(ephemeris, 'dtype', None) is None or \
+            not ephemeris.dtype.names:
+        ephemeris = dict(zip(ORBIT_FIELDS, ephemeris))
+
+    crs = ephemeris['crs']
+    dn = ephemeris['delta_n']
+    m0 = ephemeris['m0']
+    cuc = ephemeris['cuc']
+    e0 = ephemeris['e']
+    cus = ephemeris['cus']
+    a0 = ephemeris['sqrt_a'] ** 2
+    toe = ephemeris['toe']
+    cic = ephemeris['cic']
+    omega_0 = ephemeris['omega0']
+    cis = ephemeris['cis']
+    i0 = ephemeris['i0']
+    crc = ephemeris['crc']
+    w0 = ephemeris['omega']
+    omega_dot = ephemeris['omega_dot']
+    i_dot = ephemeris['idot']
+
+    tk = sec - toe
+    tk = np.where(tk > 302400, tk - 604800, tk)
+    tk = np.where(tk < -302400, tk + 604800, tk)
+
+    n = np.sqrt(datum.mu / a0 ** 3) + dn
+    mk = m0 + n * tk
+
+    ek = solve_kepler(mk, e0)
+
+    sin_ek = np.sin(ek)
+    cos_ek = np.cos(ek)
+
+    fs = (np.sqrt(1 - e0 ** 2) * sin_ek) / (1 - e0 * cos_ek)
+    fc = (cos_ek - e0) / (1 - e0 * cos_ek)
+    tettak = np.arctan2(fs, fc)
+
+    u0k = tettak + w0
+    cos_2u = np.cos(2 * u0k)
+    sin_2u = np.sin(2 * u0k)
+
+    uk = u0k + cuc * cos_2u + cus * sin_2u
+
+    rk = a0 * (1 + e0 * cos_ek) + crc * cos_2u + crs * sin_2u
+
+    ik = i0 + (cic * cos_2u + cis * sin_2u) + i_dot * tk
+
+    omega_k = omega_0 + (omega_dot - datum.omega) * tk - datum.omega * toe
+
+    cos_uk = np.cos(uk)
+    sin_uk = np.sin(uk)
+    cos_ok = np.cos(omega_k)
+    sin_ok = np.sin(omega_k)
+    cos_ik = np.cos(ik)
+
+    x = rk * (cos_uk * cos_ok - sin_uk * sin_ok * cos_ik)
+    y = rk * (cos_uk * sin_ok + sin_uk * cos_ok * cos_ik)
+    z = rk * sin_uk * np.sin(ik)
+
+    return x, y, z
@@ -0,0 +1,530 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: orbit.py
+Description: satellite positions interpolated from a coarse time grid
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+from builtins import object
+from builtins import range
+from collections import OrderedDict
+
+import numpy as np
+
+from tecs.rinex.common import NS_PER_DAY, NS_PER_SEC
+
+NAME = 'tecs.sat.orbit'
+
+# grid step, seconds
+ORBIT_GRID_STEP = 300.
+# order of the interpolating polynomial
+ORBIT_GRID_ORDER = 9
+# number of the grid intervals to keep the polynomials of
+ORBIT_CACHE_SIZE = 4096
+
+
+class OrbitInterpolator(object):
+    """OrbitInterpolator(compute, step=ORBIT_GRID_STEP,
+    order=ORBIT_GRID_ORDER, size=ORBIT_CACHE_SIZE) -> instance
+
+    positions of the satellites computed on a grid of the `step`
+    seconds and interpolated by the Lagrange polynomial of the `order`
+    degree in between. The polynomial of a grid interval uses the order
+    + 1 nodes around it; the nodes are computed once per message, those
+    missing at once.
+
+    Parameters
+    ----------
+    compute : callable
+        compute(eph, seconds) -> (x, y, z) of the arrays, e.g.
+        gps.compute_sat_xyz_array
+    step : float
+        grid step, seconds
+    order : int
+        order of the polynomial
+    size : int
+        number of the grid intervals to keep the polynomials of
+    """
+
+    def __init__(self, compute, step=ORBIT_GRID_STEP,
+                 order=ORBIT_GRID_ORDER, size=ORBIT_CACHE_SIZE):
+        self.compute = compute
+        self.step = step
+        self.order = order
+        self.size = size
+
+        # nodes of the interval j: j + offsets
+        self._offsets = np.arange(order + 1) - order // 2
+
+        # the polynomial argument is u = (t / step - j - 0.5) / scale,
+        # |u| < 1 at the nodes
+        self._scale = (order + 1) / 2
+        nodes_u = (self._offsets - 0.5) / self._scale
+        # node values -> coefficients, the highest power first
+        self._inverse = np.linalg.inv(np.vander(nodes_u))
+
+        # {id(eph): (eph, {k: (x, y, z)}, {j: coefficients})}; the
+        # ephemeris tuples are long, their ids are cheaper to hash (the
+        # entry keeps the tuple, so the id is not reused meanwhile)
+        self._messages = OrderedDict()
+        self._intervals = 0
+
+    def _message(self, eph):
+        """_message(eph) -> (eph, nodes, coefficients)
+        """
+        key = id(eph)
+        message = self._messages.get(key)
+        if message is None:
+            message = self._messages[key] = (eph, {}, {})
+        return message
+
+    def _compute_nodes(self, eph, nodes, ks):
+        """_compute_nodes(eph, nodes, ks) -> None
+
+        compute the nodes of `ks` missing in `nodes` at once.
+
+        Raises
+        ------
+        ArithmeticError
+            if `compute` fails.
+        """
+        missing = [k for k in ks if k not in nodes]
+        if not missing:
+            return
+
+        with np.errstate(divide='raise', over='raise', invalid='raise'):
+            (x, y, z) = self.compute(eph, np.array(missing) * self.step)
+
+        for (k, xyz) in zip(missing, zip(x.tolist(), y.tolist(),
+                                         z.tolist())):
+            nodes[k] = xyz
+
+    def _fit(self, eph, j):
+        """_fit(eph, j) -> coefficients
+
+        Returns
+        -------
+        coefficients : list
+            [(cx, cy, cz), ...], the highest power first
+        """
+        (eph, nodes, coefficients) = self._message(eph)
+
+        ks = (self._offsets + j).tolist()
+        self._compute_nodes(eph, nodes, ks)
+        values = [nodes[k] for k in ks]
+
+        coefficients[j] = [tuple(c) for c in
+                           self._inverse.dot(np.array(values)).tolist()]
+
+        # the oldest messages go first
+        self._intervals += 1
+        while self._intervals > self.size and len(self._messages) > 1:
+            self._intervals -= len(self._messages.popitem(last=False)[1][2])
+
+        return coefficients[j]
+
+    def position(self, eph, sec):
+        """position(eph, sec) -> (x, y, z)
+
+        Parameters
+        ----------
+        eph : tuple
+            ephemeris
+        sec : float
+            the time argument of `compute`, seconds
+
+        Returns
+        -------
+        x, y, z : float
+            meters
+
+        Raises
+        ------
+        ArithmeticError
+            if `compute` fails at a node.
+        """
+        j = int(sec // self.step)
+
+        message = self._messages.get(id(eph))
+        if message is None or j not in message[2]:
+            coefficients = self._fit(eph, j)
+        else:
+            coefficients = message[2][j]
+
+        u = (sec / self.step - j - 0.5) / self._scale
+
+        x = y = z = 0.
+        for (c_x, c_y, c_z) in coefficients:
+            x = x * u + c_x
+            y = y * u + c_y
+            z = z * u + c_z
+
+        return x, y, z
+
+    def positions(self, eph, seconds):
+        """positions(eph, seconds) -> (x, y, z)
+
+        Parameters
+        ----------
+        eph : tuple
+            ephemeris
+        seconds : array_like
+            the time arguments of `compute`, seconds
+
+        Returns
+        -------
+        x, y, z : numpy.ndarray
+            meters
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+
+        (eph, nodes, _) = self._message(eph)
+
+        j = np.floor(seconds / self.step).astype(np.int64)
+        ks = j[:, np.newaxis] + self._offsets
+
+        self._compute_nodes(eph, nodes, np.unique(ks).tolist())
+
+        values = np.array([nodes[k] for k in ks.ravel().tolist()],
+                          dtype=np.float64)
+        values = values.reshape(ks.shape + (3,))
+
+        # (epochs, powers, xyz)
+        coefficients = np.einsum('pn,mnc->mpc', self._inverse, values)
+
+        u = ((seconds / self.step - j - 0.5) / self._scale)[:, np.newaxis]
+
+        xyz = np.zeros((len(seconds), 3))
+        for p in range(self.order + 1):
+            xyz = xyz * u + coefficients[:, p]
+
+        return xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+    def accuracy(self, eph, seconds):
+        """accuracy(eph, seconds) -> max_error, rms_error
+
+        compare the interpolated positions with the computed ones.
+
+        Parameters
+        ----------
+        eph : tuple
+            ephemeris
+        seconds : array_like
+            the time arguments to compare at, seconds
+
+        Returns
+        -------
+        max_error : float
+            meters
+        rms_error : float
+            meters
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+
+        interpolated = np.array([self.position(eph, sec)
+                                 for sec in seconds.tolist()])
+        computed = np.column_stack(self.compute(eph, seconds))
+
+        errors = np.sqrt(((interpolated - computed) ** 2).sum(axis=1))
+        return errors.max(), np.sqrt((errors ** 2).mean())
+
+
+class GridOrbit(object):
+    """GridOrbit(start, step, positions, order=ORBIT_GRID_ORDER,
+    filenames=()) -> instance
+
+    satellite positions on a time grid interpolated by the Lagrange
+    polynomial of the `order` degree in between. The positions are
+    available where there are all the order + 1 nodes around the epoch.
+
+    Parameters
+    ----------
+    start : int
+        epoch of the first node, ns since the start of the GPS time
+    step : float
+        grid step, seconds
+    positions : dict
+        {(system, number): numpy.ndarray (nodes, 3)}, meters; nan where
+        the position is missing
+    order : int
+        order of the interpolating polynomial
+    filenames : sequence
+        the source files, the main one first
+    """
+
+    def __init__(self, start, step, positions, order=ORBIT_GRID_ORDER,
+                 filenames=()):
+        self.start = start
+        self.step = step
+        self.order = order
+
+        self.filenames = list(filenames)
+        self.filename = self.filenames[0] if self.filenames else None
+
+        self._positions = positions
+        self._interpolator = OrbitInterpolator(self._nodes, step, order)
+
+    def _nodes(self, positions, seconds):
+        """_nodes(positions, seconds) -> (x, y, z)
+        """
+        i = np.round(seconds / self.step).astype(np.int64)
+        inside = (i >= 0) & (i < len(positions))
+
+        xyz = np.full((len(i), 3), np.nan)
+        xyz[inside] = positions[i[inside]]
+
+        return xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+    def __contains__(self, sat):
+        return sat in self._positions
+
+    def tables(self):
+        """tables() -> {system: (numbers, positions)}
+
+        Returns
+        -------
+        numbers : list
+            satellite numbers, sorted
+        positions : numpy.ndarray
+            (nodes, satellites, 3), meters
+        """
+        tables = {}
+        for (system, number) in sorted(self._positions):
+            tables.setdefault(system, ([], []))
+            tables[system][0].append(number)
+            tables[system][1].append(self._positions[(system, number)])
+
+        for system in tables:
+            (numbers, positions) = tables[system]
+            tables[system] = (numbers, np.stack(positions, axis=1))
+
+        return tables
+
+    @classmethod
+    def from_tables(cls, start, step, tables, order=ORBIT_GRID_ORDER,
+                    filenames=()):
+        """from_tables(start, step, tables, order=ORBIT_GRID_ORDER,
+        filenames=()) -> instance
+
+        the instance of the tables (see tables()); the positions are
+        the views of the tables' arrays.
+        """
+        positions = {}
+        for system in tables:
+            (numbers, table) = tables[system]
+            for (i, number) in enumerate(numbers):
+                positions[(system, number)] = table[:, i]
+
+        return cls(start, step, positions, order, filenames)
+
+    def position(self, system, number, epoch):
+        """position(system, number, epoch) -> (x, y, z) or None
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        number : int
+            satellite number
+        epoch : int
+            ns since the start of the GPS time
+
+        Returns
+        -------
+        x, y, z : float
+            meters; None if the position is not available.
+        """
+        positions = self._positions.get((system, number))
+        if positions is None:
+            return None
+
+        sec = (epoch - self.start) / NS_PER_SEC
+        xyz = self._interpolator.position(positions, sec)
+
+        # nan
+        if xyz[0] != xyz[0]:
+            return None
+
+        return xyz
+
+    def positions(self, system, number, epochs):
+        """positions(system, number, epochs) -> (x, y, z)
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        number : int
+            satellite number
+        epochs : array_like
+            ns since the start of the GPS time
+
+        Returns
+        -------
+        x, y, z : numpy.ndarray
+            meters; nan where the position is not available.
+        """
+        epochs = np.asarray(epochs, dtype=np.int64)
+
+        positions = self._positions.get((system, number))
+        if positions is None:
+            nan = np.full(len(epochs), np.nan)
+            return nan, nan.copy(), nan.copy()
+
+        seconds = (epochs - self.start) / NS_PER_SEC
+        return self._interpolator.positions(positions, seconds)
+
+
+class PreciseOrbit(GridOrbit):
+    """PreciseOrbit(sp3_files, order=ORBIT_GRID_ORDER) -> instance
+
+    satellite positions interpolated from the precise orbits. The files
+    are put on the grid of the first one; where they overlap the first
+    file wins, the files of the other interval are skipped.
+
+    Parameters
+    ----------
+    sp3_files : list
+        tecs.rinex.sp3.SP3 instances, the file of the day first
+    order : int
+        order of the interpolating polynomial
+    """
+
+    def __init__(self, sp3_files, order=ORBIT_GRID_ORDER):
+        logger = logging.getLogger(NAME + '.PreciseOrbit')
+
+        main = sp3_files[0]
+
+        step = main.interval
+        if not step and len(main.epochs) > 1:
+            step = (main.epochs[1] - main.epochs[0]) / NS_PER_SEC
+        step_ns = int(round(step * NS_PER_SEC))
+
+        files = []
+        for sp3 in sp3_files:
+            if sp3 is not main and sp3.interval != main.interval:
+                msg = '{}: the interval differs from the one of {}; skipped.'
+                logger.info(msg.format(sp3.filename, main.filename))
+                continue
+            files.append(sp3)
+
+        start = min(sp3.epochs[0] for sp3 in files if len(sp3.epochs))
+        end = max(sp3.epochs[-1] for sp3 in files if len(sp3.epochs))
+        num = int((end - start) // step_ns) + 1
+
+        # {(system, number): numpy.ndarray (epochs, 3)}
+        positions = {}
+
+        for sp3 in reversed(files):
+            (index, rest) = np.divmod(sp3.epochs - start, step_ns)
+            aligned = rest == 0
+
+            for sat in sp3.positions:
+                if sat not in positions:
+                    positions[sat] = np.full((num, 3), np.nan)
+
+                sat_positions = sp3.positions[sat]
+                valid = aligned & ~np.isnan(sat_positions[:, 0])
+                positions[sat][index[valid]] = sat_positions[valid]
+
+        super(PreciseOrbit, self).__init__(
+            int(start), step, positions, order,
+            [sp3.filename for sp3 in files])
+
+
+def broadcast_orbit(ephemeris_index, compute, day_start,
+                    step=ORBIT_GRID_STEP, order=ORBIT_GRID_ORDER,
+                    filenames=()):
+    """broadcast_orbit(ephemeris_index, compute, day_start,
+    step=ORBIT_GRID_STEP, order=ORBIT_GRID_ORDER, filenames=()) -> orbit
+
+    positions of the satellites of the day computed from the navigation
+    messages on a grid; the grid extends beyond the day by the nodes the
+    polynomials of the day's edges need. A node takes the message the
+    epochs of the day nearest to it take.
+
+    Parameters
+    ----------
+    ephemeris_index : tecs.rinex.nmutils.EphemerisIndex
+        messages of the system
+    compute : callable
+        compute(eph, seconds) -> (x, y, z) of the arrays, e.g.
+        gps.compute_sat_xyz_array
+    day_start : int
+        ns since the start of the GPS time
+    step : float
+        grid step, seconds
+    order : int
+        order of the interpolating polynomial
+    filenames : sequence
+        the navigation files of the messages
+
+    Returns
+    -------
+    orbit : GridOrbit
+    """
+    logger = logging.getLogger(NAME + '.broadcast_orbit')
+
+    system = ephemeris_index.system
+
+    step_ns = int(round(step * NS_PER_SEC))
+    margin = order // 2 + 1
+    start = day_start - margin * step_ns
+    nodes = start + np.arange(NS_PER_DAY // step_ns + 2 * margin + 1,
+                              dtype=np.int64) * step_ns
+
+    # the epochs of the day nearest to the nodes
+    epochs = np.clip(nodes, day_start, day_start + NS_PER_DAY - 1)
+    shifts = (nodes - epochs) / NS_PER_SEC
+
+    positions = {}
+    for number in ephemeris_index:
+        sat_positions = np.full((len(nodes), 3), np.nan)
+
+        (seconds, indices) = ephemeris_index.select_batch(epochs, number,
+                                                          first_msg=True)
+        seconds += shifts
+
+        # the nodes of a message at once
+        for i in np.unique(indices[indices >= 0]).tolist():
+            selected = indices == i
+            eph = ephemeris_index.eph(number, i)
+            try:
+                with np.errstate(divide='raise', over='raise',
+                                 invalid='raise'):
+                    xyz = compute(eph, seconds[selected])
+            except ArithmeticError as err:
+                msg = '{}{:02d}, the message of {}: {}'.format(
+                    system, number, ephemeris_index.times[number][i], err)
+                logger.warning(msg)
+                continue
+
+            sat_positions[selected] = np.column_stack(xyz)
+
+        positions[(system, number)] = sat_positions
+
+    return GridOrbit(start, step, positions, order, filenames)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: orbitstore.py
+Description: on-disk store of the daily satellite positions
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import json
+import logging
+import os
+import os.path
+from builtins import object
+
+import numpy as np
+
+from tecs.rinex.common import ns2datetime
+from tecs.rinex.navstore import atomic_write
+from tecs.sat.orbit import ORBIT_GRID_ORDER, ORBIT_GRID_STEP, GridOrbit, \
+    broadcast_orbit
+
+NAME = 'tecs.sat.orbitstore'
+
+# version of the store layout; entries of the other versions are ignored
+STORE_FORMAT = 1
+
+INDEX_EXT = 'json'
+DATA_EXT = 'npy'
+
+
+def _sources_id(filenames):
+    """_sources_id(filenames) -> [[path, size, mtime], ...]
+    """
+    sources = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        sources.append([os.path.abspath(filename), stat.st_size,
+                        stat.st_mtime])
+    return sources
+
+
+class OrbitStore(object):
+    """OrbitStore(path) -> instance
+
+    the positions of the satellites on the grid of a day (see
+    tecs.sat.orbit.GridOrbit) kept in the `path` directory, one .npy
+    file (nodes x satellites x xyz) per system; the arrays are
+    memory-mapped when loaded, so the processes of a day share them. An
+    entry is used while the source files (navigation or SP3 ones) are
+    those it was computed from, with the same size and modification
+    time, and the grid step is the same.
+
+    Parameters
+    ----------
+    path : str
+        directory of the store
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _entry(self, key):
+        """_entry(key) -> entry
+
+        Returns
+        -------
+        entry : str
+            path to the files of the entry without the extension
+        """
+        return os.path.join(self.path, key)
+
+    def load(self, key, filenames, step=None, order=ORBIT_GRID_ORDER):
+        """load(key, filenames, step=None, order=ORBIT_GRID_ORDER) -> orbit
+        or None
+
+        Parameters
+        ----------
+        key : str
+            name of the entry, e.g. '2016-102.G'
+        filenames : sequence
+            the source files of the positions
+        step : float, optional
+            the grid step, seconds; any if None
+        order : int
+            order of the interpolating polynomial
+
+        Returns
+        -------
+        orbit : GridOrbit or None
+            None if there is no valid entry.
+        """
+        logger = logging.getLogger(NAME + '.load')
+
+        entry = self._entry(key)
+
+        try:
+            with io.open('{}.{}'.format(entry, INDEX_EXT)) as f_obj:
+                index = json.load(f_obj)
+            sources = _sources_id(filenames)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if (index.get('format') != STORE_FORMAT or
+                index.get('sources') != sources or
+                (step is not None and index.get('step') != step)):
+            msg = '{}: the stored positions are out of date.'.format(key)
+            logger.debug(msg)
+            return None
+
+        tables = {}
+        try:
+            for (system, numbers) in index['systems'].items():
+                data = '{}.{}.{}'.format(entry, system, DATA_EXT)
+                tables[system] = (numbers, np.load(data, mmap_mode='r'))
+        except (IOError, OSError, ValueError, KeyError) as err:
+            msg = "{}: can't load the stored positions ({})."
+            logger.warning(msg.format(key, err))
+            return None
+
+        return GridOrbit.from_tables(index['start'], index['step'], tables,
+                                     order, filenames)
+
+    def save(self, key, orbit, filenames=None):
+        """save(key, orbit, filenames=None) -> None
+
+        store the positions; failures are logged, the store is optional.
+
+        Parameters
+        ----------
+        key : str
+            name of the entry
+        orbit : GridOrbit
+        filenames : sequence, optional
+            the source files of the positions, orbit.filenames if None
+        """
+        logger = logging.getLogger(NAME + '.save')
+
+        entry = self._entry(key)
+        tables = orbit.tables()
+
+        try:
+            if filenames is None:
+                filenames = orbit.filenames
+            sources = _sources_id(filenames)
+
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+
+            # the data first, then the index: the entry is valid once
+            # its index is in place
+            for system in tables:
+                data = '{}.{}.{}'.format(entry, system, DATA_EXT)
+                atomic_write(data, lambda f: np.save(f, tables[system][1]))
+
+            index = json.dumps(dict(
+                format=STORE_FORMAT,
+                sources=sources,
+                start=int(orbit.start),
+                step=orbit.step,
+                systems=dict((system, tables[system][0])
+                             for system in tables),
+            ))
+            atomic_write('{}.{}'.format(entry, INDEX_EXT),
+                         lambda f: f.write(index.encode('utf-8')))
+
+        except (IOError, OSError) as err:
+            msg = "{}: can't store the positions ({})."
+            logger.warning(msg.format(key, err))
+
+
+def load_broadcast_orbit(store, ephemeris_index, compute, day_start,
+                         step=ORBIT_GRID_STEP, order=ORBIT_GRID_ORDER,
+                         filenames=()):
+    """load_broadcast_orbit(store, ephemeris_index, compute, day_start,
+            step=ORBIT_GRID_STEP, order=ORBIT_GRID_ORDER, filenames=())
+            -> orbit
+
+    the positions of the day from the store; they are computed (see
+    tecs.sat.orbit.broadcast_orbit) and stored if they are not there.
+
+    Parameters
+    ----------
+    store : OrbitStore
+    filenames : sequence
+        the navigation files of the messages
+
+    see tecs.sat.orbit.broadcast_orbit()
+
+    Returns
+    -------
+    orbit : GridOrbit
+    """
+    key = '{}.nav.{}'.format(ns2datetime(day_start).strftime('%Y-%j'),
+                             ephemeris_index.system)
+
+    orbit = store.load(key, filenames, step, order)
+    if orbit is None:
+        orbit = broadcast_orbit(ephemeris_index, compute, day_start, step,
+                                order, filenames)
+        store.save(key, orbit)
+
+    return orbit
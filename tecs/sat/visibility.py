@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding=utf8
+#
+# Copyright 2017 Ilya Zhivetiev <i.zhivetiev@gnss-lab.org>
+#
+# This file is part of tec-suite.
+#
+# tec-suite is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# tec-suite is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with tec-suite.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+File: visibility.py
+Description: time windows the satellites are above the elevation mask in
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from bisect import bisect_right
+from builtins import object
+
+import numpy as np
+
+from tecs.rinex.common import NS_PER_SEC
+
+NAME = 'tecs.sat.visibility'
+
+# grid step of the positions to find the windows, seconds
+VISIBILITY_STEP = 600.
+# a grid interval is out of the windows if the elevations at both its
+# nodes are VISIBILITY_MARGIN below the mask, deg; covers the
+# satellite's motion between the nodes and the small shifts of the site
+VISIBILITY_MARGIN = 5.
+
+
+def _runs(flags):
+    """_runs(flags) -> numpy.ndarray (runs, 2)
+
+    first and last + 1 indices of the runs of True.
+    """
+    padded = np.concatenate(([False], flags, [False]))
+    return np.flatnonzero(padded[1:] != padded[:-1]).reshape(-1, 2)
+
+
+class VisibilityWindows(object):
+    """VisibilityWindows(frame, orbit, mask=0., margin=VISIBILITY_MARGIN)
+    -> instance
+
+    time windows the satellites of the orbit are above the elevation
+    mask of the observer in; they are found from the positions at the
+    grid nodes, a grid interval is in a window unless the elevations at
+    both its nodes are below mask - margin. The satellites and the
+    epochs beyond the grid, as well as the unknown positions, are taken
+    as visible.
+
+    Attributes
+    ----------
+    windows : dict
+        {(system, number): [(start, end), ...]}, ns since the start of
+        the GPS time, the end excluded
+
+    Parameters
+    ----------
+    frame : tecs.sat.common.TopocentricFrame
+        the observer
+    orbit : tecs.sat.orbit.GridOrbit
+        positions of the satellites
+    mask : float
+        elevation mask, deg
+    margin : float
+        deg
+    """
+
+    def __init__(self, frame, orbit, mask=0., margin=VISIBILITY_MARGIN):
+        step_ns = int(round(orbit.step * NS_PER_SEC))
+
+        self.xyz = frame.xyz
+        self.start = orbit.start
+        self.end = orbit.start
+
+        self.windows = {}
+        self._starts = {}
+
+        tables = orbit.tables()
+        for system in sorted(tables):
+            (numbers, positions) = tables[system]
+            (nodes, sats) = positions.shape[0:2]
+            if nodes < 2:
+                continue
+            self.end = orbit.start + (nodes - 1) * step_ns
+
+            with np.errstate(invalid='ignore'):
+                (el, _) = frame.el_az_array(*positions.reshape(-1, 3).T)
+                above = ~(el.reshape(nodes, sats) < mask - margin)
+            intervals = above[:-1] | above[1:]
+
+            for (j, number) in enumerate(numbers):
+                windows = [(self.start + int(first) * step_ns,
+                            self.start + int(last) * step_ns)
+                           for (first, last) in _runs(intervals[:, j])]
+                self.windows[(system, number)] = windows
+                self._starts[(system, number)] = [w[0] for w in windows]
+
+    def visible(self, system, number, epoch):
+        """visible(system, number, epoch) -> bool
+
+        Parameters
+        ----------
+        system : str
+            satellite system
+        number : int
+            satellite number
+        epoch : int
+            ns since the start of the GPS time
+        """
+        windows = self.windows.get((system, number))
+        if windows is None or not self.start <= epoch < self.end:
+            return True
+
+        i = bisect_right(self._starts[(system, number)], epoch) - 1
+        return i >= 0 and epoch < windows[i][1]
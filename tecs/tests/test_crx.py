@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_crx.py
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from io import StringIO
+
+from nose.plugins.attrib import attr
+from nose.tools import assert_raises
+
+import tecs.rinex.v2.o as obs_v2
+import tecs.rinex.v3.o as obs_v3
+from tecs.rinex.basic import RinexError
+from tecs.rinex.crx import CrxDecoder, crx_version, repair
+from tecs.tests.test_obs2 import RINEX as RINEX2
+from tecs.tests.test_obs3 import RINEX as RINEX3
+
+NAME = 'test_crx'
+
+CRX_HEADER = (
+    '{ver:<20}COMPACT RINEX FORMAT                    CRINEX VERS   / TYPE\n'
+    'RNX2CRX ver.4.1.0                       19-Oct-26 07:05     '
+    'CRINEX PROG / DATE\n'
+)
+
+
+def compact(rinex, version, body):
+    """compact(rinex, version, body) -> text
+
+    Compact RINEX file: CRINEX records, the header of the RINEX file and
+    the compact body.
+    """
+    header = rinex.split('END OF HEADER\n')[0] + 'END OF HEADER\n'
+    return CRX_HEADER.format(ver=version) + header + body
+
+
+# rnx2crx output for the test_obs2 data
+# noinspection PyPep8
+CRX1_BODY = """&16  4 11  0  0  0.0000000  0 16G18G11G32G01G15G24G14G21G08G28G27G10G22S28S36S23
+
+3&-33772003627 3&-26049584205 3&20265784756 3&20265782383 3&20265782236 3&43000 3&26000 4744
+3&-19084053965 3&-14697668512 3&19748288818 3&19748288398 3&19748287988 3&44000 3&28000 4744
+3&-19121535876 3&-14829287293 3&19246313191 3&19246312878 3&19246315486 3&48000 3&36000 4846
+3&-9388357988 3&-7149338290 3&21141152437 3&21141152447 3&21141156618 3&38000 3&18000 4643
+3&-20578368657 3&-15071975916 3&23023722006 3&23023722113 3&23023721088 3&36000 3&12000 4642
+3&-8615275958 3&-6641407748 3&21495775090 3&21495775050 3&21495777082 3&37000 3&16000 4642
+3&-19540585793 3&-15073113164 3&19524148767 3&19524147302 3&19524148386 3&45000 3&30000 4745
+3&-37622246857 3&-27782971963 3&22370400977 3&22370399815 3&22370401954 3&36000 3&10000 4641
+3&-35528268223 3&-27479332466 3&18589753690 3&18589752586 3&18589755653 3&49000 3&40000 4846
+3&-9100710391 3&-6934885204 3&22114395234 3&22114394433 3&22114394140 3&38000 3&16000 4642
+3&-40378694793 3&-30584989311 3&19364796289 3&19364795126 3&19364797295 3&47000 3&36000 4746
+3&-38822056241 3&-29538334844 3&18033707841 3&18033706981 3&18033709081 3&52000 3&44000 4847
+3&-8434934732 3&-6481935916 3&21363658917 3&21363656964 3&21363655469 3&39000 3&20000 4643
+3&166  3&19581089672   3&36000  16
+3&525  3&18988381364   3&39000  16
+3&-272151047085  3&18423932603   3&40000  16
+                3
+
+31349586 24428243 5964688 5965958 5965597 -1000 -2000
+-139553657 -108743101 -26556357 -26556122 -26556494 0 0
+-126944155 -98917504 -24155917 -24156083 -24157030 1000 2000
+-150778180 -117489465 -28690587 -28691613 -28693215 1000 2000
+60234834 46936123 11464292 11462700 11464321 2000 4000
+-76874819 -59902467 -14627928 -14628934 -14629100 0 0
+-122748325 -95648024 -23357994 -23357652 -23358072 0 2000
+46001547 35845328 8754223 8755053 8753686 -1000 0  5
+-26887558 -20951352 -5116771 -5116604 -5116800 0 0
+-80655397 -62848347 -15348045 -15348582 -15348250 0 0
+35948951 28012162 6839996 6840592 6841334 -1000 0
+-8358294 -6512960 -1590512 -1590453 -1590492 0 0
+-146723340 -114329847 -27921364 -27920925 -27919977 0 0
+-48703153  -9267142   0
+-48820257  -9291934   0
+-48831635  -9293537   1000
+              1 &              5             24 1  21 08 2   7 10 22S 8 36 23&&&
+
+170760 133045 34336 31883 32440 2000 2000
+334995 261030 64893 63836 63975 0 0
+431002 335837 80844 80649 81957 -2000 -4000
+117135 91244 19936 22174 23326 -1000 -2000
+543719 423708 102851 103565 104287 -1000 0
+408712 318474 77522 76945 77542 0 -2000
+101062 78821 19048 18033 18247 0 -2000
+590874 460418 112543 112424 112767 -1000 0
+486010 378754 91930 92877 92594 0 0
+392883 306124 76086 75187 74074 1000 0
+412929 321765 78684 78430 78508 0 0
+119892 93418 23326 23424 22134 0 0
+-11449  -1808   1000
+-8826  2001   0
+-10973  -146   -1000
+"""
+
+# rnx2crx output for the test_obs3 data
+# noinspection PyPep8
+CRX3_BODY = """> 2016 04 01 00 00  0.0000000  0 11      S25E19G11S23G27G16G10G22G08G07E12
+
+3&37448170553 3&196791495990 3&-73470 3&44250 &707&7&&
+3&24758282971 3&130105642659 3&1831182 3&45250 3&24758286101 3&97156842790 3&1367476 3&43250 3&24758282806 3&99691361287 3&1403148 3&44750 3&24758283924 3&98424109043 3&1385315 3&47000 &707&7&&&707&7&&&707&7&&&707&7&&
+3&21791273856 3&114513931935 3&2440270 3&48250 3&21791273360 3&35500 3&21791271849 3&89231629324 3&1901513 3&35500         &808&8&&&5&&&505&5&&&&&&&&&&&&&&&&&&
+3&38540487727 3&202530969442 3&2482 3&45000 &707&7&&
+3&20704920061 3&108805158643 3&-1230079 3&51750 3&20704919731 3&46750 3&20704921451 3&84783282153 3&-958505 3&46750 3&20704921429 3&84783288156 3&-958448 3&48500 3&20704922100 3&81250655402 3&-918552 3&53750 &808&8&&&7&&&707&7&&&808&8&&&808&8&&
+3&23465369983 3&123311412239 3&-3631856 3&40750 3&23465369393 3&25250 3&23465369764 3&96086853538 3&-2830014 3&25250         &606&6&&&4&&&404&4&&&&&&&&&&&&&&&&&&
+3&21739947482 3&114244210427 3&-1923109 3&49000 3&21739947442 3&40250 3&21739948600 3&89021463300 3&-1498526 3&40250 3&21739948103 3&89021465310 3&-1498476 3&44750 3&21739947634 3&85312238744 3&-1436067 3&49750 &808&8&&&6&&&606&6&&&707&7&&&808&8&&
+3&22112704804 3&116203057963 3&2914521 3&47250 3&22112703839 3&35750 3&22112701030 3&90547828163 3&2271059 3&35750         &707&7&&&5&&&505&5&&&&&&&&&&&&&&&&&&
+3&20392732576 3&107164564506 3&808276 3&52000 3&20392732380 3&46000 3&20392733837 3&83504885139 3&629823 3&46000 3&20392734508 3&83504892152 3&629806 3&48500 3&20392733685 3&80025521398 3&603596 3&54250 &808&8&&&7&&&707&7&&&808&8&&&909&9&&
+3&24802224251 3&130336569518 3&-1978890 3&39000 3&24802224234 3&19250 3&24802221890 3&101560969628 3&-1541974 3&19250 3&24802222503 3&101560962626 3&-1542276 3&34500     &606&6&&&3&&&303&3&&&505&5&&&&&&&&&&
+3&24073210368 3&126505634401 3&679055 3&48250 3&24073211517 3&94468534558 3&507079 3&49750 3&24073208342 3&96932915414 3&520322 3&50500 3&24073209411 3&95700721991 3&513701 3&53250 &808&8&&&808&8&&&808&8&&&808&8&&
+                               1 &2      G11S23&&&&&&&&&&&&&&&&&&&&&&&&&&&
+
+-13911043 -73101136 -7235 0 -13911038 500 -13910820 -56961917 -5642 500                  6   6 6 6
+-15258 -75464 141 0
+>                              4 11
+    67                                                      # OF SATELLITES
+G   16   C1C   L1C   D1C   S1C   C2S   L2S   D2S   S2S   C2WCOMMENT
+         L2W   D2W   S2W   C5Q   L5Q   D5Q   S5Q            COMMENT
+   G01   756   756   756   756   755   755   755   755   756PRN / # OF OBS
+         756   756   756   756   756   756   756            PRN / # OF OBS
+   G02  1070  1070  1070  1070     0     0     0     0  1066PRN / # OF OBS
+        1066  1066  1066     0     0     0     0            PRN / # OF OBS
+   G03  1222  1221  1221  1222  1214  1214  1214  1214  1219PRN / # OF OBS
+        1219  1219  1219  1217  1217  1217  1217            PRN / # OF OBS
+   G05  1060  1058  1058  1060  1053  1053  1053  1053  1054PRN / # OF OBS
+        1054  1054  1054     0     0     0     0            PRN / # OF OBS
+>                              4  1
+  0000000.0000  0000000.0000  0000000.0000                  APPROX POSITION XYZ
+> 2016 04 01 00 00 15.0000000  0  2      G11S23
+
+3&21777362813 3&114440830799 3&2433035 3&48250 3&21777362322 3&36000 3&21777361029 3&89174667407 3&1895871 3&36000         &808&8&&&6&&&606&6&&&&&&&&&&&&&&&&&&
+3&38540472469 3&202530893978 3&2623 3&45000 &707&7&&
+"""
+
+
+@attr('rinex.crx')
+def test_crx_version():
+    assert crx_version(CRX_HEADER.format(ver='1.0').split('\n')[0]) == 1.0
+    assert crx_version(CRX_HEADER.format(ver='3.0').split('\n')[0]) == 3.0
+    assert crx_version(RINEX2.split('\n')[0]) is None
+
+
+@attr('rinex.crx')
+def test_repair():
+    assert repair('abc de', ' x &') == 'axc de'
+    assert repair('ab', '  c&d') == 'abc d'
+    assert repair('', '&7&0') == ' 7 0'
+
+
+@attr('rinex.crx')
+def test_data_record():
+    crx = CrxDecoder(1.0, 'test')
+
+    values, flags = crx.data_record('G01', '3&1000 3&2000  &5', 3)
+    assert values == [1000, 2000, None]
+    assert flags == ' 5    ', repr(flags)
+
+    # 1st, 2nd, 3rd order differences
+    for diff, val in ((10, 1010), (5, 1025), (1, 1046), (0, 1073)):
+        values, flags = crx.data_record('G01', '%d' % diff, 3)
+        assert values == [val, None, None], values
+        # the flags of absent values are blank
+        assert flags == ' 5    ', repr(flags)
+
+    # a new arc is needed after the gap
+    assert_raises(RinexError, crx.data_record, 'G01', '1 1', 3)
+
+
+@attr('rinex.crx')
+def test_epoch_record():
+    crx = CrxDecoder(1.0, 'test')
+
+    epoch = crx.epoch_record('&16  4 11  0  0  0.0000000  0  2G18G11')
+    assert epoch == ' 16  4 11  0  0  0.0000000  0  2G18G11'
+
+    epoch = crx.epoch_record(' ' * 16 + '3' + ' ' * 14 + '1   &&&')
+    assert epoch == ' 16  4 11  0  0 30.0000000  0  1G18   '
+
+    # special records don't change the reference record
+    crx.epoch_record('&                           4  1')
+    epoch = crx.epoch_record(' ' * 14 + '1 &')
+    assert epoch == ' 16  4 11  0  1  0.0000000  0  1G18   '
+
+
+class OddSatellites(object):
+    """picks the satellites of the odd numbers"""
+
+    @staticmethod
+    def pick(epoch, sat):
+        return int(sat[1:]) % 2 == 1
+
+
+def odd_records(records):
+    return [r for r in records if OddSatellites.pick(r[0], r[1])]
+
+
+class TestCompactObs2(object):
+    def __init__(self):
+        self.obs = None
+        self.crx = None
+
+    def setup(self):
+        self.obs = obs_v2.Obs211(StringIO(RINEX2), 'zwe21020.16o')
+        self.crx = obs_v2.CompactObs211(
+            StringIO(compact(RINEX2, '1.0', CRX1_BODY)), 'zwe21020.16d')
+
+    def test_interval(self):
+        assert self.crx.interval.value == self.obs.interval.value
+
+    def test_read_records(self):
+        records = list(self.crx.read_records())
+        assert len(records) == 47, len(records)
+        assert records == list(self.obs.read_records())
+
+    def test_read_records_sampling(self):
+        si = 60 * 10 ** 9
+        assert (list(self.crx.read_records(si)) ==
+                list(self.obs.read_records(si)))
+
+    def test_read_records_systems(self):
+        si = 60 * 10 ** 9
+        records = list(self.obs.read_records(si, systems=('S',)))
+        assert records
+        assert (list(self.crx.read_records(si, systems=('S',))) ==
+                records)
+
+    def test_read_records_sat_filter(self):
+        records = odd_records(self.obs.read_records())
+        assert records
+
+        obs = obs_v2.Obs211(StringIO(RINEX2), 'zwe21020.16o')
+        assert list(obs.read_records(sat_filter=OddSatellites())) == records
+        assert (list(self.crx.read_records(sat_filter=OddSatellites())) ==
+                records)
+
+
+class TestCompactObs3(object):
+    def __init__(self):
+        self.obs = None
+        self.crx = None
+
+    def setup(self):
+        self.obs = obs_v3.Obs302(StringIO(RINEX3), 'cebr0920.16o')
+        self.crx = obs_v3.CompactObs302(
+            StringIO(compact(RINEX3, '3.0', CRX3_BODY)), 'cebr0920.16d')
+
+    def test_interval(self):
+        assert self.crx.interval.value == self.obs.interval.value
+
+    def test_read_records(self):
+        records = list(self.crx.read_records())
+        assert len(records) == 15, len(records)
+        assert records == list(self.obs.read_records())
+
+    def test_read_records_systems(self):
+        si = 30 * 10 ** 9
+        records = list(self.obs.read_records(si, systems=('E',)))
+        assert records
+        assert (list(self.crx.read_records(si, systems=('E',))) ==
+                records)
+
+    def test_read_records_sat_filter(self):
+        records = odd_records(self.obs.read_records())
+        assert records
+
+        obs = obs_v3.Obs302(StringIO(RINEX3), 'cebr0920.16o')
+        assert list(obs.read_records(sat_filter=OddSatellites())) == records
+        assert (list(self.crx.read_records(sat_filter=OddSatellites())) ==
+                records)
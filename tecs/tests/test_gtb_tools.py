@@ -15,6 +15,8 @@ import tempfile
 
 from nose.plugins.attrib import attr
 
+from tecs.gtb.tools import below_snr_mask
+from tecs.rinex.common import datetime2ns
 from tecs.rinex.futils import find_xyz_file, load_xyz_file
 
 NAME = 'test_gtb_tools'
@@ -79,7 +81,24 @@ def test_load_xyx_file():
 
     for epoch in test_data:
         test = test_data[epoch]
-        loaded = loaded_data[epoch]
+        loaded = loaded_data[datetime2ns(epoch)]
 
         msg = '{} != {}'.format(test, loaded)
         assert test == loaded, msg
+
+
+@attr('gtb.tools')
+def test_below_snr_mask():
+    """gtb.tools.below_snr_mask()
+    """
+    rec = {'L1': (-33772003.627, 4, 7), 'S1': (43., 0, 0), 'S2': (26., 0, 0)}
+    assert not below_snr_mask(rec, 26.)
+    assert below_snr_mask(rec, 30.)
+
+    # RINEX 3: the first of the S1 observables
+    rec = {'S1C': (40., 0, 0), 'S1W': (20., 0, 0), 'S2W': (0., 0, 0)}
+    assert not below_snr_mask(rec, 30.)
+
+    # missing values
+    assert not below_snr_mask({'S1': (None, 0, 0)}, 30.)
+    assert not below_snr_mask({'L1': (-33772003.627, 4, 7)}, 30.)
@@ -21,6 +21,7 @@ except ImportError:
 
 from nose.tools import raises
 
+from tecs.rinex.common import datetime2ns
 from tecs.rinex.v2.n import Nav2
 
 GPS_MSG = """\
@@ -115,9 +116,9 @@ def test__parse_epoch_record():
     ]
 
     standard = [
-        ('G', 22, datetime.datetime(2016, 4, 9, 1, 59, 44),
+        ('G', 22, datetime2ns(datetime.datetime(2016, 4, 9, 1, 59, 44)),
          (3.662272356451e-04, -7.275957614183e-12, 0.)),
-        ('R', 5, datetime.datetime(2016, 4, 9, 0, 15),
+        ('R', 5, datetime2ns(datetime.datetime(2016, 4, 9, 0, 15)),
          (-8.258968591690e-06, -9.094947017729e-13, 0.))
     ]
 
@@ -137,3 +138,27 @@ def test_gps_error_nav():
 def test_glo_err_nav():
     fobj = io.StringIO(GLO_MSG_ERR)
     Nav2(fobj, 'zimj1000.16g')
+
+
+def test_ephemeris():
+    fobj = io.StringIO(GPS_MSG)
+    nav = Nav2(fobj, 'zimj1000.16n')
+
+    eph = nav.ephemeris['G']
+
+    # sorted by the number and the epoch
+    assert eph['number'].tolist() == [1, 22]
+    assert eph['epoch'].tolist() == [
+        datetime2ns(datetime.datetime(2016, 4, 9, 2)),
+        datetime2ns(datetime.datetime(2016, 4, 9, 1, 59, 44))]
+
+    assert eph['sv_clock']['bias'][1] == 3.662272356451e-04
+    assert eph['eph']['sqrt_a'].tolist() == [5.153641599655e+03,
+                                             5.155054737091e+03]
+    assert eph['eph']['fit_interval'][0] == 4.
+
+    # the same values in the message
+    for rec in eph:
+        message = nav.message['G'][rec['number']][rec['epoch']]
+        assert message == tuple(rec['eph'].tolist())
+        assert message[7] == rec['eph']['sqrt_a']
@@ -14,6 +14,7 @@ import datetime
 
 # import nose
 
+from tecs.rinex.common import datetime2ns
 from tecs.rinex.v3.n import Nav3
 
 from io import StringIO
@@ -78,9 +79,9 @@ class TestNav3(object):
                .519085000000E+06, .000000000000E+00)
 
         standard = {
-            'G': {29: {datetime.time(2, 0): g29}},
-            'R': {6: {datetime.time(0, 15): r06}},
-            'E': {22: {datetime.time(0, 0): e22}}
+            'G': {29: {datetime2ns(datetime.datetime(2016, 4, 9, 2)): g29}},
+            'R': {6: {datetime2ns(datetime.datetime(2016, 4, 9, 0, 15)): r06}},
+            'E': {22: {datetime2ns(datetime.datetime(2016, 4, 9)): e22}}
         }
 
         assert self.nav.ver_type.value == (3.02, 'N', 'M')
@@ -90,7 +91,8 @@ class TestNav3(object):
         # noinspection PyPep8
         rec = 'E22 2016 04 08 23 50 00 1.717753009871D-03 1.767404000930D-10' \
               ' 0.000000000000D+00'
-        standard = ('E', 22, datetime.datetime(2016, 4, 8, 23, 50),
+        epoch = datetime2ns(datetime.datetime(2016, 4, 8, 23, 50))
+        standard = ('E', 22, epoch,
                     (1.717753009871e-3, 1.767404000930e-10, 0.))
         test = self.nav._parse_epoch_record(rec)
 
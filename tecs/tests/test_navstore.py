@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_navstore.py
+Description: tests of the on-disk store of the navigation files
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import object
+
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tecs.rinex import nav_file
+from tecs.rinex.navstore import NavStore, StoredNav
+from tecs.rinex.nmutils import NavCache
+from tecs.tests.test_nav3 import NAV_MESSAGE
+
+NAME = 'tecs.tests.test_navstore'
+
+
+class TestNavStore(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+        self.filename = None
+        self.store = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        self.filename = os.path.join(self.tmp_dir, 'anmg1000.16p')
+        with io.open(self.filename, 'w') as f_obj:
+            f_obj.write(NAV_MESSAGE)
+
+        self.store = NavStore(os.path.join(self.tmp_dir, 'store'))
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_load(self):
+        assert self.store.load(self.filename) is None
+
+        nav = nav_file(self.filename)
+        self.store.save(nav)
+
+        stored = self.store.load(self.filename)
+
+        assert isinstance(stored, StoredNav)
+        assert stored.filename == self.filename
+        # built on the first use
+        assert stored._message is None
+        assert stored.message == nav.message
+
+        for system in nav.ephemeris:
+            assert isinstance(stored.ephemeris[system], np.memmap)
+            assert stored.ephemeris[system].dtype == \
+                nav.ephemeris[system].dtype
+
+    def test_invalidation(self):
+        self.store.save(nav_file(self.filename))
+
+        stat = os.stat(self.filename)
+        os.utime(self.filename, (stat.st_atime, stat.st_mtime + 10))
+        assert self.store.load(self.filename) is None
+
+        # size
+        self.store.save(nav_file(self.filename))
+        with io.open(self.filename, 'a') as f_obj:
+            f_obj.write(NAV_MESSAGE.split('END OF HEADER\n')[1])
+        assert self.store.load(self.filename) is None
+
+    def test_nav_cache(self):
+        nav = NavCache(store=self.store).get(self.filename)
+        assert not isinstance(nav, StoredNav)
+
+        # another process
+        stored = NavCache(store=self.store).get(self.filename)
+        assert isinstance(stored, StoredNav)
+        assert stored.message == nav.message
@@ -10,10 +10,23 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import datetime
+import io
+import os
+import shutil
+import tempfile
 
-from tecs.rinex.label import SAT_SYS_GPS, SAT_SYS_GAL
+import numpy as np
+from nose.tools import assert_raises
 
-from tecs.rinex.nmutils import compose_navigation_re
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import datetime2ns
+from tecs.rinex.label import SAT_SYS_GPS, SAT_SYS_GAL, SAT_SYS_GLO, \
+    SAT_SYS_BDS, SAT_SYS_GEO, SAT_SYS_MIX
+from tecs.rinex.nmsg import GPSNavigationMessage, ephemeris_message
+from tecs.rinex.nmutils import compose_navigation_re, \
+    load_navigation_message, select_navigation_message, EphemerisIndex, \
+    find_nav_files, get_prior_file, NavCache, NavIndex, NMError, NS_PER_SEC
+from tecs.tests.test_nav3 import NAV_MESSAGE
 
 NAME = 'tecs.tests.test_nmutils'
 
@@ -44,3 +57,270 @@ def test_compose_navigation_re():
 
     re_nav = compose_navigation_re(system, epoch)
     assert re_nav.match(nav_file_v3_df)
+
+
+def test_load_navigation_message_cache():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'anmg1000.16p')
+        with io.open(filename, 'w') as f_obj:
+            f_obj.write(NAV_MESSAGE)
+
+        epoch = datetime2ns(datetime.datetime(2016, 4, 9))
+        cache = NavCache()
+
+        navs = [load_navigation_message([tmp_dir], epoch, s, cache=cache)
+                for s in (SAT_SYS_GPS, SAT_SYS_GLO, SAT_SYS_GAL)]
+
+        # the mixed file is parsed once
+        assert len(cache) == 1
+        assert navs[0] is navs[1] is navs[2]
+        assert sorted(navs[0].message) == ['E', 'G', 'R']
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_nav_cache():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        files = [os.path.join(tmp_dir, f)
+                 for f in ('anmg1000.16p', 'anmg1010.16p', 'bad_1000.16p')]
+
+        for f in files[:2]:
+            with io.open(f, 'w') as f_obj:
+                f_obj.write(NAV_MESSAGE)
+
+        with io.open(files[2], 'w') as f_obj:
+            f_obj.write('not a rinex file\n')
+
+        cache = NavCache(size=2)
+
+        nav = cache.get(files[0])
+        assert cache.get(files[0]) is nav
+
+        cache.get(files[1])
+        assert_raises(RinexError, cache.get, files[2])
+
+        # the broken file is kept, the least recently used one is dropped
+        assert files[2] in cache
+        assert files[1] in cache
+        assert files[0] not in cache
+        assert_raises(RinexError, cache.get, files[2])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_ephemeris_index():
+    start = datetime2ns(datetime.datetime(2016, 4, 9))
+    minute = 60 * NS_PER_SEC
+
+    # GLONASS: messages every 30 minutes, +/- 15 minutes range;
+    # Galileo: irregular ones, +/- 3 hours
+    messages = {
+        SAT_SYS_GLO: [start + m * minute for m in (15, 45, 75, 105, 600)],
+        SAT_SYS_GAL: [start + m * minute for m in (0, 10, 20, 400)],
+    }
+
+    epochs = [start + m * minute // 2 for m in range(0, 2 * 24 * 60, 7)]
+    epochs += messages[SAT_SYS_GLO] + messages[SAT_SYS_GAL]
+
+    for system in messages:
+        message = {3: dict((t, (float(i),))
+                           for (i, t) in enumerate(messages[system]))}
+        index = EphemerisIndex(system, message)
+
+        assert 3 in index and 4 not in index
+
+        seconds, indices = index.select_batch(epochs, 3)
+
+        for (i, epoch) in enumerate(epochs):
+            res = index.select(epoch, 3)
+            assert res == select_navigation_message(epoch, system, 3,
+                                                    {system: message})
+
+            if res is None:
+                assert indices[i] == -1
+                continue
+
+            assert index.eph(3, indices[i]) == res[1]
+            assert abs(seconds[i] - res[0]) < 1e-6
+
+            # the message of the epoch or the earliest one in the range
+            msg_time = messages[system][int(res[1][0])]
+            if epoch not in messages[system]:
+                earlier = [t for t in messages[system] if t < msg_time]
+                assert not earlier or epoch - earlier[-1] > (
+                    index._range)
+            else:
+                assert msg_time == epoch
+
+
+def test_ephemeris_index_first_msg():
+    start = datetime2ns(datetime.datetime(2016, 4, 9))
+    hour = 3600 * NS_PER_SEC
+
+    message = {1: {start + 2 * hour: (1.,), start + 4 * hour: (2.,)}}
+    index = EphemerisIndex(SAT_SYS_GPS, message)
+
+    epochs = [start, start + 4 * hour, start + 20 * hour]
+
+    assert index.select(epochs[0], 1)[1] == (1.,)
+    assert index.select(epochs[2], 1) is None
+    assert index.select(epochs[2], 1, first_msg=True)[1] == (1.,)
+    # the message of the epoch itself goes first
+    assert index.select(epochs[1], 1, first_msg=True)[1] == (2.,)
+
+    seconds, indices = index.select_batch(epochs, 1, first_msg=True)
+    assert indices.tolist() == [0, 1, 0]
+
+
+def test_ephemeris_index_arrays():
+    start = datetime2ns(datetime.datetime(2016, 4, 9))
+    hour = 3600 * NS_PER_SEC
+
+    def ephemeris(records):
+        array = np.zeros(len(records), dtype=GPSNavigationMessage.dtype())
+        for (i, (number, epoch, iode)) in enumerate(records):
+            array[i]['number'] = number
+            array[i]['epoch'] = start + epoch * hour
+            array[i]['eph']['iode'] = iode
+        return array
+
+    arrays = [ephemeris([(1, 2, 1.), (3, 0, 2.), (1, 4, 3.)]),
+              ephemeris([(1, 4, 4.), (1, 6, 5.), (1, 6, 6.)])]
+
+    index = EphemerisIndex.from_ephemeris(SAT_SYS_GPS, arrays)
+
+    # the later arrays (and records) win
+    merged = {}
+    for array in arrays:
+        for (number, sat_message) in ephemeris_message(array).items():
+            merged.setdefault(number, {}).update(sat_message)
+    expected = EphemerisIndex(SAT_SYS_GPS, merged)
+
+    assert list(index) == list(expected) == [1, 3]
+    for number in index:
+        assert index.times[number].tolist() == \
+            expected.times[number].tolist()
+        for i in range(len(index.times[number])):
+            assert index.eph(number, i) == expected.eph(number, i)
+
+    assert [index.eph(1, i)[0] for i in range(3)] == [1., 4., 6.]
+    # the same object each time
+    assert index.select(start, 1)[1] is index.eph(1, 0)
+
+    assert len(EphemerisIndex.from_ephemeris(SAT_SYS_GPS, [])) == 0
+
+
+def test_load_navigation_message_adjacent():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        days = ((8, 'anmg0990.16p'), (9, 'anmg1000.16p'),
+                (10, 'anmg1010.16p'))
+        for (day, name) in days:
+            with io.open(os.path.join(tmp_dir, name), 'w') as f_obj:
+                f_obj.write(NAV_MESSAGE.replace(' 2016  4  9 ',
+                                                ' 2016  4 {:2d} '.format(day)))
+
+        epoch = datetime2ns(datetime.datetime(2016, 4, 9, 12))
+        cache = NavCache()
+
+        nav = load_navigation_message([tmp_dir], epoch, SAT_SYS_GPS,
+                                      cache=cache, adjacent=True)
+
+        assert nav.filename == os.path.join(tmp_dir, 'anmg1000.16p')
+        assert len(nav.filenames) == 3
+        assert len(cache) == 3
+
+        times = sorted(nav.message[SAT_SYS_GPS][29])
+        assert times == [datetime2ns(datetime.datetime(2016, 4, day, 2))
+                         for day in (8, 9, 10)]
+
+        # the cached files are intact
+        day_nav = cache.get(nav.filename)
+        assert len(day_nav.message[SAT_SYS_GPS][29]) == 1
+
+        # the first message of the epoch's day
+        index = EphemerisIndex.from_ephemeris(SAT_SYS_GPS,
+                                              nav.ephemeris[SAT_SYS_GPS])
+        eph = index.select(epoch, 29, first_msg=True)[1]
+        assert eph == day_nav.message[SAT_SYS_GPS][29][times[1]]
+
+        # no files of the adjacent days
+        os.remove(os.path.join(tmp_dir, 'anmg0990.16p'))
+        os.remove(os.path.join(tmp_dir, 'anmg1010.16p'))
+        nav = load_navigation_message([tmp_dir], epoch, SAT_SYS_GPS,
+                                      adjacent=True)
+        assert nav.filenames == [os.path.join(tmp_dir, 'anmg1000.16p')]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_nav_index():
+    names = [
+        'brdc1000.16n', 'zimj1000.16n.Z', 'mcct1000.16g', 'zimj1000.16g',
+        'brdc1010.16n', 'anmg1000.16p.gz', 'zimj1000.16o', 'zimj1000.16l',
+        'BRDC00IGS_R_20161000000_01D_MN.rnx.gz',
+        'CEBR00ESP_R_20161000000_01D_EN.rnx',
+        'CEBR00ESP_R_20161000000_01D_CN.rnx',
+        'ISTP00RUS_R_20161000000_01H_50Z_GN.rnx',
+        'readme.txt',
+    ]
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        dirs = [os.path.join(tmp_dir, d) for d in ('a', 'b')]
+        for d in dirs:
+            os.mkdir(d)
+
+        for (i, name) in enumerate(names):
+            io.open(os.path.join(dirs[i % 2], name), 'w').close()
+
+        index = NavIndex(dirs)
+
+        systems = (SAT_SYS_GPS, SAT_SYS_GLO, SAT_SYS_GAL, SAT_SYS_BDS,
+                   SAT_SYS_GEO, SAT_SYS_MIX)
+        for day in (9, 10, 11):
+            epoch = datetime.datetime(2016, 4, day, 12)
+            for system in systems:
+                files = find_nav_files(dirs, epoch, system)
+                assert sorted(index.find(epoch, system)) == sorted(files)
+
+                for priority in ((), ('mcct', 'brdc'), ('zimj', )):
+                    assert index.select(epoch, system, priority) == \
+                        get_prior_file(index.find(epoch, system), priority)
+
+        epoch = datetime.datetime(2016, 4, 9)
+        assert index.select(epoch, SAT_SYS_GLO, ('mcct',)) == \
+            os.path.join(dirs[0], 'mcct1000.16g')
+
+        # new files
+        new_file = os.path.join(dirs[1], 'mcct1000.16n')
+        io.open(new_file, 'w').close()
+        os.utime(dirs[1], (0, os.stat(dirs[1]).st_mtime + 10))
+
+        assert index.select(epoch, SAT_SYS_GPS, ('mcct',)) != new_file
+        index.refresh()
+        assert index.select(epoch, SAT_SYS_GPS, ('mcct',)) == new_file
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_load_navigation_message_index():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'anmg1000.16p')
+        with io.open(filename, 'w') as f_obj:
+            f_obj.write(NAV_MESSAGE)
+
+        index = NavIndex([tmp_dir])
+        epoch = datetime2ns(datetime.datetime(2016, 4, 9))
+
+        nav = load_navigation_message(index, epoch, SAT_SYS_GLO)
+        assert nav.filename == filename
+
+        epoch = datetime2ns(datetime.datetime(2016, 4, 10))
+        assert_raises(NMError, load_navigation_message, index, epoch,
+                      SAT_SYS_GLO)
+    finally:
+        shutil.rmtree(tmp_dir)
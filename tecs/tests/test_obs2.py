@@ -16,6 +16,7 @@ from io import StringIO
 import datetime
 
 import tecs.rinex.v2.o as obs_v2
+from tecs.rinex.common import datetime2ns
 
 # noinspection PyPep8
 RINEX = """     2.11           OBSERVATION DATA    M (MIXED)           RINEX VERSION / TYPE
@@ -161,7 +162,7 @@ class TestObs2(object):
 
         records = iter(self.obs.read_records())
 
-        s_dt = datetime.datetime(2016, 4, 11)
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 11))
         s_sat = ('G18', 'G11')
         # (-33772003.62747)
         # (-26049584.20544)
@@ -199,3 +200,37 @@ class TestObs2(object):
             assert r[0] == s_dt
             assert r[1] == s_sat[i]
             assert r[2] == s_obs[i]
+
+    def test_read_records_sampling(self):
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 11))
+        si = 60 * 10 ** 9
+
+        records = list(self.obs.read_records(si))
+
+        epochs = [r[0] for r in records]
+        assert sorted(set(epochs)) == [s_dt, s_dt + si], set(epochs)
+        assert epochs.count(s_dt) == 16
+        assert epochs.count(s_dt + si) == 15
+
+        rec = records[16]
+        assert rec[1] == 'G18'
+        assert rec[2]['S1'] == (43.000, 0, 0), rec[2]
+
+    def test_read_records_systems(self):
+        # the first epoch has got no GPS or SBAS satellites
+        rinex = RINEX.replace(
+            '  0  0  0.0000000  0 16G18G11G32G01G15G24G14G21G08G28G27G10\n'
+            '                                G22S28S36S23\n',
+            '  0  0  0.0000000  0 16R18R11R32R01R15R24R14R21R08R28R27R10\n'
+            '                                R22R28R36R23\n')
+        obs = obs_v2.Obs211(StringIO(rinex), 'zwe21020.16o')
+
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 11))
+        si = 60 * 10 ** 9
+
+        records = list(obs.read_records(si, systems=('G', 'S')))
+
+        # it doesn't take part in the decimation
+        assert set(r[0] for r in records) == {s_dt + si // 2}
+        assert len(records) == 16
+        assert set(r[1][0] for r in records) == {'G', 'S'}
@@ -16,6 +16,7 @@ import nose
 
 from io import StringIO
 import tecs.rinex.v3.o as obs_v3
+from tecs.rinex.common import datetime2ns
 
 NAME = 'test_obs3'
 
@@ -123,7 +124,7 @@ class TestObs3(object):
         assert self.obs.interval.value == 15.0
         assert self.obs.sys_n_obs.value == sys_obs
         assert self.obs.tofo.value == (
-            datetime.datetime(2016, 4, 1, 0, 0, 0, 0),
+            datetime2ns(datetime.datetime(2016, 4, 1, 0, 0, 0, 0)),
             'GPS')
 
     def test__parse_obs_record(self):
@@ -159,10 +160,10 @@ class TestObs3(object):
                        '      01.000001000000'
 
         standard = (
-            datetime.datetime(2016, 1, 1, 1, 29, 30, 0),
+            datetime2ns(datetime.datetime(2016, 1, 1, 1, 29, 30, 0)),
             0,
             23,
-            datetime.timedelta(0, 1, 1)
+            1000001000
         )
 
         result = self.obs._parse_epoch_record(epoch_record)
@@ -191,7 +192,7 @@ class TestObs3(object):
         E   16 C1C L1C D1C S1C C5Q L5Q D5Q S5Q
         C7Q L7Q D7Q S7Q C8Q L8Q D8Q S8Q
         """
-        s_dt = datetime.datetime(2016, 4, 1, 0, 0)
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 1, 0, 0))
         s_sat = ('S25', 'E19')
         s_obs = (
 
@@ -229,6 +230,33 @@ class TestObs3(object):
 
             i += 1
 
+    def test_read_records_sampling(self):
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 1, 0, 0))
+
+        records = list(self.obs.read_records(30 * 10 ** 9))
+
+        # the epoch duplicate is kept, 00:00:15 is skipped
+        assert len(records) == 13, len(records)
+        assert set(r[0] for r in records) == {s_dt}
+        assert records[-1][1] == 'S23'
+
+    def test_read_records_systems(self):
+        s_dt = datetime2ns(datetime.datetime(2016, 4, 1, 0, 0))
+        lines = RINEX.splitlines(True)
+        e12 = [l for l in lines if l.startswith('E12')][0]
+        g11 = [l for l in lines if l.startswith('G11')][0]
+        rinex = (RINEX +
+                 '> 2016 04 01 00 00 30.0000000  0  1\n' + e12 +
+                 '> 2016 04 01 00 00 45.0000000  0  1\n' + g11)
+        obs = obs_v3.Obs3(StringIO(rinex), 'cebr0920.16o')
+
+        records = list(obs.read_records(30 * 10 ** 9, systems=('G', 'S')))
+
+        # 00:00:30 (Galileo only) doesn't take part in the decimation
+        epochs = sorted(set(r[0] for r in records))
+        assert epochs == [s_dt, s_dt + 45 * 10 ** 9], epochs
+        assert set(r[1][0] for r in records) == {'G', 'S'}
+
     def test__det_interval(self):
         self.obs._det_interval()
         assert self.obs.interval.value == 15., self.obs.interval.value
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_orbitstore.py
+Description: tests of the on-disk store of the daily satellite positions
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import object
+
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tecs.rinex.common import NS_PER_SEC, datetime2ns
+from tecs.rinex.nmutils import EphemerisIndex
+from tecs.rinex.v2.n import Nav2
+from tecs.sat import gps
+from tecs.sat.orbit import OrbitInterpolator, broadcast_orbit
+from tecs.sat.orbitstore import OrbitStore, load_broadcast_orbit
+from tecs.tests.test_nav2 import GPS_MSG
+
+NAME = 'tecs.tests.test_orbitstore'
+
+DAY_START = datetime2ns(datetime.datetime(2016, 4, 9))
+
+
+def ephemeris_index():
+    """ephemeris_index() -> EphemerisIndex of GPS_MSG
+    """
+    nav = Nav2(io.StringIO(GPS_MSG), 'zimj1000.16n')
+    return EphemerisIndex('G', nav.message['G'])
+
+
+def test_broadcast_orbit():
+    index = ephemeris_index()
+    orbit = broadcast_orbit(index, gps.compute_sat_xyz_array, DAY_START)
+    interpolator = OrbitInterpolator(gps.compute_sat_xyz_array)
+
+    # the day's edges included
+    epochs = DAY_START + np.arange(0, 86400, 577) * NS_PER_SEC
+    epochs = np.append(epochs, DAY_START + 86400 * NS_PER_SEC - 1)
+
+    for number in (1, 22):
+        (x, y, z) = orbit.positions('G', number, epochs)
+
+        for (i, epoch) in enumerate(epochs.tolist()):
+            (sec, eph) = index.select(epoch, number, first_msg=True)
+            xyz = interpolator.position(eph, sec)
+
+            assert np.allclose(orbit.position('G', number, epoch), xyz,
+                               rtol=0, atol=1e-6)
+            assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-6)
+
+    assert ('G', 2) not in orbit
+    assert orbit.position('G', 2, DAY_START) is None
+
+
+class TestOrbitStore(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+        self.filename = None
+        self.store = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        self.filename = os.path.join(self.tmp_dir, 'zimj1000.16n')
+        with io.open(self.filename, 'w') as f_obj:
+            f_obj.write(GPS_MSG)
+
+        self.store = OrbitStore(os.path.join(self.tmp_dir, 'store'))
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load(self):
+        index = ephemeris_index()
+        orbit = broadcast_orbit(index, gps.compute_sat_xyz_array, DAY_START,
+                                filenames=[self.filename])
+
+        assert self.store.load('2016-100.nav.G', [self.filename]) is None
+        self.store.save('2016-100.nav.G', orbit)
+
+        stored = self.store.load('2016-100.nav.G', [self.filename], 300.)
+        assert stored is not None
+        assert stored.filename == self.filename
+        assert stored.start == orbit.start
+
+        tables = stored.tables()
+        assert tables['G'][0] == [1, 22]
+        assert np.array_equal(tables['G'][1], orbit.tables()['G'][1])
+
+        epoch = DAY_START + 3600 * NS_PER_SEC
+        assert stored.position('G', 22, epoch) == \
+            orbit.position('G', 22, epoch)
+
+        # the other grid
+        assert self.store.load('2016-100.nav.G', [self.filename], 900.) \
+            is None
+
+    def test_source_changed(self):
+        calls = []
+
+        def compute(eph, sec):
+            calls.extend(sec.tolist())
+            return gps.compute_sat_xyz_array(eph, sec)
+
+        for _ in range(2):
+            load_broadcast_orbit(self.store, ephemeris_index(), compute,
+                                 DAY_START, filenames=[self.filename])
+        # computed once
+        assert len(calls) == 2 * (288 + 2 * 5 + 1)
+
+        stat = os.stat(self.filename)
+        os.utime(self.filename, (stat.st_atime, stat.st_mtime + 10))
+
+        load_broadcast_orbit(self.store, ephemeris_index(), compute,
+                             DAY_START, filenames=[self.filename])
+        assert len(calls) == 4 * (288 + 2 * 5 + 1)
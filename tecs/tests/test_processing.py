@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_processing.py
+Description: tests of the processing modes of tecs: the network mode and
+the worker processes give the output of the station-by-station one
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import object
+from builtins import range
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import tecs
+from tecs.tests.test_nav2 import GPS_MSG
+from tecs.tests.test_stream import HEADER
+
+NAME = 'tecs.tests.test_processing'
+
+# the sites (zwe2 and a site 10 km away), the messages of GPS_MSG are
+# of 2016-04-09; G01 and G22 are above the horizon at 02:00
+SITES = {
+    'zwe2': (2886359.0, 2155972.0, 5245886.0),
+    'zwe3': (2880000.0, 2163000.0, 5248000.0),
+}
+
+EPOCH = ' 16  4  9  2{m:3d}{s:11.7f}  0  2G01G22\n'
+NUM_OF_EPOCHS = 21
+
+CFG = """\
+obsDir = obs
+navDir = nav
+outDir = tec
+recFields = 'all'
+samplingInterval = 0
+navIgnoreAbsence = False
+"""
+
+# the worker processes take the daily positions from the store; the
+# station-by-station processing does the same with it
+STORE_CFG = CFG + """\
+orbitStoreDir = orbits
+"""
+
+
+def write_obs(filename, xyz, shift, epochs=range(NUM_OF_EPOCHS)):
+    """write_obs(filename, xyz, shift, epochs=range(NUM_OF_EPOCHS)) -> None
+
+    the station-day of the G01 and G22 records every 30 seconds.
+    """
+    header = HEADER.replace(
+        '  2886359.0000  2155972.0000  5245886.0000',
+        '{:14.4f}{:14.4f}{:14.4f}'.format(*xyz))
+    header = header.replace('  2016     4    11', '  2016     4     9')
+
+    with io.open(filename, 'w') as f_obj:
+        f_obj.write(header)
+        for k in epochs:
+            sec = 30 * k
+            f_obj.write(EPOCH.format(m=sec // 60, s=sec % 60))
+            for (i, rng) in enumerate((20265784.756, 21141152.437)):
+                rng += shift + 120.5 * k + 1000. * i
+                values = (rng * 5.25, rng * 4.09, rng, rng + 1.25,
+                          rng + 3.5)
+                f_obj.write(''.join('{:14.3f}  '.format(v)
+                                    for v in values).rstrip() + '\n')
+                f_obj.write('        43.000          26.000\n')
+
+
+class TestProcessing(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        for d in ('obs', 'nav'):
+            os.mkdir(os.path.join(self.tmp_dir, d))
+
+        with io.open(os.path.join(self.tmp_dir, 'nav', 'brdc1000.16n'),
+                     'w') as f_obj:
+            f_obj.write(GPS_MSG)
+
+        for (i, site) in enumerate(sorted(SITES)):
+            write_obs(os.path.join(self.tmp_dir, 'obs',
+                                   '{}1000.16o'.format(site)),
+                      SITES[site], 7.5 * i)
+
+        for (name, cfg) in (('tecs.cfg', CFG), ('store.cfg', STORE_CFG)):
+            with io.open(os.path.join(self.tmp_dir, name), 'w') as f_obj:
+                f_obj.write(cfg)
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def process(self, *args, **kwargs):
+        """process(*args, cfg='tecs.cfg') -> {filename: lines}
+
+        run tecs with the arguments; the output files without the time
+        of their creation.
+        """
+        cfg = kwargs.get('cfg', 'tecs.cfg')
+
+        out_dir = os.path.join(self.tmp_dir, 'tec')
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(
+            os.path.dirname(os.path.abspath(tecs.__file__)))
+
+        cmd = [sys.executable, '-m', 'tecs', '-q', '-c',
+               os.path.join(self.tmp_dir, cfg)] + list(args)
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(cmd, cwd=self.tmp_dir, env=env,
+                                  stdout=devnull, stderr=devnull)
+
+        output = {}
+        for (path, _, names) in os.walk(out_dir):
+            for name in names:
+                if not name.endswith('.dat'):
+                    continue
+                filename = os.path.join(path, name)
+                with io.open(filename) as f_obj:
+                    output[os.path.relpath(filename, out_dir)] = [
+                        line for line in f_obj
+                        if not line.startswith('# Created on')]
+        return output
+
+    def test_station_by_station(self):
+        output = self.process()
+
+        assert sorted(output) == sorted(
+            os.path.join('2016', '100', site,
+                         '{}_G{:02d}_100_16.dat'.format(site, number))
+            for site in SITES for number in (1, 22))
+
+        for lines in output.values():
+            records = [line for line in lines if not line.startswith('#')]
+            assert len(records) == NUM_OF_EPOCHS
+
+    def test_network(self):
+        assert self.process('--network') == self.process()
+
+    def test_jobs(self):
+        expected = self.process(cfg='store.cfg')
+        assert self.process('--jobs', '2', cfg='store.cfg') == expected
+        assert self.process('--jobs', '2', '--network',
+                            cfg='store.cfg') == expected
+
+    def test_sub_daily(self):
+        expected = self.process()
+
+        # zwe2 in two overlapping 15-minute files
+        os.remove(os.path.join(self.tmp_dir, 'obs', 'zwe21000.16o'))
+        parts = ('zwe2100c00.16o', 'zwe2100c15.16o')
+        for (part, epochs) in zip(parts, (range(0, 11),
+                                          range(10, NUM_OF_EPOCHS))):
+            write_obs(os.path.join(self.tmp_dir, 'obs', part),
+                      SITES['zwe2'], 0., epochs)
+
+        output = self.process()
+        assert sorted(output) == sorted(expected)
+
+        for (filename, lines) in output.items():
+            if not filename.startswith(os.path.join('2016', '100', 'zwe2')):
+                assert lines == expected[filename]
+                continue
+
+            sources = [line for line in lines if line.startswith('# Sources')]
+            assert sources == ['# Sources: {}, {}, {}\n'.format(
+                os.path.join('obs', parts[0]), os.path.join('obs', parts[1]),
+                os.path.join('nav', 'brdc1000.16n'))]
+
+            records = [line for line in lines if not line.startswith('#')]
+            assert records == [line for line in expected[filename]
+                               if not line.startswith('#')]
@@ -13,7 +13,8 @@ import datetime
 from nose.plugins.attrib import attr
 from nose.tools import assert_raises
 
-from tecs.rinex.common import validate_epoch
+from tecs.rinex.common import validate_epoch, epoch2ns, sec2ns, \
+    datetime2ns, ns2datetime, NS_PER_SEC
 
 NAME = 'test_rinex_common'
 VERSION = 0.1
@@ -48,3 +49,66 @@ def test_validate_epoch():
 
     with assert_raises(ValueError):
         validate_epoch(epoch)
+
+
+@attr('rinex.common')
+def test_epoch2ns():
+    """epoch2ns
+    """
+    epoch = (
+        [1980, 1, 6, 0, 0, 0],
+        [2016, 4, 9, 1, 59, 44 * NS_PER_SEC + 5],
+        [92, 11, 16, 7, 34, 60 * NS_PER_SEC],  # sec == 60
+        [2, 11, 16, 7, 120, 0]  # min == 120
+    )
+
+    test_epoch = (
+        0,
+        datetime2ns(datetime.datetime(2016, 4, 9, 1, 59, 44)) + 5,
+        datetime2ns(datetime.datetime(1992, 11, 16, 7, 35)),
+        datetime2ns(datetime.datetime(2002, 11, 16, 9))
+    )
+
+    for i, test in enumerate(test_epoch):
+        result = epoch2ns(epoch[i])
+
+        err = '{} != {}'.format(test, result)
+        assert test == result, err
+
+    with assert_raises(ValueError):
+        epoch2ns([1999, 6, 8, 24, 0, 0])
+
+    with assert_raises(ValueError):
+        epoch2ns([1999, 2, 30, 0, 0, 0])
+
+
+@attr('rinex.common')
+def test_sec2ns():
+    """sec2ns
+    """
+    secs = (
+        (' 44.0', 44 * NS_PER_SEC),
+        ('30.0000000', 30 * NS_PER_SEC),
+        (' 0.1234567', 123456700),
+        ('      01.000001000000', 1000001000),
+        ('-.123456789012', -123456789),
+        ('5', 5 * NS_PER_SEC)
+    )
+
+    for sec, test in secs:
+        result = sec2ns(sec)
+
+        err = '{} != {}'.format(test, result)
+        assert test == result, err
+
+    for sec in ('', '   ', '1.2.3', 'a.0'):
+        with assert_raises(ValueError):
+            sec2ns(sec)
+
+
+@attr('rinex.common')
+def test_ns2datetime():
+    """ns2datetime
+    """
+    dt = datetime.datetime(2016, 4, 9, 23, 59, 59, 999999)
+    assert ns2datetime(datetime2ns(dt)) == dt
@@ -8,14 +8,46 @@ from __future__ import division
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from builtins import bytes
 from builtins import object
+from builtins import range
 
+import base64
 import datetime
+import gzip
+import io
+import os
+import shutil
+import tempfile
 
-from tecs.rinex.futils import get_rinex_date
+from nose.tools import assert_raises
+
+from tecs.rinex.futils import get_rinex_date, group_obs_files, \
+    open_compressed, read_file_list, stream_obs_groups, walk_files, \
+    RE_OBS, UncompressError
+from tecs.rinex.lzw import lzw_chunks
 
 NAME = "tecs.tests.test_rinex_futils"
 
+# bytes(range(256)) * 2 + b'tec-suite ' * 50, compressed with `compress`
+LZW_SAMPLE = base64.b64decode("""
+H52QAAIIGECggIEDCBIoWMCggYMHECJImEChgoULGDJo2MChg4cPIEKIGEGihIkTKFKo
+WMGihYsXMGLImEGjho0bOHLo2MGjh48fQIIIGUKkiJEjSJIoWcKkiZMnUKJImUKlipUr
+WLJo2cKli5cvYMKIGUOmjJkzaNKoWcOmjZs3cOLImUOnjp07ePLo2cOnj58/gAIJGkSo
+kKFDiBIpWsSokaNHkCJJmkSpkqVLmDJp2sSpk6dPoEKJGkWqlKlTqFKpWsWqlatXsGLJ
+mkWrlq1buHLp2sWrl69fwIIJG0asmLFjyJIpW8asmbNn0KJJm0atmrVr2LJp28atm7dv
+4MKJG0eunLlz6NKpW8eunbt38OLJm0evnr17+PLp28evn79/AQ1U0EEJLdTQQxFNVNFF
+GW3U0UchjVTSSSmt1NJLMc1U00057dTTT0ENVdRRSS3V1FNRTVXVVVlt1dVXYY1V1llp
+rdXWW3HNVdddee3V11+BDVbYYYkt1thjkU1W2WWZbdbZZ6GNVtppqa3W2muxzVbbbbnt
+1ttvwQ1X3HHJLdfcc9FNV9112W3X3XfhjVfeeemt19578c1X33357dfff3SUMUYLc9SR
+RqAgBDpooYeWkaighBqKqKKRNvroopI6Simjk0LKqaaeZnpppZ1iaummoqJ6aqirmloq
+qaC6Giuso35aa6qsvmqrqrriKuutrdLK66y75kqsr8IaC2yvwRb767DLHtssss4m+6yy
+0GaL7bbX/go=
+""")
+LZW_DATA = bytes(range(256)) * 2 + b'tec-suite ' * 50
+
+TEXT = 'line 1\nline 2\n' * 1000
+
 
 class TestRINEXFutils(object):
 
@@ -32,3 +64,171 @@ class TestRINEXFutils(object):
             d = get_rinex_date(f)
             print(d)
             assert d == datetime.date(2016, 4, 9)
+
+    def test_group_obs_files(self):
+        files = [
+            'obs/zimj100b.16o',
+            'obs/HKSL00HKG_R_20161000000_01D_30S_MO.rnx',
+            'obs/zimj100a.16o.Z',
+            'obs/zimj101a15.16d',
+            'obs/zimj101a00.16d',
+            'obs/zimm100a.16o',
+        ]
+
+        groups = group_obs_files(files)
+
+        assert groups == [
+            ['obs/HKSL00HKG_R_20161000000_01D_30S_MO.rnx'],
+            ['obs/zimj100a.16o.Z', 'obs/zimj100b.16o'],
+            ['obs/zimj101a00.16d', 'obs/zimj101a15.16d'],
+            ['obs/zimm100a.16o'],
+        ], groups
+
+
+class TestWalkFiles(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        for path in ('2016/099/zimj0990.16o',
+                     '2016/100/zimj1000.16o',
+                     '2016/100/zimj1000.16n',
+                     '2016/101/zimj1010.16o',
+                     '2017/100/zimj1000.17o',
+                     'zimm1000.16o'):
+            path = os.path.join(self.tmp_dir, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            io.open(path, 'w').close()
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _walk(self, date_range=None):
+        bunches = walk_files([self.tmp_dir], RE_OBS, date_range)
+        return [[os.path.relpath(f, self.tmp_dir) for f in files]
+                for files in bunches]
+
+    def test_walk_files(self):
+        assert self._walk() == [
+            ['zimm1000.16o'],
+            ['2016/099/zimj0990.16o'],
+            ['2016/100/zimj1000.16o'],
+            ['2016/101/zimj1010.16o'],
+            ['2017/100/zimj1000.17o'],
+        ]
+
+    def test_walk_files_date_range(self):
+        date_range = (datetime.date(2016, 4, 9), datetime.date(2016, 4, 9))
+        assert self._walk(date_range) == [
+            ['zimm1000.16o'],
+            ['2016/100/zimj1000.16o'],
+        ]
+
+    def test_stream_obs_groups(self):
+        # hourly files in the sibling directories
+        for path in ('2016/100/00/zimj100a.16o',
+                     '2016/100/00/zimm100a.16o',
+                     '2016/100/01/zimj100b.16o',
+                     '2016/100/02/zimm100c.16o',
+                     '2016/101/00/zimj101a.16o'):
+            path = os.path.join(self.tmp_dir, 'hourly', path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            io.open(path, 'w').close()
+
+        path = os.path.join(self.tmp_dir, 'hourly')
+        batches = walk_files([path], RE_OBS)
+        groups = [[os.path.relpath(f, path) for f in o_files]
+                  for o_files in stream_obs_groups(batches)]
+
+        assert groups == [
+            ['2016/100/00/zimj100a.16o', '2016/100/01/zimj100b.16o'],
+            ['2016/100/00/zimm100a.16o', '2016/100/02/zimm100c.16o'],
+            ['2016/101/00/zimj101a.16o'],
+        ], groups
+
+    def test_stream_obs_groups_early(self):
+        def batches():
+            yield ['a/zimj100a.16o']
+            yield ['b/zimj100b.16o']
+            yield ['c/zimj101a.16o']
+            # the walk isn't over
+            raise AssertionError
+
+        groups = stream_obs_groups(batches())
+        assert next(groups) == ['a/zimj100a.16o', 'b/zimj100b.16o']
+
+    def test_read_file_list(self):
+        f_obj = io.StringIO('# files\n\nobs/zimj1000.16o\n  obs/a b.16o \n')
+        assert read_file_list(f_obj) == ['obs/zimj1000.16o', 'obs/a b.16o']
+
+
+class TestOpenCompressed(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lzw_chunks(self):
+        data = b''.join(lzw_chunks(io.BytesIO(LZW_SAMPLE), chunk_size=100))
+        assert data == LZW_DATA
+
+        assert_raises(ValueError, list, lzw_chunks(io.BytesIO(b'\x1f\x8b')))
+
+    def test_gzip(self):
+        fn = os.path.join(self.tmp_dir, 'test.gz')
+
+        # two members
+        half = len(TEXT) // 2
+        with gzip.open(fn, 'wb') as f_obj:
+            f_obj.write(TEXT[:half].encode('ascii'))
+        with gzip.open(fn, 'ab') as f_obj:
+            f_obj.write(TEXT[half:].encode('ascii'))
+
+        f_obj = open_compressed(fn)
+        assert f_obj.readline() == 'line 1\n'
+        f_obj.seek(0)
+        assert f_obj.read() == TEXT
+        f_obj.close()
+
+    def test_gzip_truncated(self):
+        fn = os.path.join(self.tmp_dir, 'test.gz')
+        with gzip.open(fn, 'wb') as f_obj:
+            f_obj.write(TEXT.encode('ascii'))
+
+        with open(fn, 'rb') as f_obj:
+            data = f_obj.read()
+        with open(fn, 'wb') as f_obj:
+            f_obj.write(data[:-10])
+
+        f_obj = open_compressed(fn)
+        assert_raises(UncompressError, f_obj.read)
+        f_obj.close()
+
+    def test_lzw(self):
+        fn = os.path.join(self.tmp_dir, 'test.Z')
+        with open(fn, 'wb') as f_obj:
+            f_obj.write(LZW_SAMPLE)
+
+        f_obj = open_compressed(fn)
+        # ascii only
+        assert f_obj.read().endswith('tec-suite ' * 50)
+        f_obj.seek(0)
+        assert f_obj.read(3) == '\x00\x01\x02'
+        f_obj.close()
+
+    def test_unknown(self):
+        fn = os.path.join(self.tmp_dir, 'test.Z')
+        with open(fn, 'wb') as f_obj:
+            f_obj.write(b'plain text')
+
+        assert_raises(UncompressError, open_compressed, fn)
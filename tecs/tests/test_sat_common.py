@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_sat_common.py
+Description: tests of the common satellite functions
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from math import atan2, cos, sin, sqrt
+
+import numpy as np
+
+from tecs.sat import datum
+from tecs.sat.common import TopocentricFrame, compute_el_az, el_az_matrix, \
+    lbh2xyz, xyz2lbh, xyz2lbh_array
+
+NAME = 'tecs.tests.test_sat_common'
+
+# zwe2
+OBS = (2886359.0, 2155972.0, 5245886.0)
+
+
+def satellites(num=500):
+    """satellites(num=500) -> x, y, z
+    """
+    rng = np.random.RandomState(1)
+    xyz = rng.normal(size=(3, num))
+    xyz *= rng.uniform(2.0e7, 4.2e7, num) / np.sqrt((xyz ** 2).sum(axis=0))
+    return xyz
+
+
+def iterative_xyz2lbh(x, y, z):
+    """iterative_xyz2lbh(x, y, z) -> (l, b, h)
+
+    the former iterative conversion, the reference.
+    """
+    q = sqrt(x ** 2 + y ** 2)
+    l = atan2(y, x)
+
+    b_1 = z / q * 1 / (1 - datum.e ** 2)
+    b = b_1
+    n = 0
+
+    while 1:
+        n = datum.a / sqrt(1 - datum.e ** 2 * sin(b) ** 2)
+        b_1 = atan2(z + n * datum.e ** 2 * sin(b), q)
+        if abs(b_1 - b) <= 1e-12:
+            break
+        b = b_1
+
+    h = q * cos(b_1) + z * sin(b_1) - n * (1 - datum.e ** 2 * sin(b_1) ** 2)
+
+    return l, b_1, h
+
+
+def test_xyz2lbh():
+    rng = np.random.RandomState(2)
+    l = rng.uniform(-np.pi, np.pi, 1000)
+    b = rng.uniform(-1.56, 1.56, 1000)
+    # sites and satellites
+    h = np.concatenate((rng.uniform(-500, 9000, 500),
+                        rng.uniform(1.9e7, 3.6e7, 500)))
+
+    (x, y, z) = lbh2xyz(l, b, h)
+
+    for i in range(len(x)):
+        lbh = xyz2lbh(x[i], y[i], z[i])
+        reference = iterative_xyz2lbh(x[i], y[i], z[i])
+
+        assert abs(lbh[1] - reference[1]) < 1e-12
+        assert abs(lbh[2] - reference[2]) < 1e-6
+
+        # the inverse
+        assert abs(lbh[1] - b[i]) < 1e-12
+        assert abs(lbh[2] - h[i]) < 1e-6
+
+    # the pole
+    (_, b, h) = xyz2lbh(0., 0., 6356852.314245)
+    assert b == np.pi / 2
+    assert abs(h - 100.) < 1e-6
+
+
+def test_xyz2lbh_array():
+    (x, y, z) = satellites()
+    (l, b, h) = xyz2lbh_array(x, y, z)
+
+    for i in range(len(x)):
+        assert np.allclose((l[i], b[i], h[i]), xyz2lbh(x[i], y[i], z[i]),
+                           rtol=1e-12, atol=1e-9)
+
+
+def test_el_az_array():
+    frame = TopocentricFrame(OBS)
+    (x, y, z) = satellites()
+
+    (el, az) = frame.el_az_array(x, y, z)
+
+    for i in range(len(x)):
+        sat = (x[i], y[i], z[i])
+        expected = compute_el_az(OBS, sat)
+
+        assert frame.el_az(sat) == expected
+        assert abs(el[i] - expected[0]) < 1e-9
+        assert abs((az[i] - expected[1] + 180) % 360 - 180) < 1e-9
+
+
+def test_el_az_matrix():
+    sites = [OBS, (-2341333.0, -3539049.5, 4745791.3), (6378137.0, 0., 0.)]
+    frames = [TopocentricFrame(site) for site in sites]
+    (x, y, z) = satellites(50)
+
+    (el, az) = el_az_matrix(frames, x, y, z)
+    assert el.shape == az.shape == (3, 50)
+
+    for (i, frame) in enumerate(frames):
+        for j in range(len(x)):
+            expected = frame.el_az((x[j], y[j], z[j]))
+
+            assert abs(el[i, j] - expected[0]) < 1e-9
+            assert abs((az[i, j] - expected[1] + 180) % 360 - 180) < 1e-9
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_sat_glonass.py
+Description: tests of the GLONASS (and SBAS) orbits
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+
+import numpy as np
+
+from tecs.rinex.v2.n import Nav2
+from tecs.sat import glonass
+from tecs.tests.test_nav2 import GLO_MSG
+
+NAME = 'tecs.tests.test_sat_glonass'
+
+
+def messages():
+    """messages() -> list of the ephemeris tuples
+    """
+    nav = Nav2(io.StringIO(GLO_MSG), 'zimj1000.16g')
+    return [eph for sat in nav.message['R'].values() for eph in sat.values()]
+
+
+def test_state_integrator():
+    dts = (-900., -450., -30., 0., 15., 30., 300., 600., 900.)
+
+    for eph in messages():
+        # the fine steps give the reference
+        reference = glonass.StateIntegrator(step=1.)
+        integrator = glonass.StateIntegrator()
+
+        for dt in dts:
+            xyz = integrator.position(eph, dt)
+            assert np.allclose(xyz, reference.position(eph, dt),
+                               rtol=0, atol=1e-2), dt
+
+        assert integrator.position(eph, 0.) == \
+            tuple(v * 1000 for v in eph[0:9:4])
+
+
+def test_state_integrator_cache():
+    eph = messages()[0]
+
+    integrator = glonass.StateIntegrator(step=60., size=1)
+    integrator.position(eph, 900.)
+    integrator.position(eph, -120.)
+
+    states = integrator._states[eph][1]
+    assert sorted(states) == list(range(-2, 16))
+
+    # the oldest message is dropped
+    integrator.position(messages()[1], 60.)
+    assert list(integrator._states) == [messages()[1]]
+
+
+def test_state_integrator_states_limit():
+    eph = messages()[0]
+    dts = np.arange(-3600., 3601., 45.)
+
+    integrator = glonass.StateIntegrator(step=60.)
+    limited = glonass.StateIntegrator(step=60., states=8)
+
+    (x, y, z) = limited.positions(eph, dts)
+    assert len(limited._states[eph][1]) == 8
+
+    for (i, dt) in enumerate(dts):
+        xyz = integrator.position(eph, dt)
+        assert limited.position(eph, dt) == xyz
+        assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-6)
+
+    assert len(limited._states[eph][1]) == 8
+
+
+def test_compute_sat_xyz_array():
+    eph = messages()[1]
+    dts = np.arange(-900., 901., 30.)
+
+    (x, y, z) = glonass.compute_sat_xyz_array(eph, dts)
+
+    for (i, dt) in enumerate(dts):
+        xyz = glonass.compute_sat_xyz(eph, dt)
+        assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-6)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_sat_gps.py
+Description: tests of the GPS (and similar) orbits
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+
+import numpy as np
+
+from tecs.rinex.v2.n import Nav2
+from tecs.sat import gps
+from tecs.tests.test_nav2 import GPS_MSG
+
+NAME = 'tecs.tests.test_sat_gps'
+
+
+def test_compute_sat_xyz_array():
+    nav = Nav2(io.StringIO(GPS_MSG), 'zimj1000.16n')
+    eph = nav.ephemeris['G']['eph']
+
+    # a day around the reference epoch and the week rollover
+    seconds = np.concatenate((np.arange(475200., 561600., 30.),
+                              np.arange(0., 3600., 30.)))
+
+    for rec in eph:
+        (x, y, z) = gps.compute_sat_xyz_array(rec, seconds)
+
+        for (i, sec) in enumerate(seconds):
+            xyz = gps.compute_sat_xyz(tuple(rec.tolist()), sec)
+            assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-3)
+
+    # one message per moment
+    (x, y, z) = gps.compute_sat_xyz_array(eph, seconds[:2])
+    for i in range(2):
+        xyz = gps.compute_sat_xyz(tuple(eph[i].tolist()), seconds[i])
+        assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-3)
+
+
+def test_solve_kepler():
+    mk = np.linspace(-np.pi, 50., 1000)
+    e0 = np.full(len(mk), 0.02)
+
+    ek = gps.solve_kepler(mk, e0)
+
+    assert np.abs(ek - e0 * np.sin(ek) - mk).max() < 1e-12
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_sat_orbit.py
+Description: tests of the interpolated satellite positions
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+
+import numpy as np
+
+from tecs.rinex.v2.n import Nav2
+from tecs.sat import glonass, gps
+from tecs.sat.orbit import OrbitInterpolator
+from tecs.tests.test_nav2 import GLO_MSG, GPS_MSG
+
+NAME = 'tecs.tests.test_sat_orbit'
+
+
+def messages(msg, filename, system):
+    """messages(msg, filename, system) -> list of the ephemeris tuples
+    """
+    nav = Nav2(io.StringIO(msg), filename)
+    return [eph for sat in nav.message[system].values()
+            for eph in sat.values()]
+
+
+def test_gps():
+    eph = messages(GPS_MSG, 'zimj1000.16n', 'G')[0]
+    orbit = OrbitInterpolator(gps.compute_sat_xyz_array)
+
+    # a day, the week rollover included
+    seconds = np.arange(518400., 608400., 7.)
+    (max_error, rms_error) = orbit.accuracy(eph, seconds)
+
+    assert max_error < 1e-3, max_error
+    assert rms_error <= max_error
+
+    # the nodes are exact
+    assert np.allclose(orbit.position(eph, 518400.),
+                       gps.compute_sat_xyz(eph, 518400.), rtol=0, atol=1e-6)
+
+
+def test_glonass():
+    eph = messages(GLO_MSG, 'zimj1000.16g', 'R')[0]
+    orbit = OrbitInterpolator(glonass.compute_sat_xyz_array)
+
+    max_error = orbit.accuracy(eph, np.arange(-900., 901., 1.))[0]
+    assert max_error < 1e-3, max_error
+
+    # the lower order and the longer step are worse
+    coarse = OrbitInterpolator(glonass.compute_sat_xyz_array, step=900.,
+                               order=3)
+    assert coarse.accuracy(eph, np.arange(-900., 901., 10.))[0] > max_error
+
+
+def test_cache_size():
+    (eph_1, eph_2) = messages(GLO_MSG, 'zimj1000.16g', 'R')
+    orbit = OrbitInterpolator(glonass.compute_sat_xyz_array, size=2)
+
+    for dt in (0., 300., 600.):
+        orbit.position(eph_1, dt)
+    orbit.position(eph_2, 0.)
+
+    # the oldest message is dropped
+    assert [m[0] for m in orbit._messages.values()] == [eph_2]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_sp3.py
+Description: tests of the precise orbits
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import NS_PER_SEC, datetime2ns
+from tecs.rinex.sp3 import SP3, SP3Index, load_precise_orbit, sp3_date
+from tecs.sat import gps
+from tecs.tests.test_sat_orbit import messages
+from tecs.tests.test_nav2 import GPS_MSG
+
+NAME = 'tecs.tests.test_sp3'
+
+START = datetime.datetime(2016, 4, 9)
+# the week seconds of START
+START_SEC = 518400.
+INTERVAL = 900.
+NUM = 17
+
+
+def sp3_text(satellites, time_system='GPS'):
+    """sp3_text(satellites, time_system='GPS') -> str
+
+    Parameters
+    ----------
+    satellites : dict
+        {sat id: eph}, e.g. {'G01': eph}; the positions are computed by
+        gps.compute_sat_xyz, zeros if eph is None.
+    """
+    lines = [
+        '#cP2016  4  9  0  0  0.00000000      17 ORBIT IGS14 HLM  IGS',
+        '## 1891 {:15.8f} {:14.8f} 57487 0.0000000000000'.format(
+            START_SEC, INTERVAL),
+        '%c G  cc {:3} ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc'.format(
+            time_system),
+        '%c cc cc ccc ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc',
+    ]
+
+    for i in range(NUM):
+        epoch = START + datetime.timedelta(seconds=i * INTERVAL)
+        lines.append('*  {:4d} {:2d} {:2d} {:2d} {:2d} {:11.8f}'.format(
+            epoch.year, epoch.month, epoch.day, epoch.hour, epoch.minute,
+            epoch.second))
+
+        for sat in sorted(satellites):
+            eph = satellites[sat]
+            xyz = (0., 0., 0.)
+            if eph is not None:
+                xyz = gps.compute_sat_xyz(eph, START_SEC + i * INTERVAL)
+            lines.append('P{}{:14.6f}{:14.6f}{:14.6f}{:14.6f}'.format(
+                sat, xyz[0] / 1000, xyz[1] / 1000, xyz[2] / 1000, 0.))
+
+    lines.append('EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class TestSP3(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+        self.eph_1 = self.eph_2 = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.eph_1, self.eph_2) = messages(GPS_MSG, 'zimj1000.16n', 'G')
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, text):
+        filename = os.path.join(self.tmp_dir, name)
+        with io.open(filename, 'w') as f_obj:
+            f_obj.write(text)
+        return filename
+
+    def test_read(self):
+        text = sp3_text({'G22': self.eph_1, '  1': self.eph_2, 'G05': None})
+        sp3 = SP3(self.write('igs18916.sp3', text))
+
+        assert sp3.interval == INTERVAL
+        assert len(sp3.epochs) == NUM
+        assert sp3.epochs[0] == datetime2ns(START)
+        assert sp3.epochs[1] - sp3.epochs[0] == INTERVAL * NS_PER_SEC
+
+        # SP3-a: GPS; the zero positions are absent
+        assert sorted(sp3.positions) == [('G', 1), ('G', 22)]
+
+        xyz = gps.compute_sat_xyz(self.eph_1, START_SEC + INTERVAL)
+        assert np.allclose(sp3.positions[('G', 22)][1], xyz,
+                           rtol=0, atol=1e-3)
+
+    def test_time_system(self):
+        text = sp3_text({'G22': self.eph_1}, time_system='GLO')
+        filename = self.write('igs18916.sp3', text)
+
+        try:
+            SP3(filename)
+        except RinexError:
+            pass
+        else:
+            raise AssertionError('RinexError is expected')
+
+    def test_precise_orbit(self):
+        self.write('igs18916.sp3', sp3_text({'G22': self.eph_1}))
+        sp3_index = SP3Index([self.tmp_dir])
+
+        orbit = load_precise_orbit(sp3_index, START.date())
+        assert ('G', 22) in orbit
+        assert orbit.position('G', 1, datetime2ns(START)) is None
+
+        # the nodes are there from the 4th interval till the 5th to last
+        seconds = np.arange(4 * INTERVAL, (NUM - 5) * INTERVAL, 30.)
+        epochs = datetime2ns(START) + (seconds * NS_PER_SEC).astype(np.int64)
+
+        (x, y, z) = orbit.positions('G', 22, epochs)
+        for (i, sec) in enumerate(seconds):
+            xyz = gps.compute_sat_xyz(self.eph_1, START_SEC + sec)
+            assert np.allclose((x[i], y[i], z[i]), xyz, rtol=0, atol=1e-2)
+            assert np.allclose(orbit.position('G', 22, int(epochs[i])), xyz,
+                               rtol=0, atol=1e-2)
+
+        # no nodes before the start
+        assert orbit.position('G', 22, datetime2ns(START)) is None
+        assert np.isnan(orbit.positions('G', 22, epochs[:1] - epochs[0])[0][0])
+
+        # there is no file of the next day
+        assert load_precise_orbit(sp3_index, datetime.date(2016, 4, 10)) \
+            is None
+
+
+def test_sp3_date():
+    assert sp3_date('igs18916.sp3.Z') == datetime.date(2016, 4, 9)
+    assert sp3_date('cod18916.eph') == datetime.date(2016, 4, 9)
+    assert sp3_date('IGS0OPSFIN_20161000000_01D_15M_ORB.SP3.gz') == \
+        datetime.date(2016, 4, 9)
+    assert sp3_date('zimj1000.16n') is None
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_stream.py
+Description: tests of the station-day stream of the observation files
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import next
+from builtins import object
+from builtins import range
+
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_raises
+
+from tecs.rinex.basic import RinexError
+from tecs.rinex.common import datetime2ns
+from tecs.rinex.stream import ObsStream
+from tecs.tests.test_obs2 import RINEX
+
+NAME = 'tecs.tests.test_stream'
+
+HEADER = RINEX[:RINEX.index('END OF HEADER') + len('END OF HEADER\n')]
+
+EPOCH = ' 16  4 11  0{m:3d}{s:11.7f}  0  1G18\n'
+DATA = (' -33772003.62747 -26049584.20544  20265784.756    20265782.383'
+        '    20265782.236\n'
+        '        {s1:6.3f}          26.000\n')
+
+S_DT = datetime2ns(datetime.datetime(2016, 4, 11))
+NS = 10 ** 9
+
+
+def write_obs(filename, seconds, s1):
+    """write_obs(filename, seconds, s1) -> None
+    """
+    with io.open(filename, 'w') as f_obj:
+        f_obj.write(HEADER)
+        for sec in seconds:
+            f_obj.write(EPOCH.format(m=sec // 60, s=sec % 60))
+            f_obj.write(DATA.format(s1=s1))
+
+
+class TestObsStream(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+        self.files = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        self.files = [os.path.join(self.tmp_dir, 'zwe2102a.16o'),
+                      os.path.join(self.tmp_dir, 'zwe2102b.16o')]
+
+        # overlapping files
+        write_obs(self.files[0], (0, 30, 60, 90), 43.)
+        write_obs(self.files[1], (60, 90, 120, 150), 44.)
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read_records(self):
+        obs = ObsStream(self.files)
+        assert obs.filename == self.files[0]
+
+        records = list(obs.read_records())
+
+        epochs = [r[0] for r in records]
+        assert epochs == [S_DT + s * NS for s in (0, 30, 60, 90, 120, 150)]
+
+        # the epochs of the first file win
+        s1 = [r[2]['S1'][0] for r in records]
+        assert s1 == [43.] * 4 + [44.] * 2, s1
+
+        assert obs.filename == self.files[1]
+        assert obs.name == '{} (+1 more)'.format(self.files[0])
+
+    def test_read_records_sampling(self):
+        obs = ObsStream(self.files)
+        records = list(obs.read_records(60 * NS))
+
+        epochs = [r[0] for r in records]
+        assert epochs == [S_DT + s * NS for s in (0, 60, 120)]
+
+    def test_broken_file(self):
+        broken = os.path.join(self.tmp_dir, 'zwe2102a30.16o')
+        with io.open(broken, 'w') as f_obj:
+            f_obj.write('not a rinex file\n')
+
+        obs = ObsStream([self.files[0], broken, self.files[1]])
+        records = obs.read_records()
+
+        for _ in range(4):
+            next(records)
+
+        assert_raises(RinexError, next, records)
+        assert obs.name == '{} (+2 more)'.format(self.files[0])
+
+        epochs = [r[0] for r in records]
+        assert epochs == [S_DT + s * NS for s in (120, 150)]
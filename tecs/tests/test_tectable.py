@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_tectable.py
+Description: tests of the TEC combinations with the precomputed
+coefficients
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+import tecs.label as lbl
+from tecs.gtb.tectable import C, TecTable, tec_factor
+from tecs.gtb.tools import parse_rec
+from tecs.rinex.label import L1, L2, C1, P1, P2
+from tecs.sat import gps, glonass
+
+NAME = 'tecs.tests.test_tectable'
+
+REC = {
+    'C1': (20000000.123, None, None),
+    'P1': (20000000.456, None, None),
+    'P2': (20000003.789, None, None),
+    'L1': (105000000.5, 0, 7),
+    'L2': (81800000.25, 0, 6),
+}
+
+
+def test_record():
+    table = TecTable()
+    (f1, f2) = (gps.F1, gps.F2)
+
+    tec = table.coefficients('G').record(parse_rec(REC))
+
+    # the values of the formulas
+    factor = tec_factor(f1, f2)
+    assert tec[lbl.R_TEC_L1L2] == \
+        factor * (C / f1 * REC['L1'][0] - C / f2 * REC['L2'][0])
+    assert tec[lbl.R_TEC_P1P2] == factor * (REC['P2'][0] - REC['P1'][0])
+    assert tec[lbl.R_TEC_C1P2] == factor * (REC['P2'][0] - REC['C1'][0])
+    assert tec[lbl.R_TEC_L1C1] == \
+        0.5 * f1 ** 2 / 40.308 * (REC['C1'][0] - REC['L1'][0] * C / f1) * \
+        1.0e-16
+
+    # absent observables, frequencies
+    assert lbl.R_TEC_L1L5 not in tec
+    assert lbl.R_TEC_C1C2 not in tec
+    assert lbl.R_TEC_L8C8 not in tec
+
+    # only those requested
+    table = TecTable([lbl.R_TEC_L1L2])
+    tec = table.coefficients('G').record(parse_rec(REC))
+    assert list(tec) == [lbl.R_TEC_L1L2]
+
+
+def test_glonass_channels():
+    table = TecTable()
+    assert table.coefficients('R') is None
+    assert table.coefficients('X') is None
+
+    for k in (-7, 0, 6, 9):
+        (f1, f2) = (glonass.F1(k), glonass.F2(k))
+        tec = table.coefficients('R', k).record(parse_rec(REC))
+        assert tec[lbl.R_TEC_L1L2] == tec_factor(f1, f2) * \
+            (C / f1 * REC['L1'][0] - C / f2 * REC['L2'][0])
+
+
+def test_evaluate():
+    table = TecTable()
+
+    size = 50
+    rand = np.random.RandomState(0)
+    observations = {
+        L1: 105000000. + rand.uniform(-1e6, 1e6, size),
+        L2: 81800000. + rand.uniform(-1e6, 1e6, size),
+        C1: 20000000. + rand.uniform(-1e3, 1e3, size),
+        P1: 20000000. + rand.uniform(-1e3, 1e3, size),
+        P2: 20000000. + rand.uniform(-1e3, 1e3, size),
+    }
+    # absent values
+    observations[L2][3] = np.nan
+    observations[P1][7] = 0.
+    channels = rand.randint(-7, 7, size)
+
+    for (system, ks) in (('G', [None] * size), ('R', channels.tolist())):
+        tec = table.evaluate(system, observations, channels)
+
+        for i in range(size):
+            rec = dict((o_type[0], (float(values[i]), None, None))
+                       for (o_type, values) in observations.items()
+                       if not np.isnan(values[i]))
+            expected = table.coefficients(system, ks[i]).record(
+                parse_rec(rec))
+
+            for label in tec:
+                if label in expected:
+                    assert tec[label][i] == expected[label]
+                else:
+                    assert np.isnan(tec[label][i])
+
+        assert np.isnan(tec[lbl.R_TEC_L1L2][3])
+        assert np.isnan(tec[lbl.R_TEC_P1P2][7])
+        assert lbl.R_TEC_L1L5 not in tec
+
+    # no channels
+    assert table.evaluate('R', observations) == {}
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_visibility.py
+Description: tests of the visibility windows of the satellites
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+
+import numpy as np
+
+from tecs.rinex.common import NS_PER_DAY, NS_PER_SEC, datetime2ns
+from tecs.sat import gps
+from tecs.sat.common import TopocentricFrame
+from tecs.sat.orbit import broadcast_orbit
+from tecs.sat.visibility import VisibilityWindows
+from tecs.tests.test_orbitstore import ephemeris_index
+
+NAME = 'tecs.tests.test_visibility'
+
+DAY_START = datetime2ns(datetime.datetime(2016, 4, 9))
+# zwe2
+SITE = (2886359.0, 2155972.0, 5245886.0)
+
+
+def test_visibility_windows():
+    index = ephemeris_index()
+    frame = TopocentricFrame(SITE)
+
+    orbit = broadcast_orbit(index, gps.compute_sat_xyz_array, DAY_START,
+                            600., 1)
+    visibility = VisibilityWindows(frame, orbit)
+
+    epochs = DAY_START + np.arange(0, 86400, 30) * NS_PER_SEC
+    for number in (1, 22):
+        windows = visibility.windows[('G', number)]
+        assert windows
+        assert all(start < end for (start, end) in windows)
+
+        picked = [visibility.visible('G', number, epoch)
+                  for epoch in epochs.tolist()]
+        # some are skipped
+        assert not all(picked)
+
+        (x, y, z) = orbit.positions('G', number, epochs)
+        (el, _) = frame.el_az_array(x, y, z)
+        # ...but none of those above the horizon
+        assert all(picked[i] for i in np.flatnonzero(el >= 0))
+
+    # unknown
+    assert visibility.visible('G', 2, DAY_START)
+    assert visibility.visible('R', 1, DAY_START)
+    assert visibility.visible('G', 1, DAY_START + 2 * NS_PER_DAY)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding=utf8
+"""
+File: test_xyzstore.py
+Description: tests of the store of the site coordinates
+"""
+from __future__ import division
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from builtins import object
+
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_raises
+
+from tecs.rinex.common import datetime2ns
+from tecs.rinex.xyzstore import XYZError, XYZStore
+from tecs.sat.common import xyz2lbh_deg
+
+NAME = 'tecs.tests.test_xyzstore'
+
+USUD = '''# Site: USUD
+# datetime, x(meters), y(meters), z(meters)
+
+2011-03-11 05:00:30 -3855263.0833 3427432.6068 3741020.3148
+2011-03-11 05:00:00 -3855263.0771 3427432.6022 3741020.3066
+'''
+
+SITES = '''irkj 2011-03-11 00:00:00 -968328.7 3794425.9 5018167.8
+USUD 2011-03-11 06:00:00.5 -3855263.1 3427432.6 3741020.3
+'''
+
+
+def epoch(*args):
+    """epoch(*args) -> ns
+    """
+    return datetime2ns(datetime.datetime(*args))
+
+
+class TestXYZStore(object):
+
+    def __init__(self):
+        self.tmp_dir = None
+
+    def setup(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+        with io.open(os.path.join(self.tmp_dir, 'usud0700.11o.xyz'),
+                     'w') as f_obj:
+            f_obj.write(USUD)
+
+        with io.open(os.path.join(self.tmp_dir, 'sites.xyz'), 'w') as f_obj:
+            f_obj.write(SITES)
+
+    def teardown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_file(self):
+        store = XYZStore()
+        store.load_file(os.path.join(self.tmp_dir, 'usud0700.11o.xyz'))
+
+        assert 'USUD' in store
+        usud = store.get('usud')
+        assert usud.epochs == [epoch(2011, 3, 11, 5),
+                               epoch(2011, 3, 11, 5, 0, 30)]
+
+        xyz = (-3855263.0771, 3427432.6022, 3741020.3066)
+        assert usud.lookup(epoch(2011, 3, 11, 5)) == (xyz, xyz2lbh_deg(*xyz))
+
+    def test_lookup(self):
+        store = XYZStore()
+        store.load(self.tmp_dir)
+
+        assert sorted(store.sites) == ['irkj', 'usud']
+
+        usud = store.get('usud')
+        assert len(usud) == 3
+
+        assert usud.lookup(epoch(2011, 3, 11, 4, 59, 59)) is None
+        # a position is valid till the next one
+        assert usud.lookup(epoch(2011, 3, 11, 5, 0, 15))[0] == \
+            (-3855263.0771, 3427432.6022, 3741020.3066)
+        assert usud.lookup(epoch(2011, 3, 11, 6))[0] == \
+            (-3855263.0833, 3427432.6068, 3741020.3148)
+        assert usud.lookup(epoch(2011, 3, 12))[0] == \
+            (-3855263.1, 3427432.6, 3741020.3)
+
+        assert store.get('zimm') is None
+
+    def test_wrong_record(self):
+        filename = os.path.join(self.tmp_dir, 'zimm0700.11o.xyz')
+        with io.open(filename, 'w') as f_obj:
+            f_obj.write('2011-03-11 05:00:00 -3855263.0 x 3741020.3\n')
+
+        assert_raises(XYZError, XYZStore().load_file, filename)